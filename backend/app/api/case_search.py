@@ -2,11 +2,14 @@
 Case Law Search API endpoints
 """
 
+import asyncio
+
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional, List, Dict
 from app.services.ai_service import ai_service
 from app.services.web_search_service import web_search_service
+from app.services.search_index import search_index, LOCAL_MIN_RESULTS
 
 router = APIRouter()
 
@@ -41,10 +44,11 @@ async def search_cases(request: CaseSearchRequest):
         # Detect if the query contains a case citation
         is_case_citation, case_citation = ai_service._detect_case_citation(request.query)
         
-        # If it's a specific case citation, search the web for real case details
-        if is_case_citation and web_search_service.is_available():
+        # If it's a specific case citation, look up real case details
+        # (local index first, then the web)
+        if is_case_citation:
             try:
-                print(f"🔍 Case search: Detected citation {case_citation}, searching web...")
+                print(f"🔍 Case search: Detected citation {case_citation}, searching...")
                 # Search for the specific case
                 search_results = await web_search_service.search_case_citation(
                     case_citation or request.query,
@@ -71,7 +75,7 @@ async def search_cases(request: CaseSearchRequest):
                         query_type="research"
                     )
                     return CaseSearchResponse(
-                        cases=[{"content": response_text, "source": "web_search", "urls": [r['url'] for r in search_results]}],
+                        cases=[{"content": response_text, "source": search_results[0].get("source", "web_search"), "urls": [r['url'] for r in search_results]}],
                         query=request.query,
                         total_found=len(search_results)
                     )
@@ -88,8 +92,26 @@ async def search_cases(request: CaseSearchRequest):
         if request.domain:
             search_query += f" related to {request.domain} law"
         
+        # Ground the answer in previously retrieved judgments when the local
+        # full-text index has enough matches
+        local_results = await asyncio.to_thread(search_index.search, request.query, limit=10)
+        if len(local_results) >= LOCAL_MIN_RESULTS:
+            print(f"📚 Found {len(local_results)} matching results in local index")
+            search_context = "\n\n".join([
+                f"**{r['title']}**\nURL: {r['url']}\n{r['snippet']}"
+                for r in local_results
+            ])
+            response_text = await ai_service.process_legal_query(
+                query=f"Find relevant case laws for: {search_query}. Provide case name, citation, court, year, and key principle.\n\nInformation found from case law databases:\n{search_context}",
+                query_type="research"
+            )
+            return CaseSearchResponse(
+                cases=[{"content": response_text, "source": "local_index", "urls": [r['url'] for r in local_results]}],
+                query=request.query,
+                total_found=len(local_results)
+            )
+        
         # Use AI to find relevant cases
-        # Note: In full implementation, this would query a vector database
         # For MVP, we use AI to provide case law citations based on the query
         response_text = await ai_service.process_legal_query(
             query=f"Find relevant case laws for: {search_query}. Provide case name, citation, court, year, and key principle.",
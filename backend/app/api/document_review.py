@@ -4,16 +4,19 @@ Optimized for Render free tier (512MB memory limit)
 """
 
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional
+import asyncio
 import logging
 import os
 
+from app.core.config import get_settings
+from app.services.upload_spool import SpooledUpload, UploadTooLarge, spool_upload
+
 logger = logging.getLogger(__name__)
 
 # Free tier limits (Render 512MB)
-MAX_FILE_SIZE = 300_000  # 300 KB for free tier
+MAX_FILE_SIZE = get_settings().UPLOAD_MAX_BYTES  # 300 KB by default for free tier
 MAX_EXTRACTED_CHARS = 25_000  # 25k chars max for AI processing
 
 # Lazy import to reduce startup memory
@@ -38,6 +41,13 @@ def get_document_processor():
 
 router = APIRouter()
 
+DOCUMENT_TYPES = {
+    'png': 'image', 'jpeg': 'image', 'jpg': 'image',
+    'pdf': 'pdf',
+    'doc': 'word', 'docx': 'word',
+    'txt': 'text',
+}
+
 
 def _truncate_text(text: str, max_chars: int = MAX_EXTRACTED_CHARS) -> str:
     """Truncate text to max_chars, preserving word boundaries"""
@@ -51,77 +61,96 @@ def _truncate_text(text: str, max_chars: int = MAX_EXTRACTED_CHARS) -> str:
     return truncated + "\n\n[Document truncated for free tier - first 25,000 characters shown]"
 
 
-def _process_document_sync(file_content: bytes, file_extension: str, filename: str) -> tuple[str, str]:
+async def _process_document(upload: SpooledUpload, file_extension: str, filename: str) -> tuple[str, str]:
     """
-    Synchronous document processing function for threadpool
+    Extract text from an uploaded document
+    
+    CPU-bound parsing runs on the dedicated extraction worker pool and the
+    vision APIs are awaited directly, so no event loop is nested inside a
+    Starlette threadpool thread. Parsers read a zero-copy view of the spooled
+    upload (or its file path) rather than a bytes copy.
+    
     Returns: (extracted_text, document_type)
     """
+    from app.services.extraction_cache import extraction_cache, FILE_LEVEL
+    
     dp = get_document_processor()
     extracted_text = None
-    document_type = 'unknown'
+    document_type = DOCUMENT_TYPES.get(file_extension, 'unknown')
+    
+    # Re-uploads of the same file skip extraction and OCR entirely
+    # (the SHA-256 was computed while the upload streamed in)
+    file_key = upload.sha256 if file_extension != 'txt' else None
+    if file_key:
+        cached_text = extraction_cache.get(file_key, FILE_LEVEL, source_bytes=upload.size)
+        if cached_text:
+            logger.info(f"Using cached extraction for {filename} ({upload.size} bytes)")
+            return cached_text, document_type
     
+    file_content = upload.content()
+    # Set to False by the processors when the text is a fallback (failed or low-confidence OCR)
+    extraction = {'complete': True}
     try:
         if file_extension in ['png', 'jpeg', 'jpg']:
-            # For images, use AI vision capabilities (async, but called from sync context)
-            import asyncio
-            try:
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-            extracted_text = loop.run_until_complete(
-                dp.process_image(file_content, filename or 'image')
-            )
-            document_type = 'image'
+            # For images, use AI vision capabilities
+            extracted_text = await dp.process_image(file_content, filename or 'image', report=extraction)
         elif file_extension == 'pdf':
-            import asyncio
-            try:
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-            extracted_text = loop.run_until_complete(dp.process_pdf(file_content))
-            document_type = 'pdf'
+            extracted_text = await dp.process_pdf(file_content, file_path=upload.path, report=extraction)
         elif file_extension in ['doc', 'docx']:
-            import asyncio
-            try:
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-            extracted_text = loop.run_until_complete(
-                dp.process_word(file_content, file_extension)
-            )
-            document_type = 'word'
+            extracted_text = await dp.process_word(file_content, file_extension)
         elif file_extension == 'txt':
-            extracted_text = file_content.decode('utf-8', errors='ignore')
-            document_type = 'text'
+            extracted_text = str(file_content, 'utf-8', errors='ignore')
     except Exception as e:
         logger.error(f"Document processing error: {e}")
         raise
     
-    # FIX 2: Truncate extracted text to prevent memory issues
-    if extracted_text:
-        extracted_text = _truncate_text(extracted_text, MAX_EXTRACTED_CHARS)
+    # Partial text is not cached, so a re-upload retries OCR
+    if file_key and extracted_text and extraction['complete']:
+        extraction_cache.put(file_key, extracted_text, FILE_LEVEL)
     
+    # Full text: the endpoint truncates it for single-pass review or chunks it
     return extracted_text or "", document_type
 
 
+def _use_chunked_review(text: Optional[str], review_mode: Optional[str]) -> bool:
+    """
+    Whether to review with map-reduce chunking instead of truncating
+    
+    review_mode: "single" (truncate), "chunked", or "auto"/None (chunk only
+    when the text is longer than MAX_EXTRACTED_CHARS)
+    """
+    if not text or not get_settings().REVIEW_CHUNKED_ENABLED:
+        return False
+    mode = (review_mode or "auto").strip().lower()
+    if mode == "single":
+        return False
+    if mode == "chunked":
+        return True
+    return len(text) > MAX_EXTRACTED_CHARS
+
+
 class DocumentReviewResponse(BaseModel):
     """Response model for document review"""
     analysis: str
     document_type: str
     extracted_text: Optional[str] = None
+    review_mode: str = "single"
+    chunks_reviewed: Optional[int] = None
 
 
 @router.post("/review-document", response_model=DocumentReviewResponse)
 async def review_document(
     file: UploadFile = File(...),
-    query: Optional[str] = Form(None)
+    query: Optional[str] = Form(None),
+    review_mode: Optional[str] = Form(None)
 ):
     """
     Review an uploaded document or image
     
+    Documents longer than 25,000 characters are reviewed in chunks
+    (map-reduce) instead of being truncated; pass review_mode="single" to
+    force a single truncated pass or "chunked" to always chunk.
+    
     Supports:
     - PDF files (.pdf)
     - Word documents (.doc, .docx)
@@ -139,21 +168,28 @@ async def review_document(
                 detail=f"Unsupported file type. Supported types: {', '.join(allowed_extensions)}"
             )
         
-        # Read file content
-        file_content = await file.read()
-        
-        # FIX 1: Hard size limit for free tier
-        if len(file_content) > MAX_FILE_SIZE:
+        # FIX 1: Hard size limit for free tier, enforced while streaming the upload
+        # into a spool (memory while small, temp file past UPLOAD_SPOOL_BYTES)
+        try:
+            if file.size is not None and file.size > MAX_FILE_SIZE:
+                raise UploadTooLarge(MAX_FILE_SIZE, file.size)
+            upload = await spool_upload(
+                file,
+                max_bytes=MAX_FILE_SIZE,
+                spool_bytes=get_settings().UPLOAD_SPOOL_BYTES,
+                suffix=f".{file_extension}",
+            )
+        except UploadTooLarge as e:
             raise HTTPException(
                 status_code=413,
-                detail=f"File too large for free tier. Maximum size: {MAX_FILE_SIZE // 1000}KB. Your file: {len(file_content) // 1000}KB. Please upload a smaller document."
+                detail=f"File too large for free tier. Maximum size: {MAX_FILE_SIZE // 1000}KB. Your file: {'over ' if file.size is None else ''}{e.received_bytes // 1000}KB. Please upload a smaller document."
             )
         
-        # FIX 4: Offload heavy document processing to threadpool
+        # FIX 4: Heavy document processing runs on the extraction worker pool
+        document_type = DOCUMENT_TYPES.get(file_extension, 'unknown')
         try:
-            extracted_text, document_type = await run_in_threadpool(
-                _process_document_sync,
-                file_content,
+            extracted_text, document_type = await _process_document(
+                upload,
                 file_extension,
                 file.filename or 'document'
             )
@@ -205,14 +241,23 @@ async def review_document(
                     f"The document could not be processed. Error: {error_detail}\n\n"
                     "Please check if the file format is supported and try again."
                 )
+        finally:
+            # Extracted text is a separate string; the spooled upload can go
+            upload.close()
         
         # Create query for AI analysis - FIX 8: Limit to case context summary only
         user_query = query.strip() if query and query.strip() else "Please provide a concise case context summary (2-3 KB) of this document focusing on key facts, parties, and legal issues."
         
-        # Combine extracted text with user query (already truncated)
+        # Long documents are reviewed chunk by chunk instead of being truncated
+        use_chunked = _use_chunked_review(extracted_text, review_mode)
+        chunks_reviewed = None
+        
+        # Combine extracted text with user query
         if extracted_text and extracted_text.strip():
-            # FIX 2: Text is already truncated in _process_document_sync
-            analysis_query = f"{user_query}\n\nDocument Content (first 25,000 chars):\n{extracted_text}"
+            if not use_chunked:
+                # FIX 2: Truncate extracted text for a single-pass review
+                extracted_text = _truncate_text(extracted_text, MAX_EXTRACTED_CHARS)
+                analysis_query = f"{user_query}\n\nDocument Content (first 25,000 chars):\n{extracted_text}"
         else:
             # If no text was extracted, provide detailed error message
             if 'error_message' in locals():
@@ -237,17 +282,34 @@ async def review_document(
             )
         
         # Note: Documents are processed temporarily and not saved to storage
-        # This ensures privacy and prevents storage buildup
+        # This ensures privacy and prevents storage buildup. Extracted text is
+        # only kept on disk if EXTRACTION_CACHE_ENABLED is turned on, and notes on
+        # the parts of a long document if REVIEW_ANALYSIS_CACHE_ENABLED is (both off by default)
         
         # FIX 3: Get AI analysis with defensive error handling
         try:
             ai = get_ai_service()
-            # FIX 8: Add prompt instruction to limit response length
-            limited_query = f"{analysis_query}\n\nIMPORTANT: Keep your response concise. Maximum 800 words. Use numbered points. Do not exceed this limit."
-            analysis = await ai.process_legal_query(
-                query=limited_query,
-                query_type="research"
-            )
+            if use_chunked:
+                from app.services.chunked_review import chunked_reviewer
+                # Notes per part go straight to the model; the final answer gets
+                # the same context handling as a single-pass review
+                review = await chunked_reviewer.review(
+                    extracted_text, user_query, ai.generate_text, answer=ai.process_legal_query
+                )
+                analysis = review["analysis"]
+                chunks_reviewed = review["chunks"]
+                if review["truncated"]:
+                    analysis += (
+                        f"\n\n_Note: only the first {review['chunks']} of {review['total_chunks']} "
+                        "document parts were reviewed._"
+                    )
+            else:
+                # FIX 8: Add prompt instruction to limit response length
+                limited_query = f"{analysis_query}\n\nIMPORTANT: Keep your response concise. Maximum 800 words. Use numbered points. Do not exceed this limit."
+                analysis = await ai.process_legal_query(
+                    query=limited_query,
+                    query_type="research"
+                )
         except Exception as ai_error:
             # Provide helpful error message for AI service failures
             error_msg = str(ai_error)
@@ -264,7 +326,6 @@ async def review_document(
                 actual_api = "Anthropic"
             
             # Check what provider is configured (may differ if server not restarted)
-            from app.core.config import get_settings
             get_settings.cache_clear()  # Clear cache to get fresh settings
             settings = get_settings()
             configured_provider = settings.AI_PROVIDER.lower().strip()
@@ -333,7 +394,9 @@ async def review_document(
         return DocumentReviewResponse(
             analysis=analysis,
             document_type=document_type,
-            extracted_text=extracted_text[:1000] if extracted_text else None  # Return first 1000 chars as preview
+            extracted_text=extracted_text[:1000] if extracted_text else None,  # Return first 1000 chars as preview
+            review_mode="chunked" if use_chunked else "single",
+            chunks_reviewed=chunks_reviewed
         )
         
     except HTTPException:
@@ -349,3 +412,31 @@ async def review_document(
             detail=f"Error processing document: {error_detail}"
         )
 
+
+@router.get("/review-document/cache-stats")
+async def get_extraction_cache_stats():
+    """Hits, misses and bytes saved by the extraction cache"""
+    from app.services.extraction_cache import extraction_cache
+    return extraction_cache.get_stats()
+
+
+@router.get("/review-document/worker-stats")
+async def get_extraction_worker_stats():
+    """Queue depth and utilization of the extraction worker pools"""
+    from app.services.extraction_workers import extraction_workers
+    from app.services.pdf_extraction import pdf_extractor
+    from app.utils.gemini_ocr import gemini_ocr_client
+    from app.services.local_ocr import local_ocr
+    return {
+        "extraction_workers": extraction_workers.get_stats(),
+        "pdf_process_pool": pdf_extractor.get_stats(),
+        "gemini_ocr": gemini_ocr_client.get_stats(),
+        "tesseract_ocr": local_ocr.get_stats(),
+    }
+
+
+@router.get("/review-document/ocr-capabilities")
+async def get_ocr_capabilities(refresh: bool = False):
+    """OCR toolchain matrix (Poppler, Tesseract, Gemini/OpenAI vision) probed at startup"""
+    from app.services.ocr_toolchain import ocr_toolchain
+    return await asyncio.to_thread(ocr_toolchain.probe if refresh else ocr_toolchain.capabilities)
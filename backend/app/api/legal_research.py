@@ -54,7 +54,8 @@ async def legal_research(request: LegalQueryRequest):
             query_type=request.query_type,
             context=request.context,
             relevant_cases=request.relevant_cases,
-            relevant_statutes=request.relevant_statutes
+            relevant_statutes=request.relevant_statutes,
+            retrieve_context=True
         )
         
         return LegalQueryResponse(
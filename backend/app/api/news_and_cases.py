@@ -9,8 +9,11 @@ from app.services.ai_service import ai_service
 from app.services.web_search_service import web_search_service
 from app.services.document_storage import document_storage
 from app.services.search_cache import search_cache
+from app.services.search_quota import search_quota, PRIORITY_PRELOAD
+from app.services.search_index import search_index
+from app.services.legal_feeds import feed_refresher, FEED_MAJOR_CASES, FEED_LEGAL_NEWS
 from datetime import datetime
-import re
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -40,11 +43,17 @@ class NewsItem(BaseModel):
 class CasesResponse(BaseModel):
     """Response model for major cases"""
     cases: List[CaseItem]
+    source: Optional[str] = None  # "uploaded", "web" or "default"
+    generated_at: Optional[str] = None  # When the web feed snapshot was built
+    age_seconds: Optional[float] = None
 
 
 class NewsResponse(BaseModel):
     """Response model for latest legal news"""
     news: List[NewsItem]
+    source: Optional[str] = None  # "uploaded", "web" or "default"
+    generated_at: Optional[str] = None  # When the web feed snapshot was built
+    age_seconds: Optional[float] = None
 
 
 @router.get("/major-cases", response_model=CasesResponse)
@@ -52,10 +61,11 @@ async def get_major_cases(force_web: bool = False):
     """
     Get recent major judgments from Supreme Court and High Courts
     Preloaded when the page opens
-    Uses Google Custom Search to fetch latest information
+    Served from the background-refreshed web feed (see legal_feeds), so this
+    endpoint never waits on Google Custom Search
     
     Args:
-        force_web: If True, skip uploaded documents and force web search
+        force_web: If True, skip uploaded documents and serve the web feed
     """
     try:
         current_year = datetime.now().year
@@ -78,164 +88,26 @@ async def get_major_cases(force_web: bool = False):
                         )
                         for case in uploaded_cases
                     ]
-                    return CasesResponse(cases=case_items)
+                    return CasesResponse(cases=case_items, source="uploaded")
             except Exception as storage_error:
                 logger.warning(f"Error retrieving uploaded cases: {storage_error}")
-                # Continue to web search fallback
+                # Continue to web feed fallback
         
-        # SECOND: Try web search if no uploaded documents
-        # Clear settings cache to ensure fresh API key is loaded
-        try:
-            from app.core.config import get_settings
-            get_settings.cache_clear()
-        except Exception as cache_error:
-            logger.warning(f"Could not clear settings cache: {cache_error}")
-        
-        # Reload web search service to get fresh settings
-        try:
-            from app.services.web_search_service import WebSearchService
-            fresh_web_search = WebSearchService()
-        except Exception as ws_error:
-            logger.error(f"Could not initialize web search service: {ws_error}")
-            # Fall through to defaults
-            cases = _get_default_cases(current_year)
-            return CasesResponse(cases=cases)
-        
-        # Use Google Custom Search to get latest major cases
-        # Log search availability
-        logger.info(f"Web search service available: {fresh_web_search.is_available()}")
-        logger.info(f"API Key configured: {bool(fresh_web_search.api_key)}")
-        logger.info(f"Engine ID configured: {bool(fresh_web_search.search_engine_id)}")
-        
-        if fresh_web_search.is_available():
-            try:
-                logger.info(f"Searching for major cases for year {current_year}...")
-                
-                # Try multiple search strategies with better queries
-                # Strategy 1: Search case law databases for recent judgments
-                search_queries = [
-                    f'"{current_year}" "Supreme Court" "judgment" India',
-                    f'"{current_year-1}" "Supreme Court" "judgment" India',
-                    f'"{current_year}" "High Court" "judgment" India',
-                    f'"recent judgment" "{current_year}" India court',
-                ]
-                
-                all_results = []
-                for search_query in search_queries:
-                    # First try case law databases
-                    case_results = await fresh_web_search.search_legal_sites(
-                        search_query,
-                        max_results=5,
-                        sites=fresh_web_search.CASE_LAW_SITES
-                    )
-                    all_results.extend(case_results)
-                    
-                    # If we don't have enough, try broader search without site restriction
-                    if len(all_results) < 5:
-                        # Use general search (no site restriction) via direct API call
-                        try:
-                            import httpx
-                            
-                            url = "https://www.googleapis.com/customsearch/v1"
-                            async with httpx.AsyncClient(timeout=15.0) as client:
-                                response = await client.get(
-                                    url,
-                                    params={
-                                        "key": fresh_web_search.api_key,
-                                        "cx": fresh_web_search.search_engine_id,
-                                        "q": f"{search_query} judgment India",
-                                        "num": 5,
-                                    }
-                                )
-                                response.raise_for_status()
-                                data = response.json()
-                                
-                                for item in data.get("items", []):
-                                    # Only add if not duplicate
-                                    if not any(r.get("url") == item.get("link") for r in all_results):
-                                        all_results.append({
-                                            "title": item.get("title", ""),
-                                            "url": item.get("link", ""),
-                                            "snippet": item.get("snippet", ""),
-                                        })
-                                        if len(all_results) >= 5:
-                                            break
-                        except Exception as e:
-                            logger.warning(f"Broader search error: {e}")
-                    
-                    if len(all_results) >= 5:
-                        break
-                
-                logger.info(f"Found {len(all_results)} search results for major cases")
-                
-                # Convert search results to CaseItem format
-                # Filter out homepage/results that don't look like actual cases
-                cases = []
-                for result in all_results[:10]:  # Check more to filter better
-                    title = result.get("title", "Recent Judgment")
-                    snippet = result.get("snippet", "")
-                    url = result.get("url", "")
-                    
-                    # Skip homepages and non-case pages
-                    title_lower = title.lower()
-                    if any(skip_word in title_lower for skip_word in [
-                        'home', 'welcome', 'login', 'register', 'about', 'contact',
-                        'main page', 'index', 'search', 'results'
-                    ]):
-                        continue
-                    
-                    # Extract court and year from title/snippet
-                    court = "Supreme Court of India"
-                    year = current_year
-                    
-                    snippet_lower = snippet.lower()
-                    
-                    if "karnataka" in title_lower or "karnataka" in snippet_lower:
-                        court = "Karnataka High Court"
-                    elif "bombay" in title_lower or "bombay" in snippet_lower:
-                        court = "Bombay High Court"
-                    elif "delhi" in title_lower or "delhi" in snippet_lower:
-                        court = "Delhi High Court"
-                    elif "calcutta" in title_lower or "calcutta" in snippet_lower or "kolkata" in title_lower:
-                        court = "Calcutta High Court"
-                    elif "madras" in title_lower or "madras" in snippet_lower or "chennai" in title_lower:
-                        court = "Madras High Court"
-                    elif "allahabad" in title_lower or "allahabad" in snippet_lower:
-                        court = "Allahabad High Court"
-                    elif "high court" in title_lower or "high court" in snippet_lower:
-                        court = "High Court"
-                    elif "supreme court" in title_lower or "supreme court" in snippet_lower or "sc" in title_lower:
-                        court = "Supreme Court of India"
-                    
-                    # Extract year
-                    year_match = re.search(r'\b(20\d{2})\b', title + " " + snippet)
-                    if year_match:
-                        year = int(year_match.group(1))
-                    
-                    # Create case item
-                    cases.append(CaseItem(
-                        title=title[:200],
-                        court=court,
-                        year=year,
-                        citation=None,
-                        summary=snippet[:300] if snippet else "Recent important judgment from Indian courts.",
-                        query=f"Tell me about the case: {title}"
-                    ))
-                
-                if cases:
-                    logger.info(f"Returning {len(cases)} cases from web search")
-                    return CasesResponse(cases=cases)
-                else:
-                    logger.warning("No cases found in web search, using defaults")
-            except Exception as e:
-                import traceback
-                logger.error(f"Web search error for cases: {e}")
-                logger.error(traceback.format_exc())
-                # Fall through to default cases
+        # SECOND: Serve the latest web feed snapshot
+        snapshot = feed_refresher.get_snapshot(FEED_MAJOR_CASES)
+        # Rebuild in the background if stale; this request does not wait for it
+        feed_refresher.refresh_if_stale(FEED_MAJOR_CASES)
+        if snapshot:
+            return CasesResponse(
+                cases=[CaseItem(**case) for case in snapshot["items"]],
+                source="web",
+                generated_at=snapshot["generated_at"],
+                age_seconds=snapshot["age_seconds"]
+            )
         
-        # Fallback: Return default cases if web search fails or is not available
+        # Fallback: Return default cases until the first feed build completes
         cases = _get_default_cases(current_year)
-        return CasesResponse(cases=cases)
+        return CasesResponse(cases=cases, source="default")
         
     except Exception as e:
         # Return default cases on any error - never fail, always return something
@@ -244,7 +116,7 @@ async def get_major_cases(force_web: bool = False):
         print(traceback.format_exc())
         current_year = datetime.now().year
         cases = _get_default_cases(current_year)
-        return CasesResponse(cases=cases)
+        return CasesResponse(cases=cases, source="default")
 
 
 @router.get("/legal-news", response_model=NewsResponse)
@@ -252,10 +124,11 @@ async def get_legal_news(force_web: bool = False):
     """
     Get latest legal news and updates
     Preloaded when the page opens
-    Uses Google Custom Search to fetch latest information
+    Served from the background-refreshed web feed (see legal_feeds), so this
+    endpoint never waits on Google Custom Search
     
     Args:
-        force_web: If True, skip uploaded documents and force web search
+        force_web: If True, skip uploaded documents and serve the web feed
     """
     try:
         current_year = datetime.now().year
@@ -277,148 +150,26 @@ async def get_legal_news(force_web: bool = False):
                         )
                         for news in uploaded_news
                     ]
-                    return NewsResponse(news=news_items)
+                    return NewsResponse(news=news_items, source="uploaded")
             except Exception as storage_error:
                 logger.warning(f"Error retrieving uploaded news: {storage_error}")
-                # Continue to web search fallback
-        
-        # SECOND: Try web search if no uploaded documents
-        # Clear settings cache to ensure fresh API key is loaded
-        from app.core.config import get_settings
-        get_settings.cache_clear()
-        
-        # Reload web search service to get fresh settings
-        from app.services.web_search_service import WebSearchService
-        fresh_web_search = WebSearchService()
-        
-        # Use Google Custom Search to get latest legal news
-        logger.info(f"Web search service available (news): {fresh_web_search.is_available()}")
+                # Continue to web feed fallback
         
-        if fresh_web_search.is_available():
-            try:
-                logger.info(f"Searching for legal news for year {current_year}...")
-                
-                # Try multiple search strategies
-                search_queries = [
-                    f"latest legal news India {current_year}",
-                    f"legal updates India {current_year} OR {current_year-1}",
-                    f"legal reforms India {current_year}",
-                    f"law amendments India {current_year}",
-                ]
-                
-                all_results = []
-                for search_query in search_queries:
-                    # Search official legal sites
-                    news_results = await fresh_web_search.search_legal_sites(
-                        search_query,
-                        max_results=5
-                    )
-                    all_results.extend(news_results)
-                    
-                    # If we don't have enough, try broader search
-                    if len(all_results) < 5:
-                        try:
-                            import httpx
-                            url = "https://www.googleapis.com/customsearch/v1"
-                            async with httpx.AsyncClient(timeout=15.0) as client:
-                                response = await client.get(
-                                    url,
-                                    params={
-                                        "key": fresh_web_search.api_key,
-                                        "cx": fresh_web_search.search_engine_id,
-                                        "q": search_query,
-                                        "num": 5,
-                                    }
-                                )
-                                response.raise_for_status()
-                                data = response.json()
-                                
-                                for item in data.get("items", []):
-                                    # Prefer official sites but accept others if needed
-                                    url_check = item.get("link", "").lower()
-                                    if not any(r.get("url") == item.get("link") for r in all_results):
-                                        all_results.append({
-                                            "title": item.get("title", ""),
-                                            "url": item.get("link", ""),
-                                            "snippet": item.get("snippet", ""),
-                                        })
-                                        if len(all_results) >= 5:
-                                            break
-                        except Exception as e:
-                            logger.warning(f"Broader news search error: {e}")
-                    
-                    if len(all_results) >= 5:
-                        break
-                
-                logger.info(f"Found {len(all_results)} search results for legal news")
-                
-                # Convert search results to NewsItem format
-                news_items = []
-                for result in all_results[:5]:
-                    title = result.get("title", "Latest Legal News")
-                    snippet = result.get("snippet", "")
-                    url = result.get("url", "")
-                    
-                    # Extract source from URL
-                    source = None
-                    url_lower = url.lower()
-                    if "pib.gov.in" in url_lower:
-                        source = "PIB"
-                    elif "prsindia.org" in url_lower:
-                        source = "PRS Legislative Research"
-                    elif "legislative.gov.in" in url_lower:
-                        source = "Legislative Department"
-                    elif "legalaffairs.gov.in" in url_lower:
-                        source = "Department of Legal Affairs"
-                    elif "egazette.nic.in" in url_lower:
-                        source = "eGazette"
-                    elif "indiancode.nic.in" in url_lower:
-                        source = "India Code"
-                    elif "cbic.gov.in" in url_lower or "gst.gov.in" in url_lower:
-                        source = "CBIC"
-                    elif "finmin.nic.in" in url_lower:
-                        source = "Ministry of Finance"
-                    elif "mca.gov.in" in url_lower:
-                        source = "Ministry of Corporate Affairs"
-                    else:
-                        # Extract domain name as source
-                        domain_match = re.search(r'://(?:www\.)?([^/]+)', url)
-                        if domain_match:
-                            source = domain_match.group(1).replace('.in', '').replace('.org', '').title()
-                    
-                    # Extract date
-                    date_match = re.search(r'\b(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{1,2},?\s+(\d{4})\b', title + " " + snippet, re.IGNORECASE)
-                    date_str = str(current_year)
-                    if date_match:
-                        date_str = date_match.group(2)
-                    else:
-                        year_match = re.search(r'\b(20\d{2})\b', title + " " + snippet)
-                        if year_match:
-                            date_str = year_match.group(1)
-                    
-                    # Create news item
-                    news_items.append(NewsItem(
-                        title=title[:200],
-                        source=source or "Legal Updates",
-                        date=date_str,
-                        summary=snippet[:300] if snippet else "Latest legal news and updates from India.",
-                        query=f"Tell me more about: {title}"
-                    ))
-                
-                if news_items:
-                    logger.info(f"Returning {len(news_items)} news items from web search")
-                    return NewsResponse(news=news_items)
-                else:
-                    logger.warning("No news items found in web search, using defaults")
-            except Exception as e:
-                import traceback
-                logger.error(f"Web search error for news: {e}")
-                print(traceback.format_exc())
-                # Fall through to default news
+        # SECOND: Serve the latest web feed snapshot
+        snapshot = feed_refresher.get_snapshot(FEED_LEGAL_NEWS)
+        # Rebuild in the background if stale; this request does not wait for it
+        feed_refresher.refresh_if_stale(FEED_LEGAL_NEWS)
+        if snapshot:
+            return NewsResponse(
+                news=[NewsItem(**item) for item in snapshot["items"]],
+                source="web",
+                generated_at=snapshot["generated_at"],
+                age_seconds=snapshot["age_seconds"]
+            )
         
-        # Fallback: Return default news if web search fails or is not available
+        # Fallback: Return default news until the first feed build completes
         news_items = _get_default_news(current_year)
-        return NewsResponse(news=news_items)
+        return NewsResponse(news=news_items, source="default")
         
     except Exception as e:
         # Return default news on any error - never fail, always return something
@@ -427,7 +178,41 @@ async def get_legal_news(force_web: bool = False):
         print(traceback.format_exc())
         current_year = datetime.now().year
         news_items = _get_default_news(current_year)
-        return NewsResponse(news=news_items)
+        return NewsResponse(news=news_items, source="default")
+
+
+@router.post("/feeds/refresh")
+async def refresh_feeds(feed: Optional[str] = None, wait: bool = False):
+    """
+    Trigger a rebuild of the major-cases / legal-news feeds
+
+    Args:
+        feed: "major_cases" or "legal_news" (default: both)
+        wait: If True, wait for the rebuild and return the fresh status
+    """
+    feeds = [feed] if feed else list(feed_refresher.builders)
+    unknown = [f for f in feeds if f not in feed_refresher.builders]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown feed '{unknown[0]}'. Must be one of {sorted(feed_refresher.builders)}"
+        )
+
+    tasks = [feed_refresher.refresh(f) for f in feeds]
+    if wait:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return {
+        "status": "success",
+        "message": "Feeds refreshed" if wait else "Feed refresh started",
+        "feeds": feed_refresher.get_status()["feeds"],
+    }
+
+
+@router.get("/feeds/status")
+async def get_feeds_status():
+    """Age and refresh state of the background-built feeds"""
+    return {"status": "success", **feed_refresher.get_status()}
 
 
 async def _parse_cases_from_response(response_text: str, current_year: int) -> List[CaseItem]:
@@ -614,9 +399,27 @@ async def get_cache_stats():
     try:
         stats = search_cache.get_stats()
 
+        # Real per-key quota usage from the quota governor
+        quota_stats = search_quota.get_stats()
+        key_stats = search_quota.get_key_stats(web_search_service.api_key)
+        remaining = key_stats['remaining']
+        limit = quota_stats['daily_limit']
+        if remaining == 0:
+            quota_status = "EXCEEDED"
+        elif PRIORITY_PRELOAD not in key_stats['admitted_priorities']:
+            quota_status = "WARNING"
+        else:
+            quota_status = "OK"
+
         # Add recommendations based on performance
         recommendations = []
 
+        if quota_status != "OK":
+            recommendations.append(
+                f"Search quota is low ({remaining}/{limit} left today). "
+                "News and case preloads are being served from cache only."
+            )
+
         if stats['hit_rate_percent'] < 50:
             recommendations.append(
                 "Cache hit rate is low. Consider increasing cache duration or pre-warming cache with common queries."
@@ -637,11 +440,15 @@ async def get_cache_stats():
             "status": "success",
             "cache_stats": stats,
             "recommendations": recommendations,
+            "local_index": search_index.get_stats(),
             "quota_info": {
-                "google_free_tier_daily_limit": 100,
-                "estimated_queries_today": stats['misses'],
-                "quota_remaining_approx": max(0, 100 - stats['misses']),
-                "quota_status": "OK" if stats['misses'] < 80 else "WARNING" if stats['misses'] < 100 else "EXCEEDED"
+                "google_free_tier_daily_limit": limit,
+                "estimated_queries_today": key_stats['used'],
+                "quota_remaining_approx": remaining,
+                "quota_status": quota_status,
+                "admitted_priorities": key_stats['admitted_priorities'],
+                "by_priority": key_stats['by_priority'],
+                "denied_since_startup": quota_stats['denied_since_startup'],
             }
         }
     except Exception as e:
@@ -666,6 +473,32 @@ async def clear_cache():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/cache-warmup")
+async def warmup_cache(
+    top_n: int = 50,
+    days: int = 30,
+    concurrency: int = 4,
+    max_search_queries: int = 20
+):
+    """
+    Replay the most frequent historical queries into the search cache
+    and pre-load the Gemini model catalog and template indexes
+    Used by scripts/warm_cache.py --server after a deploy
+    """
+    try:
+        from app.services.cache_warmup import warm_up
+        report = await warm_up(
+            top_n=top_n,
+            days=days,
+            concurrency=concurrency,
+            max_search_queries=max_search_queries
+        )
+        return {"status": "success", "report": report}
+    except Exception as e:
+        logger.error(f"Error warming cache: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/cache-cleanup")
 async def cleanup_expired_cache():
     """
@@ -46,6 +46,60 @@ class Settings(BaseSettings):
     # Web Search API (for fetching latest legal information)
     GOOGLE_CUSTOM_SEARCH_API_KEY: Optional[str] = None
     GOOGLE_CUSTOM_SEARCH_ENGINE_ID: Optional[str] = None
+    # Shared connection pool for Custom Search calls
+    WEB_SEARCH_MAX_CONNECTIONS: int = 4  # Per host
+    WEB_SEARCH_TIMEOUT_SECONDS: float = 10.0  # Per attempt
+    WEB_SEARCH_MAX_RETRIES: int = 2
+    # Custom Search queries allowed per API key per day (free tier: 100)
+    GOOGLE_CSE_DAILY_QUOTA: int = 100
+    # Background rebuild of the /major-cases and /legal-news web feeds
+    FEED_REFRESH_ENABLED: bool = True
+    FEED_REFRESH_INTERVAL_MINUTES: int = 360
+    # Replay top historical queries into caches after startup (see scripts/warm_cache.py)
+    CACHE_WARMUP_ON_STARTUP: bool = False
+    CACHE_WARMUP_TOP_N: int = 25
+    CACHE_WARMUP_MAX_SEARCHES: int = 20
+
+    # Document processing
+    UPLOAD_MAX_BYTES: int = 300_000  # /review-document size limit (free tier)
+    UPLOAD_SPOOL_BYTES: int = 1024 * 1024  # Larger uploads spool to a temp file
+    EXTRACTION_WORKERS: int = 2  # Threads for blocking parse/render work (separate from the request threadpool)
+    PDF_EXTRACTION_WORKERS: int = 0  # Process pool size for PDF text extraction (0 = auto, 1 = serial)
+    PDF_PARALLEL_MIN_PAGES: int = 8  # Smaller PDFs are extracted serially
+    OCR_DPI: int = 300
+    OCR_CONCURRENCY: int = 3  # OCR API calls in flight per document
+    OCR_PAGE_WINDOW: int = 4  # Pages rendered at a time (bounds OCR memory)
+    OCR_IMAGE_MAX_SIDE: int = 2000  # Pages are downscaled/grayscaled before upload
+    OCR_IMAGE_TARGET_KB: int = 400
+    GEMINI_OCR_CONCURRENCY: int = 4  # Gemini OCR requests in flight per process
+    GEMINI_OCR_BATCH_PAGES: int = 3  # Small pages of one document per request (1 = off, capped at OCR_CONCURRENCY)
+    # Local Tesseract OCR: remote_first | local_first | remote_low_confidence
+    OCR_POLICY: str = "remote_first"
+    OCR_MIN_CONFIDENCE: float = 70.0  # Tesseract pages below this go to the vision APIs (remote_low_confidence)
+    TESSERACT_LANG: str = "eng+hin"
+    TESSERACT_WORKERS: int = 0  # Process pool size (0 = auto)
+    # Map-reduce review of documents longer than 25k chars (instead of truncation)
+    REVIEW_CHUNKED_ENABLED: bool = True
+    REVIEW_CHUNK_TOKENS: int = 3000
+    REVIEW_MAX_CHUNKS: int = 20
+    REVIEW_CONCURRENCY: int = 3  # Provider calls in flight per review
+    # Reuse of per-part review notes across reviews of the same text (data/review_cache).
+    # Off by default: the notes quote the uploaded document, so enabling it keeps them on disk
+    REVIEW_ANALYSIS_CACHE_ENABLED: bool = False
+    REVIEW_ANALYSIS_CACHE_MAX_MB: int = 50
+    # Extracted text of uploads, keyed by SHA-256 of file / page content (data/extraction_cache).
+    # Off by default: enabling it keeps uploaded document text on disk
+    EXTRACTION_CACHE_ENABLED: bool = False
+    EXTRACTION_CACHE_MAX_MB: int = 200
+    # Passages of uploaded documents attached to /legal-research queries as relevant_cases (needs numpy)
+    RETRIEVAL_ENABLED: bool = True
+    RETRIEVAL_DIMENSIONS: int = 1024  # Hashed TF-IDF vector width (changing it rebuilds the index)
+    RETRIEVAL_TOP_K: int = 8
+    RETRIEVAL_TOKEN_BUDGET: int = 1500  # Passage tokens added to the prompt
+    RETRIEVAL_MIN_SCORE: float = 0.1  # Cosine similarity below which passages are not attached
+
+    # AI usage cost log
+    USAGE_RETENTION_DAYS: Optional[int] = None  # Drop usage records older than this (None keeps all)
 
     # Server configuration
     PORT: int = 8888
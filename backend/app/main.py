@@ -166,6 +166,74 @@ async def root_health() -> dict:
     }
 
 
+@app.on_event("startup")
+async def start_feed_refresher() -> None:
+    """Build the major-cases / legal-news feeds in the background"""
+    if settings.FEED_REFRESH_ENABLED:
+        from app.services.legal_feeds import feed_refresher
+        feed_refresher.start()
+
+
+@app.on_event("startup")
+async def probe_ocr_toolchain() -> None:
+    """Discover Poppler / Tesseract / vision APIs once, off the event loop"""
+    import asyncio
+    from app.services.ocr_toolchain import ocr_toolchain
+    asyncio.get_running_loop().run_in_executor(None, ocr_toolchain.probe)
+
+
+@app.on_event("startup")
+async def prepare_document_storage() -> None:
+    """Migrate and sign stored documents, then index them for relevant_cases retrieval, off the event loop"""
+    import asyncio
+    from app.services.document_storage import document_storage
+
+    def prepare():
+        document_storage.run_maintenance()
+        if settings.RETRIEVAL_ENABLED:
+            from app.services.document_retrieval import document_retrieval
+            document_retrieval.sync_with_storage()
+
+    asyncio.get_running_loop().run_in_executor(None, prepare)
+
+
+@app.on_event("startup")
+async def start_cache_warmup() -> None:
+    """Optionally replay top historical queries into caches (runs in the background)"""
+    if settings.CACHE_WARMUP_ON_STARTUP:
+        import asyncio
+        from app.services.cache_warmup import warm_up, format_report
+
+        async def run_warmup():
+            try:
+                report = await warm_up(
+                    top_n=settings.CACHE_WARMUP_TOP_N,
+                    max_search_queries=settings.CACHE_WARMUP_MAX_SEARCHES,
+                )
+                logger.info("\n" + format_report(report))
+            except Exception as e:
+                logger.warning(f"Cache warm-up failed: {e}")
+
+        app.state.cache_warmup_task = asyncio.create_task(run_warmup())
+
+
+@app.on_event("shutdown")
+async def shutdown_services() -> None:
+    """Stop feed builds, close pooled search connections and worker pools, flush the usage log"""
+    from app.services.cost_tracker import cost_tracker
+    from app.services.legal_feeds import feed_refresher
+    from app.services.search_http_client import search_http_client
+    from app.services.pdf_extraction import pdf_extractor
+    from app.services.extraction_workers import extraction_workers
+    from app.services.local_ocr import local_ocr
+    await feed_refresher.stop()
+    await search_http_client.aclose()
+    extraction_workers.shutdown()
+    pdf_extractor.shutdown()
+    local_ocr.shutdown()
+    cost_tracker.shutdown()
+
+
 # Mount feature routers under /api/v1
 app.include_router(legal_research.router, prefix="/api/v1", tags=["legal-research"])
 app.include_router(
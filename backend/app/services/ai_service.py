@@ -333,16 +333,13 @@ class AIService:
         
         return False, None
     
-    async def process_legal_query(
-        self,
-        query: str,
-        query_type: str = "research",
-        context: Optional[Dict[str, Any]] = None,
-        relevant_cases: Optional[List[Dict[str, Any]]] = None,
-        relevant_statutes: Optional[List[Dict[str, Any]]] = None,
-    ) -> str:
+    def _classify_query(self, query: str) -> Dict[str, Any]:
         """
-        General legal Q&A / research helper.
+        Detect which kinds of live web search a query needs.
+        
+        Returns:
+            Dict of flags (is_amendment_query, is_gst_query, is_gst_2_0_query,
+            is_tax_query, is_case_citation) and the detected case_citation
         """
         # Detect if query is about amendments, recent changes, or latest updates
         query_lower = query.lower()
@@ -364,6 +361,129 @@ class AIService:
         # Detect case citation queries
         is_case_citation, case_citation = self._detect_case_citation(query)
         
+        return {
+            "is_amendment_query": is_amendment_query,
+            "is_gst_query": is_gst_query,
+            "is_gst_2_0_query": is_gst_2_0_query,
+            "is_tax_query": is_tax_query,
+            "is_case_citation": is_case_citation,
+            "case_citation": case_citation,
+        }
+    
+    async def fetch_web_search_results(
+        self,
+        query: str,
+        flags: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, str]]:
+        """
+        Run the web searches a legal query needs (case citation, GST, tax, amendments).
+        
+        Also used by the cache warm-up script to replay historical queries
+        without calling the LLM.
+        """
+        if flags is None:
+            flags = self._classify_query(query)
+        is_amendment_query = flags["is_amendment_query"]
+        is_gst_query = flags["is_gst_query"]
+        is_gst_2_0_query = flags["is_gst_2_0_query"]
+        is_tax_query = flags["is_tax_query"]
+        is_case_citation = flags["is_case_citation"]
+        case_citation = flags["case_citation"]
+        
+        web_search_results = []
+        if web_search_service.is_available():
+            try:
+                # Priority 1: Case citation queries - ALWAYS search the web for real case details
+                if is_case_citation:
+                    print(f"🔍 Detected case citation: {case_citation}")
+                    # Search for the specific case citation
+                    citation_results = await web_search_service.search_case_citation(
+                        case_citation or query,
+                        max_results=10
+                    )
+                    # Also try broader search with full query
+                    if not citation_results:
+                        citation_results = await web_search_service.search_case_details(
+                            query,
+                            max_results=10
+                        )
+                    web_search_results.extend(citation_results)
+                    print(f"📋 Found {len(citation_results)} results for case citation")
+                elif is_gst_2_0_query or is_gst_query:
+                    # Search for GST updates, specifically GST 2.0 if mentioned
+                    if is_gst_2_0_query:
+                        # Specific search for GST 2.0
+                        web_search_results = await web_search_service.search_legal_sites(
+                            "GST 2.0 reforms September 2025 OR GST 2.0 amendments 2025", max_results=8
+                        )
+                    else:
+                        web_search_results = await web_search_service.search_gst_updates()
+                elif is_tax_query:
+                    # Search for Finance Act and tax updates
+                    web_search_results = await web_search_service.search_finance_act(2025)
+                    # Also search for general tax amendments
+                    tax_results = await web_search_service.search_legal_sites(
+                        f"{query} latest amendments 2025", max_results=3
+                    )
+                    web_search_results.extend(tax_results)
+                elif is_amendment_query:
+                    # Search for latest amendments related to the query
+                    web_search_results = await web_search_service.search_legal_sites(
+                        f"{query} latest 2025 OR 2024", max_results=5
+                    )
+            except Exception as e:
+                print(f"⚠️ Web search failed: {e}")
+                # Continue without web search results
+        
+        return web_search_results
+
+    async def retrieve_relevant_cases(self, query: str) -> List[Dict[str, Any]]:
+        """
+        Passages of the user's uploaded documents that match the query
+
+        Returns:
+            relevant_cases items within RETRIEVAL_TOKEN_BUDGET (empty if
+            retrieval is disabled, numpy is missing or nothing matches)
+        """
+        if not self.settings.RETRIEVAL_ENABLED:
+            return []
+        try:
+            from app.services.document_retrieval import document_retrieval
+            return await document_retrieval.relevant_passages_async(
+                query,
+                token_budget=self.settings.RETRIEVAL_TOKEN_BUDGET,
+                top_k=self.settings.RETRIEVAL_TOP_K,
+                min_score=self.settings.RETRIEVAL_MIN_SCORE,
+            )
+        except Exception as e:
+            logger.warning(f"Document retrieval failed, continuing without it: {e}")
+            return []
+
+    async def process_legal_query(
+        self,
+        query: str,
+        query_type: str = "research",
+        context: Optional[Dict[str, Any]] = None,
+        relevant_cases: Optional[List[Dict[str, Any]]] = None,
+        relevant_statutes: Optional[List[Dict[str, Any]]] = None,
+        retrieve_context: bool = False,
+    ) -> str:
+        """
+        General legal Q&A / research helper.
+
+        With retrieve_context and no caller-supplied relevant_cases,
+        matching passages of uploaded documents are attached (see
+        retrieve_relevant_cases). Off by default so callers whose query
+        embeds a private document never search the other stored ones.
+        """
+        flags = self._classify_query(query)
+        is_amendment_query = flags["is_amendment_query"]
+        is_gst_query = flags["is_gst_query"]
+        is_gst_2_0_query = flags["is_gst_2_0_query"]
+        is_tax_query = flags["is_tax_query"]
+        is_case_citation = flags["is_case_citation"]
+        case_citation = flags["case_citation"]
+        
         prompt_parts: List[str] = [
             f"Query type: {query_type}",
             f"User query: {query}",
@@ -411,50 +531,10 @@ class AIService:
         ]
         
         # Fetch latest information from legal websites if query needs it
-        web_search_results = []
-        if web_search_service.is_available():
-            try:
-                # Priority 1: Case citation queries - ALWAYS search the web for real case details
-                if is_case_citation:
-                    print(f"🔍 Detected case citation: {case_citation}")
-                    # Search for the specific case citation
-                    citation_results = await web_search_service.search_case_citation(
-                        case_citation or query,
-                        max_results=10
-                    )
-                    # Also try broader search with full query
-                    if not citation_results:
-                        citation_results = await web_search_service.search_case_details(
-                            query,
-                            max_results=10
-                        )
-                    web_search_results.extend(citation_results)
-                    print(f"📋 Found {len(citation_results)} results for case citation")
-                elif is_gst_2_0_query or is_gst_query:
-                    # Search for GST updates, specifically GST 2.0 if mentioned
-                    if is_gst_2_0_query:
-                        # Specific search for GST 2.0
-                        web_search_results = await web_search_service.search_legal_sites(
-                            "GST 2.0 reforms September 2025 OR GST 2.0 amendments 2025", max_results=8
-                        )
-                    else:
-                        web_search_results = await web_search_service.search_gst_updates()
-                elif is_tax_query:
-                    # Search for Finance Act and tax updates
-                    web_search_results = await web_search_service.search_finance_act(2025)
-                    # Also search for general tax amendments
-                    tax_results = await web_search_service.search_legal_sites(
-                        f"{query} latest amendments 2025", max_results=3
-                    )
-                    web_search_results.extend(tax_results)
-                elif is_amendment_query:
-                    # Search for latest amendments related to the query
-                    web_search_results = await web_search_service.search_legal_sites(
-                        f"{query} latest 2025 OR 2024", max_results=5
-                    )
-            except Exception as e:
-                print(f"⚠️ Web search failed: {e}")
-                # Continue without web search results
+        web_search_results = await self.fetch_web_search_results(query, flags)
+
+        if relevant_cases is None and retrieve_context:
+            relevant_cases = await self.retrieve_relevant_cases(query)
         
         # Add web search results to prompt if available
         if web_search_results:
@@ -576,6 +656,17 @@ class AIService:
 
         return await self._generate_text(prompt, query_type="drafting")
 
+    async def generate_text(self, prompt: str, query_type: str = "research") -> str:
+        """
+        Send a prepared prompt to the configured provider.
+
+        The system prompt and provider routing apply, but unlike
+        process_legal_query no web search or document context is added, so
+        pipelines that build their own prompts (e.g. the per-part steps of a
+        chunked document review) do not pay for searches on every call.
+        """
+        return await self._generate_text(prompt, query_type=query_type)
+
     def _select_gemini_model(self, query_type: str) -> str:
         """
         Smart model routing based on query type.
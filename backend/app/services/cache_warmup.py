@@ -0,0 +1,236 @@
+"""
+Cache warm-up for LegalMitra
+
+Every deploy starts with empty in-process caches. This service replays the
+most frequent historical queries (from the AI audit log, weighted by query
+type popularity in cost history) through the same web-search path a real
+query takes, and pre-loads the Gemini model catalog and template indexes.
+Searches run under a concurrency limit and a search query allowance, at
+preload priority so warm-up never spends quota reserved for users.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import func
+
+from app.services.search_quota import search_query_allowance, search_priority, PRIORITY_PRELOAD
+
+logger = logging.getLogger(__name__)
+
+
+def load_top_queries(limit: int = 50, days: int = 30) -> List[Dict[str, Any]]:
+    """
+    Most frequent recent queries from the audit log
+
+    Queries are grouped case-insensitively. Ties are broken by how often the
+    query's type appears in cost history (the cost history records query
+    types but not query text).
+
+    Args:
+        limit: Number of queries to return
+        days: Look-back window
+
+    Returns:
+        List of dicts with query, query_type and count, most frequent first
+    """
+    from app.core.database import SessionLocal
+    from app.models.audit_log import AIAuditLog
+
+    since = datetime.utcnow() - timedelta(days=days)
+    normalized = func.lower(func.trim(AIAuditLog.query_text))
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(
+                func.min(AIAuditLog.query_text),
+                func.max(AIAuditLog.query_type),
+                func.count(AIAuditLog.id).label("count"),
+            )
+            .filter(AIAuditLog.timestamp >= since)
+            .group_by(normalized)
+            .order_by(func.count(AIAuditLog.id).desc())
+            .limit(limit * 2)
+            .all()
+        )
+    except Exception as e:
+        logger.warning(f"Could not read audit log for warm-up: {e}")
+        rows = []
+    finally:
+        db.close()
+
+    type_popularity = Counter()
+    try:
+        from app.services.cost_tracker import cost_tracker
+        type_popularity = Counter({
+            row["query_type"]: row["queries"] for row in cost_tracker.get_cost_by_query_type(days=365)
+        })
+    except Exception as e:
+        logger.warning(f"Could not read cost history for warm-up: {e}")
+
+    queries = [
+        {"query": query_text, "query_type": query_type, "count": count}
+        for query_text, query_type, count in rows
+        if query_text and query_text.strip()
+    ]
+    queries.sort(key=lambda q: (q["count"], type_popularity.get(q["query_type"], 0)), reverse=True)
+    return queries[:limit]
+
+
+async def _warm_gemini_models() -> Dict[str, Any]:
+    """Fetch and cache the Gemini model catalog"""
+    from app.services.ai_service import ai_service
+
+    if not ai_service.settings.GOOGLE_GEMINI_API_KEY:
+        return {"status": "skipped", "reason": "GOOGLE_GEMINI_API_KEY not set"}
+    if ai_service._gemini_client is None:
+        ai_service._initialize_gemini_client()
+    if ai_service._gemini_client is None:
+        return {"status": "error", "reason": ai_service._gemini_init_error}
+    models = await ai_service._get_cached_gemini_models(ai_service._gemini_use_new_sdk)
+    return {"status": "ok" if models else "error", "models": len(models)}
+
+
+def _warm_templates() -> Dict[str, Any]:
+    """Load both template catalogs (lazy-loaded on first request otherwise)"""
+    from app.services.template_service import template_service
+    from app.templates.template_service import template_service as catalog_service
+
+    categories = template_service.get_categories()
+    catalog_categories = catalog_service.get_all_categories()
+    return {
+        "status": "ok",
+        "templates": len(template_service.templates_cache),
+        "categories": len(categories),
+        "catalog_templates": len(catalog_service.catalog.get("templates", [])),
+        "catalog_categories": len(catalog_categories),
+    }
+
+
+async def warm_up(
+    top_n: int = 50,
+    days: int = 30,
+    concurrency: int = 4,
+    max_search_queries: int = 20,
+    warm_models: bool = True,
+    warm_templates: bool = True,
+) -> Dict[str, Any]:
+    """
+    Replay top historical queries and pre-load catalogs
+
+    Args:
+        top_n: Number of historical queries to replay
+        days: Audit log look-back window
+        concurrency: Queries replayed at the same time
+        max_search_queries: Live Custom Search queries warm-up may spend
+        warm_models: Pre-load the Gemini model catalog
+        warm_templates: Pre-load template indexes
+
+    Returns:
+        Warm-up report
+    """
+    from app.services.ai_service import ai_service
+    from app.services.search_cache import search_cache
+    from app.services.web_search_service import web_search_service
+
+    started = time.monotonic()
+    report: Dict[str, Any] = {"started_at": datetime.now().isoformat()}
+
+    if warm_templates:
+        try:
+            report["templates"] = _warm_templates()
+        except Exception as e:
+            report["templates"] = {"status": "error", "reason": str(e)}
+
+    if warm_models:
+        try:
+            report["gemini_models"] = await _warm_gemini_models()
+        except Exception as e:
+            report["gemini_models"] = {"status": "error", "reason": str(e)}
+
+    queries = load_top_queries(limit=top_n, days=days)
+    cache_start = search_cache.get_stats()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    outcomes = Counter()
+
+    async def replay(entry: Dict[str, Any]):
+        async with semaphore:
+            # Live searches take a slot from the allowance atomically; this
+            # only skips queries once it is used up (they would be served from cache)
+            if allowance["used"] >= allowance["limit"]:
+                outcomes["skipped_allowance"] += 1
+                return
+            try:
+                results = await ai_service.fetch_web_search_results(entry["query"])
+                outcomes["warmed" if results else "no_results"] += 1
+            except Exception as e:
+                logger.warning(f"Warm-up query failed: {e}")
+                outcomes["failed"] += 1
+
+    with search_query_allowance(max_search_queries) as allowance:
+        if web_search_service.is_available():
+            with search_priority(PRIORITY_PRELOAD):
+                await asyncio.gather(*(replay(q) for q in queries))
+        else:
+            outcomes["skipped_no_web_search"] = len(queries)
+
+    if search_cache.enable_persistence:
+        search_cache._save_cache_to_disk()
+
+    cache_end = search_cache.get_stats()
+    report["queries"] = {
+        "candidates": len(queries),
+        "top": [{"query": q["query"][:80], "count": q["count"]} for q in queries[:10]],
+        **dict(outcomes),
+    }
+    report["search_cache"] = {
+        "entries_before": cache_start["cache_size"],
+        "entries_after": cache_end["cache_size"],
+        "cache_hits": cache_end["hits"] - cache_start["hits"],
+        "live_searches": allowance["used"],
+        "search_query_allowance": max_search_queries,
+    }
+    report["duration_seconds"] = round(time.monotonic() - started, 2)
+    logger.info(f"Cache warm-up finished: {report['queries']} in {report['duration_seconds']}s")
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Human-readable warm-up report"""
+    lines = ["=" * 60, "CACHE WARM-UP REPORT", "=" * 60]
+    templates = report.get("templates")
+    if templates:
+        if templates.get("status") == "ok":
+            lines.append(
+                f"Templates:      {templates['templates']} templates, "
+                f"{templates['catalog_templates']} catalog entries"
+            )
+        else:
+            lines.append(f"Templates:      {templates.get('status')} ({templates.get('reason')})")
+    models = report.get("gemini_models")
+    if models:
+        detail = f"{models['models']} models" if "models" in models else models.get("reason")
+        lines.append(f"Gemini models:  {models.get('status')} ({detail})")
+    queries = report.get("queries", {})
+    lines.append(f"Queries:        {queries.get('candidates', 0)} candidates")
+    for key in ("warmed", "no_results", "failed", "skipped_allowance", "skipped_no_web_search"):
+        if queries.get(key):
+            lines.append(f"  {key:<22}{queries[key]}")
+    cache = report.get("search_cache", {})
+    if cache:
+        lines.append(
+            f"Search cache:   {cache['entries_before']} -> {cache['entries_after']} entries, "
+            f"{cache['cache_hits']} hits during warm-up"
+        )
+        lines.append(f"Live searches:  {cache['live_searches']} / {cache['search_query_allowance']} allowed")
+    if queries.get("top"):
+        lines.append("Top queries:")
+        for q in queries["top"]:
+            lines.append(f"  {q['count']:>4}x  {q['query']}")
+    lines.append(f"Duration:       {report.get('duration_seconds')}s")
+    return "\n".join(lines)
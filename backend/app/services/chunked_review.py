@@ -0,0 +1,262 @@
+"""
+Map-reduce review of long documents for LegalMitra
+
+Long agreements and judgments used to be cut at 25,000 characters before
+review. Here the full text is split at structural boundaries (sections,
+clauses, numbered paragraphs, pages, then blank-line paragraphs) into
+token-sized chunks. Each chunk is analysed concurrently under a provider
+concurrency cap (map), and the partial analyses are combined into one
+review (reduce). With REVIEW_ANALYSIS_CACHE_ENABLED (off by default, as
+the notes quote the document), chunk analyses are cached by content hash,
+so reviewing the same document again only pays for the final combine step.
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+from pathlib import Path
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Rough chars-per-token for English/Hindi legal text (no tokenizer dependency)
+CHARS_PER_TOKEN = 4
+
+# Bump when the map prompt changes so cached chunk analyses are not reused
+MAP_PROMPT_VERSION = "map-v1"
+
+ANALYSIS_LEVEL = "analysis"
+
+# Lines that start a new structural unit, strongest first
+_HEADING_RE = re.compile(
+    r"^\s*(?:"
+    r"--- Page \d+ ---"
+    r"|(?:SECTION|Section|ARTICLE|Article|CLAUSE|Clause|SCHEDULE|Schedule|CHAPTER|Chapter|PART|Part|ANNEXURE|Annexure)\s+[\dIVXLC]+[A-Z]?\b"
+    r"|\d{1,3}(?:\.\d{1,3})*[.)]\s+\S"
+    r"|\(?[a-z]\)\s+\S"
+    r"|[A-Z][A-Z &,'-]{6,}$"
+    r")"
+)
+_SENTENCE_END_RE = re.compile(r"(?<=[.;:?!])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _structural_units(text: str) -> List[str]:
+    """Split text into units that start at headings or blank-line paragraphs"""
+    units: List[str] = []
+    current: List[str] = []
+    for line in text.splitlines():
+        if current and (not line.strip() or _HEADING_RE.match(line)):
+            unit = "\n".join(current).strip()
+            if unit:
+                units.append(unit)
+            current = []
+        if line.strip():
+            current.append(line)
+    unit = "\n".join(current).strip()
+    if unit:
+        units.append(unit)
+    return units
+
+
+def _split_oversized(unit: str, max_chars: int) -> List[str]:
+    """Split a unit longer than max_chars at sentence ends, then hard-cut"""
+    pieces: List[str] = []
+    buffer = ""
+    for sentence in _SENTENCE_END_RE.split(unit):
+        while len(sentence) > max_chars:
+            if buffer:
+                pieces.append(buffer)
+                buffer = ""
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if buffer and len(buffer) + 1 + len(sentence) > max_chars:
+            pieces.append(buffer)
+            buffer = sentence
+        else:
+            buffer = f"{buffer} {sentence}" if buffer else sentence
+    if buffer:
+        pieces.append(buffer)
+    return pieces
+
+
+def split_document(text: str, max_tokens: int = 3000) -> List[str]:
+    """
+    Split a document into chunks of at most max_tokens at structural boundaries
+
+    Whole sections/clauses/paragraphs are packed greedily into a chunk; a unit
+    that alone exceeds the budget is split at sentence ends.
+
+    Args:
+        text: Full document text
+        max_tokens: Token budget per chunk
+
+    Returns:
+        Chunks in document order
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks: List[str] = []
+    current: List[str] = []
+    current_len = 0
+    for unit in _structural_units(text):
+        for piece in (_split_oversized(unit, max_chars) if len(unit) > max_chars else [unit]):
+            if current and current_len + 2 + len(piece) > max_chars:
+                chunks.append("\n\n".join(current))
+                current, current_len = [], 0
+            current.append(piece)
+            current_len += len(piece) + 2
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def _map_prompt(user_query: str, chunk: str, index: int, total: int) -> str:
+    return (
+        f"You are reviewing part {index} of {total} of a single legal document.\n"
+        f"The user's request for the whole document is: {user_query}\n\n"
+        "For THIS PART ONLY, extract in concise bullet points (maximum 250 words):\n"
+        "- parties, dates, amounts and case/section references that appear\n"
+        "- key facts, obligations, findings or holdings\n"
+        "- legal issues, risks or unusual clauses relevant to the request\n"
+        "Do not speculate about other parts. If the part is boilerplate, say so in one line.\n\n"
+        f"Document part {index}/{total}:\n{chunk}"
+    )
+
+
+def _reduce_prompt(user_query: str, analyses: List[str], total_chunks: int) -> str:
+    parts = "\n\n".join(
+        f"### Notes on part {i}\n{analysis}" for i, analysis in enumerate(analyses, 1)
+    )
+    return (
+        f"{user_query}\n\n"
+        f"The document was too long to read at once, so it was reviewed in {total_chunks} parts. "
+        "Below are notes on each part, in document order. Combine them into ONE coherent review "
+        "of the whole document that answers the request above. Merge duplicates, keep references "
+        "(sections, clauses, dates, amounts) precise, and flag inconsistencies between parts.\n\n"
+        f"{parts}\n\n"
+        "IMPORTANT: Keep your response concise. Maximum 800 words. Use numbered points. Do not exceed this limit."
+    )
+
+
+class ChunkedReviewer:
+    """Map-reduce document review with cached chunk analyses"""
+
+    def __init__(
+        self,
+        chunk_tokens: int = 3000,
+        max_chunks: int = 20,
+        concurrency: int = 3,
+        reduce_tokens: int = 12000,
+        cache=None
+    ):
+        """
+        Initialize the reviewer
+
+        Args:
+            chunk_tokens: Token budget per chunk
+            max_chunks: Chunks beyond this are not reviewed (bounds cost)
+            concurrency: Provider calls in flight during the map step
+            reduce_tokens: Budget for one combine prompt; more notes are
+                combined in groups first
+            cache: ExtractionCache used for chunk analyses (None = no reuse)
+        """
+        self.chunk_tokens = chunk_tokens
+        self.max_chunks = max_chunks
+        self.concurrency = max(1, concurrency)
+        self.reduce_tokens = reduce_tokens
+        self.cache = cache
+
+    def _cache_key(self, user_query: str, chunk: str) -> str:
+        payload = "\x00".join((MAP_PROMPT_VERSION, user_query.strip(), chunk))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def review(self, text: str, user_query: str, generate, answer=None) -> Dict[str, Any]:
+        """
+        Review a long document
+
+        Args:
+            text: Full extracted document text
+            user_query: What the user asked for
+            generate: async (prompt, query_type) -> str for the per-part
+                notes, e.g. ai_service.generate_text
+            answer: async (prompt, query_type) -> str for the final answer,
+                e.g. ai_service.process_legal_query (default: generate)
+
+        Returns:
+            Dict with analysis, chunks (reviewed), total_chunks, cached_chunks
+            and truncated (True if chunks beyond max_chunks were dropped)
+        """
+        all_chunks = split_document(text, self.chunk_tokens)
+        chunks = all_chunks[:self.max_chunks]
+        total = len(chunks)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        cached_count = 0
+
+        async def analyse(index: int, chunk: str) -> str:
+            nonlocal cached_count
+            key = self._cache_key(user_query, chunk)
+            if self.cache is not None:
+                cached = self.cache.get(key, ANALYSIS_LEVEL, source_bytes=len(chunk))
+                if cached:
+                    cached_count += 1
+                    return cached
+            async with semaphore:
+                analysis = await generate(_map_prompt(user_query, chunk, index, total), "summary")
+            if self.cache is not None and analysis:
+                self.cache.put(key, analysis, ANALYSIS_LEVEL)
+            return analysis
+
+        logger.info(f"Chunked review: {total} chunks (of {len(all_chunks)}), concurrency {self.concurrency}")
+        analyses = await asyncio.gather(*(analyse(i, c) for i, c in enumerate(chunks, 1)))
+        analysis = await self._reduce(list(analyses), user_query, total, generate, answer or generate)
+
+        return {
+            "analysis": analysis,
+            "chunks": total,
+            "total_chunks": len(all_chunks),
+            "cached_chunks": cached_count,
+            "truncated": len(all_chunks) > total,
+        }
+
+    async def _reduce(self, analyses: List[str], user_query: str, total: int, generate, answer) -> str:
+        """Combine partial analyses, in groups first if they exceed one prompt"""
+        while estimate_tokens("\n\n".join(analyses)) > self.reduce_tokens and len(analyses) > 1:
+            groups: List[List[str]] = [[]]
+            for analysis in analyses:
+                if groups[-1] and estimate_tokens("\n\n".join(groups[-1] + [analysis])) > self.reduce_tokens:
+                    groups.append([])
+                groups[-1].append(analysis)
+            if len(groups) == len(analyses):
+                # Each note alone fills a prompt; combine pairwise to make progress
+                groups = [analyses[i:i + 2] for i in range(0, len(analyses), 2)]
+            prompt_query = "Summarise these consecutive notes into one set of notes, keeping all references."
+            analyses = list(await asyncio.gather(*(
+                generate(_reduce_prompt(prompt_query, group, total), "summary") for group in groups
+            )))
+        return await answer(_reduce_prompt(user_query, analyses, total), "research")
+
+
+def _create_reviewer() -> ChunkedReviewer:
+    """Build the shared reviewer from settings"""
+    from app.core.config import get_settings
+    from app.services.extraction_cache import ExtractionCache
+    settings = get_settings()
+    return ChunkedReviewer(
+        chunk_tokens=settings.REVIEW_CHUNK_TOKENS,
+        max_chunks=settings.REVIEW_MAX_CHUNKS,
+        concurrency=settings.REVIEW_CONCURRENCY,
+        cache=ExtractionCache(
+            cache_dir=Path("data/review_cache"),
+            max_bytes=settings.REVIEW_ANALYSIS_CACHE_MAX_MB * 1024 * 1024,
+            enabled=settings.REVIEW_ANALYSIS_CACHE_ENABLED,
+        ),
+    )
+
+
+# Global chunked reviewer
+chunked_reviewer = _create_reviewer()
@@ -1,14 +1,54 @@
 """
 Cost Tracking Service for LegalMitra
 Tracks AI API usage and costs across all queries
+
+Usage records are appended to data/usage_history.jsonl, one JSON object
+per line. record_usage only updates memory and a write buffer; a
+background thread appends the buffer every FLUSH_INTERVAL_SECONDS (sooner
+once FLUSH_MAX_RECORDS are waiting), so an AI call never waits on disk
+and each record is written once instead of the whole history being
+rewritten per call. Unreadable lines (e.g. from a crash mid-write) are
+compacted away in the background by rewriting the log atomically. All
+history is kept unless USAGE_RETENTION_DAYS is set, in which case older
+records are dropped at compaction and query windows are clamped to it.
+The old usage_history.json is imported on first start.
+
+The dashboard queries are answered from per-day rollups (totals, per model
+and per query type) kept up to date by record_usage, so a window of N days
+sums at most N day buckets however many records it spans. Windows are the
+last N calendar days including today. Raw records are read only for the
+records view.
 """
 
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+import atexit
+import bisect
 import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
 from pydantic import BaseModel
 
+try:
+    import fcntl  # Serializes appends/compaction across worker processes (POSIX)
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Buffered records are appended at least this often
+FLUSH_INTERVAL_SECONDS = 1.0
+# ... or as soon as this many are waiting
+FLUSH_MAX_RECORDS = 256
+# With a retention period, compact once this share of the log has expired
+# (and at least COMPACT_MIN_RECORDS); unreadable lines are always compacted away
+COMPACT_DEAD_RATIO = 0.1
+COMPACT_MIN_RECORDS = 1000
+
 
 class UsageRecord(BaseModel):
     """Single usage record"""
@@ -24,24 +64,214 @@ class UsageRecord(BaseModel):
 class CostTracker:
     """Track and analyze AI API costs"""
 
-    def __init__(self):
-        self.data_dir = Path(__file__).parent.parent / "data"
-        self.data_dir.mkdir(exist_ok=True)
-        self.usage_file = self.data_dir / "usage_history.json"
+    def __init__(
+        self,
+        data_dir: Optional[Path] = None,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+        retention_days: Optional[int] = None,
+    ):
+        """
+        Initialize the tracker
+
+        Args:
+            data_dir: Directory of the usage log (default app/data)
+            flush_interval: Seconds between background appends
+            retention_days: Drop records older than this at compaction and
+                clamp query windows to it (None keeps all history)
+        """
+        self.data_dir = data_dir or Path(__file__).parent.parent / "data"
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.log_file = self.data_dir / "usage_history.jsonl"
+        self.legacy_file = self.data_dir / "usage_history.json"
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self._lock = threading.Lock()  # history and the write buffer
+        self._write_lock = threading.Lock()  # the log file, within this process
+        self._pending: List[Dict] = []
+        self._dead_lines = 0  # Unreadable lines in the log
+        self._wake = threading.Event()
+        self._stopping = False
+        self._writer: Optional[threading.Thread] = None
+        self.history: List[Dict] = []
+        self._daily: Dict[str, Dict] = {}  # "YYYY-MM-DD" -> rollup, oldest day first
         self._load_history()
+        atexit.register(self.shutdown)
+
+    @contextmanager
+    def _open_log(self, mode: str) -> Iterator[TextIO]:
+        """
+        Open the log under an exclusive lock shared with other processes
+
+        Reopens if the file was replaced (compacted) while waiting for the lock.
+        """
+        while True:
+            f = open(self.log_file, mode, encoding="utf-8")
+            if fcntl is None:
+                break
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                if os.fstat(f.fileno()).st_ino == os.stat(self.log_file).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            f.close()
+        try:
+            yield f
+        finally:
+            f.close()  # Releases the lock
 
     def _load_history(self):
-        """Load usage history from file"""
-        if self.usage_file.exists():
-            with open(self.usage_file, 'r') as f:
-                self.history = json.load(f)
-        else:
-            self.history = []
+        """Load usage history from the log (importing the old JSON file once)"""
+        if not self.log_file.exists() and self.legacy_file.exists():
+            try:
+                with open(self.legacy_file, 'r') as f:
+                    legacy = json.load(f)
+                self._write_log(legacy if isinstance(legacy, list) else [])
+                logger.info(f"Imported {len(legacy)} usage records from {self.legacy_file.name}")
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not import {self.legacy_file}: {e}")
+        if not self.log_file.exists():
+            return
+
+        with self._open_log("a+") as f:
+            f.seek(0)
+            data = f.read()
+            if data and not data.endswith("\n"):
+                # Torn final write: drop the partial line
+                f.truncate(data.rfind("\n") + 1)
+                data = data[:data.rfind("\n") + 1]
+        for line in data.splitlines():
+            try:
+                self.history.append(json.loads(line))
+            except ValueError:
+                self._dead_lines += 1
+        # Appends from several processes can interleave slightly out of order
+        self.history.sort(key=lambda r: r["timestamp"])
+        for record in self.history:
+            self._add_to_rollups(record)
+        if self._compaction_due():
+            self._ensure_writer()
+
+    def _write_log(self, records: List[Dict]):
+        """Atomically replace the log with records"""
+        tmp_path = self.log_file.with_suffix(".jsonl.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(r, separators=(",", ":")) + "\n" for r in records)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.log_file)
+
+    def _ensure_writer(self):
+        if self._writer is None or not self._writer.is_alive():
+            with self._lock:
+                if self._writer is None or not self._writer.is_alive():
+                    self._stopping = False
+                    self._writer = threading.Thread(target=self._writer_loop, name="cost-tracker-writer", daemon=True)
+                    self._writer.start()
+
+    def _writer_loop(self):
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                if self._compaction_due():
+                    self.compact()
+            except Exception as e:
+                logger.error(f"Usage log write failed: {e}", exc_info=True)
+
+    def flush(self) -> int:
+        """
+        Append buffered records to the log
 
-    def _save_history(self):
-        """Save usage history to file"""
-        with open(self.usage_file, 'w') as f:
-            json.dump(self.history, f, indent=2)
+        Returns:
+            Number of records written
+        """
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return 0
+            data = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in pending)
+            try:
+                with self._open_log("a") as f:
+                    f.write(data)
+            except OSError:
+                with self._lock:
+                    self._pending[:0] = pending  # Retry on the next flush
+                raise
+            return len(pending)
+
+    def _retention_cutoff(self) -> str:
+        """Timestamp before which records have expired ("" without a retention period)"""
+        if self.retention_days is None:
+            return ""
+        return (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+
+    def _expired_count(self) -> int:
+        """Records in history older than the retention period (history is time-ordered)"""
+        cutoff = self._retention_cutoff()
+        if not cutoff:
+            return 0
+        return bisect.bisect_left(self.history, cutoff, key=lambda r: r["timestamp"])
+
+    def _compaction_due(self) -> bool:
+        if self._dead_lines:
+            return True
+        expired = self._expired_count()
+        return expired >= COMPACT_MIN_RECORDS and expired >= COMPACT_DEAD_RATIO * len(self.history)
+
+    def _clamp_days(self, days: int) -> int:
+        """Query windows never reach past the retention period"""
+        return days if self.retention_days is None else min(days, self.retention_days)
+
+    def compact(self) -> int:
+        """
+        Rewrite the log without unreadable lines (and expired records, with
+        a retention period)
+
+        Other processes' appends are kept: the file itself is re-read under
+        the log lock and replaced atomically.
+
+        Returns:
+            Number of lines dropped
+        """
+        cutoff = self._retention_cutoff()
+        with self._write_lock:
+            with self._open_log("a+") as f:
+                f.seek(0)
+                kept, dropped = [], 0
+                for line in f.read().splitlines():
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        dropped += 1
+                        continue
+                    if record.get("timestamp", "") >= cutoff:
+                        kept.append(record)
+                    else:
+                        dropped += 1
+                self._write_log(kept)
+            with self._lock:
+                del self.history[:self._expired_count()]
+                self._dead_lines = 0
+                first_day = self.history[0]["timestamp"][:10] if self.history else None
+                for day in [day for day in self._daily if first_day is None or day < first_day]:
+                    del self._daily[day]
+        if dropped:
+            logger.info(f"Compacted usage log: dropped {dropped} expired or unreadable lines, kept {len(kept)}")
+        return dropped
+
+    def shutdown(self):
+        """Stop the background writer and write out buffered records"""
+        self._stopping = True
+        self._wake.set()
+        if self._writer is not None:
+            self._writer.join(timeout=5)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Could not write buffered usage records: {e}")
 
     def record_usage(
         self,
@@ -63,19 +293,70 @@ class CostTracker:
             "query_length": query_length
         }
 
-        self.history.append(record)
-        self._save_history()
+        with self._lock:
+            self.history.append(record)
+            self._add_to_rollups(record)
+            self._pending.append(record)
+            if len(self._pending) >= FLUSH_MAX_RECORDS:
+                self._wake.set()
+        self._ensure_writer()
+
+    def _add_to_rollups(self, record: Dict):
+        """Add a record to its day's totals (caller holds the lock or owns the tracker)"""
+        date_str = record["timestamp"][:10]  # YYYY-MM-DD
+        day = self._daily.get(date_str)
+        if day is None:
+            day = self._daily[date_str] = {"queries": 0, "tokens": 0, "cost_usd": 0.0, "models": {}, "query_types": {}}
+        tokens = record.get("tokens_used", 0)
+        cost = record.get("cost_usd", 0.0)
+        day["queries"] += 1
+        day["tokens"] += tokens
+        day["cost_usd"] += cost
+
+        model_id = record.get("model_id", "unknown")
+        model = day["models"].get(model_id)
+        if model is None:
+            model = day["models"][model_id] = {
+                "model_name": record.get("model_name", model_id), "queries": 0, "total_tokens": 0, "total_cost_usd": 0.0
+            }
+        model["queries"] += 1
+        model["total_tokens"] += tokens
+        model["total_cost_usd"] += cost
+
+        qtype = record.get("query_type", "unknown")
+        by_type = day["query_types"].get(qtype)
+        if by_type is None:
+            by_type = day["query_types"][qtype] = {"queries": 0, "total_cost_usd": 0.0}
+        by_type["queries"] += 1
+        by_type["total_cost_usd"] += cost
+
+    @staticmethod
+    def _window_start(days: int) -> datetime:
+        """Midnight of the first of the last `days` calendar days (today counts as one)"""
+        first_day = datetime.now().date() - timedelta(days=days - 1)
+        return datetime.combine(first_day, datetime.min.time())
+
+    def _days_in_window(self, days: int) -> List[Tuple[str, Dict]]:
+        """
+        (date, rollup) of the last `days` calendar days, oldest first
+
+        Call with the lock held; the rollups are live.
+        """
+        first_day = self._window_start(days).date().isoformat()
+        return [(date_str, day) for date_str, day in self._daily.items() if date_str >= first_day]
 
     def get_usage_stats(self, days: int = 30) -> Dict:
         """Get usage statistics for last N days"""
-        cutoff_date = datetime.now() - timedelta(days=days)
+        days = self._clamp_days(days)
+        period_start = self._window_start(days)
 
-        filtered = [
-            r for r in self.history
-            if datetime.fromisoformat(r["timestamp"]) >= cutoff_date
-        ]
+        with self._lock:
+            window = self._days_in_window(days)
+            total_queries = sum(day["queries"] for _, day in window)
+            total_tokens = sum(day["tokens"] for _, day in window)
+            total_cost = sum(day["cost_usd"] for _, day in window)
 
-        if not filtered:
+        if not total_queries:
             return {
                 "total_queries": 0,
                 "total_tokens": 0,
@@ -84,45 +365,37 @@ class CostTracker:
                 "period_days": days
             }
 
-        total_cost = sum(r["cost_usd"] for r in filtered)
-        total_tokens = sum(r["tokens_used"] for r in filtered)
-
         return {
-            "total_queries": len(filtered),
+            "total_queries": total_queries,
             "total_tokens": total_tokens,
             "total_cost_usd": round(total_cost, 4),
-            "average_cost_per_query": round(total_cost / len(filtered), 4) if filtered else 0,
-            "average_tokens_per_query": int(total_tokens / len(filtered)) if filtered else 0,
+            "average_cost_per_query": round(total_cost / total_queries, 4),
+            "average_tokens_per_query": int(total_tokens / total_queries),
             "period_days": days,
-            "period_start": cutoff_date.isoformat(),
+            "period_start": period_start.isoformat(),
             "period_end": datetime.now().isoformat()
         }
 
     def get_cost_by_model(self, days: int = 30) -> List[Dict]:
         """Get cost breakdown by model"""
-        cutoff_date = datetime.now() - timedelta(days=days)
-
-        filtered = [
-            r for r in self.history
-            if datetime.fromisoformat(r["timestamp"]) >= cutoff_date
-        ]
-
+        days = self._clamp_days(days)
         # Group by model
         by_model = {}
-        for record in filtered:
-            model_id = record["model_id"]
-            if model_id not in by_model:
-                by_model[model_id] = {
-                    "model_id": model_id,
-                    "model_name": record["model_name"],
-                    "queries": 0,
-                    "total_tokens": 0,
-                    "total_cost_usd": 0
-                }
-
-            by_model[model_id]["queries"] += 1
-            by_model[model_id]["total_tokens"] += record["tokens_used"]
-            by_model[model_id]["total_cost_usd"] += record["cost_usd"]
+        with self._lock:
+            for _, day in self._days_in_window(days):
+                for model_id, model in day["models"].items():
+                    if model_id not in by_model:
+                        by_model[model_id] = {
+                            "model_id": model_id,
+                            "model_name": model["model_name"],
+                            "queries": 0,
+                            "total_tokens": 0,
+                            "total_cost_usd": 0
+                        }
+
+                    by_model[model_id]["queries"] += model["queries"]
+                    by_model[model_id]["total_tokens"] += model["total_tokens"]
+                    by_model[model_id]["total_cost_usd"] += model["total_cost_usd"]
 
         # Convert to list and round costs
         result = []
@@ -140,26 +413,21 @@ class CostTracker:
 
     def get_cost_by_query_type(self, days: int = 30) -> List[Dict]:
         """Get cost breakdown by query type"""
-        cutoff_date = datetime.now() - timedelta(days=days)
-
-        filtered = [
-            r for r in self.history
-            if datetime.fromisoformat(r["timestamp"]) >= cutoff_date
-        ]
-
+        days = self._clamp_days(days)
         # Group by query type
         by_type = {}
-        for record in filtered:
-            qtype = record["query_type"]
-            if qtype not in by_type:
-                by_type[qtype] = {
-                    "query_type": qtype,
-                    "queries": 0,
-                    "total_cost_usd": 0
-                }
-
-            by_type[qtype]["queries"] += 1
-            by_type[qtype]["total_cost_usd"] += record["cost_usd"]
+        with self._lock:
+            for _, day in self._days_in_window(days):
+                for qtype, totals in day["query_types"].items():
+                    if qtype not in by_type:
+                        by_type[qtype] = {
+                            "query_type": qtype,
+                            "queries": 0,
+                            "total_cost_usd": 0
+                        }
+
+                    by_type[qtype]["queries"] += totals["queries"]
+                    by_type[qtype]["total_cost_usd"] += totals["total_cost_usd"]
 
         # Convert to list
         result = []
@@ -176,34 +444,17 @@ class CostTracker:
 
     def get_daily_costs(self, days: int = 30) -> List[Dict]:
         """Get daily cost breakdown"""
-        cutoff_date = datetime.now() - timedelta(days=days)
-
-        filtered = [
-            r for r in self.history
-            if datetime.fromisoformat(r["timestamp"]) >= cutoff_date
-        ]
-
-        # Group by date
-        by_date = {}
-        for record in filtered:
-            date_str = record["timestamp"][:10]  # YYYY-MM-DD
-            if date_str not in by_date:
-                by_date[date_str] = {
+        days = self._clamp_days(days)
+        with self._lock:
+            result = [
+                {
                     "date": date_str,
-                    "queries": 0,
-                    "cost_usd": 0,
-                    "tokens": 0
+                    "queries": day["queries"],
+                    "cost_usd": round(day["cost_usd"], 4),
+                    "tokens": day["tokens"]
                 }
-
-            by_date[date_str]["queries"] += 1
-            by_date[date_str]["cost_usd"] += record["cost_usd"]
-            by_date[date_str]["tokens"] += record["tokens_used"]
-
-        # Convert to list
-        result = []
-        for stats in by_date.values():
-            stats["cost_usd"] = round(stats["cost_usd"], 4)
-            result.append(stats)
+                for date_str, day in self._days_in_window(days)
+            ]
 
         result.sort(key=lambda x: x["date"])
 
@@ -214,6 +465,7 @@ class CostTracker:
         Compare LegalMitra costs with VIDUR subscription cost
         VIDUR estimated at $50-100/month
         """
+        days = self._clamp_days(days)
         stats = self.get_usage_stats(days)
 
         # Extrapolate to monthly if days != 30
@@ -263,8 +515,15 @@ class CostTracker:
 
     def get_all_records(self, limit: int = 100) -> List[Dict]:
         """Get recent usage records"""
-        return self.history[-limit:] if len(self.history) > limit else self.history
+        return self.history[-limit:] if len(self.history) > limit else list(self.history)
+
+
+def _create_cost_tracker() -> CostTracker:
+    """Build the shared tracker from settings"""
+    from app.core.config import get_settings
+    settings = get_settings()
+    return CostTracker(retention_days=settings.USAGE_RETENTION_DAYS)
 
 
 # Singleton instance
-cost_tracker = CostTracker()
+cost_tracker = _create_cost_tracker()
@@ -3,10 +3,8 @@ Document Processor Service
 Handles extraction of text from various document formats
 """
 
-import io
-import sys
-import os
-from typing import Optional
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
 
 # PDF processing
 try:
@@ -35,15 +33,9 @@ try:
 except ImportError:
     PIL_AVAILABLE = False
 
-try:
-    import pytesseract
-    TESSERACT_AVAILABLE = True
-except ImportError:
-    TESSERACT_AVAILABLE = False
-
 # PDF to image conversion (for image-based PDFs)
 try:
-    from pdf2image import convert_from_bytes
+    import pdf2image  # noqa: F401
     PDF2IMAGE_AVAILABLE = True
 except ImportError:
     PDF2IMAGE_AVAILABLE = False
@@ -53,266 +45,193 @@ except ImportError:
 # The gemini_ocr utility handles the actual API calls using the new SDK
 
 try:
-    from openai import OpenAI
+    from openai import AsyncOpenAI
     OPENAI_VISION_AVAILABLE = True
 except Exception:
     OPENAI_VISION_AVAILABLE = False
 
 from app.core.config import get_settings
+from app.services.pdf_extraction import (
+    pdf_extractor, extract_pages_pypdf2, merge_page_texts, native_text_length, page_needs_ocr
+)
+from app.services.pdf_ocr import ocr_pdf_streaming, ocr_dpi_for_page
+from app.services.extraction_cache import extraction_cache, content_hash, PAGE_LEVEL
+from app.services.extraction_workers import extraction_workers
+from app.services.ocr_toolchain import ocr_toolchain
+from app.services.local_ocr import local_ocr, LOCAL_FIRST, REMOTE_FIRST
+from app.services.upload_spool import BytesLike, open_binary
+from app.services.docx_extraction import extract_docx_text
 import base64
 import logging
 
 
 class DocumentProcessor:
-    """Service for processing and extracting text from various document formats"""
+    """
+    Service for processing and extracting text from various document formats
+    
+    Blocking CPU work (parsing, rendering) lives in synchronous extract_*
+    methods that run on the dedicated extraction worker pool, and local
+    Tesseract OCR runs in its own process pool (local_ocr); the async
+    process_* methods orchestrate them and await the vision APIs directly.
+    """
     
     def __init__(self):
         self.settings = get_settings()
+        self._openai_client = None
     
-    async def process_pdf(self, file_content: bytes) -> str:
-        """Extract text from PDF file"""
-        logger = logging.getLogger(__name__)
+    def _get_openai_client(self):
+        """Shared async OpenAI client for vision OCR"""
+        if self._openai_client is None:
+            self._openai_client = AsyncOpenAI(api_key=self.settings.OPENAI_API_KEY)
+        return self._openai_client
+    
+    def extract_pdf_pages(
+        self, file_content: BytesLike, file_path: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Extract the native text layer of every PDF page (blocking, CPU-bound)
         
-        if not PDF_AVAILABLE and not PDF_PLUMBER_AVAILABLE:
-            raise Exception("PDF processing libraries not available. Please install PyPDF2 or pdfplumber.")
+        Args:
+            file_content: PDF content (bytes or a zero-copy view)
+            file_path: Optional file with the same content (used by the process pool)
         
-        pdf_file = io.BytesIO(file_content)
-        text_parts = []
+        Returns:
+            (pages, last_error): page dicts (number, text, width, height, images)
+            and the last parser error, if any
+        """
+        logger = logging.getLogger(__name__)
+        pages = []
         last_error = None
         
         # Try pdfplumber first (better text extraction)
         if PDF_PLUMBER_AVAILABLE:
             try:
-                pdf_file.seek(0)  # Reset file pointer
-                with pdfplumber.open(pdf_file) as pdf:
-                    for page_num, page in enumerate(pdf.pages, 1):
-                        try:
-                            page_text = page.extract_text()
-                            if page_text and page_text.strip():
-                                text_parts.append(page_text)
-                        except Exception as page_error:
-                            logger.warning(f"Error extracting text from page {page_num} with pdfplumber: {page_error}")
-                            continue
-                
-                if text_parts:
-                    extracted_text = "\n\n".join(text_parts)
-                    # Check if extracted text is meaningful (not just metadata/whitespace)
-                    # If text is too short (< 50 chars), it might be just metadata, try OCR
-                    if extracted_text.strip() and len(extracted_text.strip()) >= 50:
-                        return extracted_text
-                    else:
-                        logger.info(f"Extracted text too short ({len(extracted_text.strip())} chars), likely metadata. Will try OCR.")
-                        text_parts = []  # Clear to trigger OCR
+                # Large PDFs are split across a process pool, small ones run serially
+                pages = pdf_extractor.extract_pages(file_content, path=file_path)
             except Exception as e:
                 last_error = f"pdfplumber error: {str(e)}"
                 logger.warning(f"pdfplumber failed: {last_error}")
         
-        # Fallback to PyPDF2 if pdfplumber failed or returned no text
-        if PDF_AVAILABLE and not text_parts:
+        # Fallback to PyPDF2 if pdfplumber failed or returned no meaningful text
+        if PDF_AVAILABLE and native_text_length(pages) < 50:
             try:
-                pdf_file.seek(0)  # Reset file pointer
-                pdf_reader = PyPDF2.PdfReader(pdf_file)
-                for page_num, page in enumerate(pdf_reader.pages, 1):
-                    try:
-                        text = page.extract_text()
-                        if text and text.strip():
-                            text_parts.append(text)
-                    except Exception as page_error:
-                        logger.warning(f"Error extracting text from page {page_num} with PyPDF2: {page_error}")
-                        continue
-                
-                if text_parts:
-                    extracted_text = "\n\n".join(text_parts)
-                    # Check if extracted text is meaningful (not just metadata/whitespace)
-                    # If text is too short (< 50 chars), it might be just metadata, try OCR
-                    if extracted_text.strip() and len(extracted_text.strip()) >= 50:
-                        return extracted_text
-                    else:
-                        logger.info(f"Extracted text too short ({len(extracted_text.strip())} chars), likely metadata. Will try OCR.")
-                        text_parts = []  # Clear to trigger OCR
+                pypdf_pages = extract_pages_pypdf2(file_content)
+                if not pages or native_text_length(pypdf_pages) > native_text_length(pages):
+                    pages = pypdf_pages
             except Exception as e:
                 last_error = f"PyPDF2 error: {str(e)}"
                 logger.warning(f"PyPDF2 failed: {last_error}")
         
-        # If no text was extracted, try OCR on image-based PDF
-        # Convert PDF pages to images and use Gemini OCR
+        return pages, last_error
+    
+    async def process_pdf(
+        self, file_content: BytesLike, file_path: Optional[str] = None, report: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Extract text from PDF file
+        
+        Args:
+            file_content: PDF content (bytes, or a zero-copy view of a spooled upload)
+            file_path: Optional file with the same content; lets workers and
+                pdftoppm read it from disk instead of copying the bytes
+            report: Optional dict; 'complete' is set to False when the text is
+                a fallback (an OCR page failed or was low-confidence, or only
+                the native text layer could be returned) and should not be cached
+        """
+        logger = logging.getLogger(__name__)
+        report = report if report is not None else {}
+        report['complete'] = True
+        
+        if not PDF_AVAILABLE and not PDF_PLUMBER_AVAILABLE:
+            raise Exception("PDF processing libraries not available. Please install PyPDF2 or pdfplumber.")
+        
+        pages, last_error = await extraction_workers.run(self.extract_pdf_pages, file_content, file_path)
+        
+        # Classify pages by text-layer density: keep native text, OCR only scanned pages
+        native_text = merge_page_texts(pages)
+        if pages:
+            ocr_page_numbers = [page["number"] for page in pages if page_needs_ocr(page)]
+            if not ocr_page_numbers and len(native_text.strip()) < 50:
+                # Text too short (< 50 chars), likely just metadata: OCR everything
+                logger.info(f"Extracted text too short ({len(native_text.strip())} chars), likely metadata. Will try OCR.")
+                ocr_page_numbers = [page["number"] for page in pages]
+            if not ocr_page_numbers:
+                return native_text
+        else:
+            # No readable page structure: OCR every page
+            ocr_page_numbers = None
+        
+        # OCR the image-only pages (or the whole PDF if it could not be parsed)
         ocr_error_msg = None  # Store OCR error if it occurs
         ocr_attempted = False  # Track if OCR was attempted
-        if not text_parts and PDF2IMAGE_AVAILABLE and PIL_AVAILABLE:
+        if PDF2IMAGE_AVAILABLE and PIL_AVAILABLE:
             ocr_attempted = True
             try:
-                logger.info("No text extracted from PDF. Attempting OCR on image-based PDF...")
-                pdf_file.seek(0)
-                
-                # Check if Poppler is available (required for pdf2image on Windows)
-                try:
-                    import subprocess
-                    import shutil
-                    
-                    # First, try to find pdftoppm in PATH
-                    pdftoppm_path = shutil.which('pdftoppm')
-                    
-                    if not pdftoppm_path:
-                        # Try common Windows installation paths
-                        common_paths = [
-                            r"C:\Program Files\poppler\Library\bin\pdftoppm.exe",
-                            r"C:\poppler\Library\bin\pdftoppm.exe",
-                            r"C:\Program Files (x86)\poppler\Library\bin\pdftoppm.exe",
-                        ]
-                        
-                        for path in common_paths:
-                            if os.path.exists(path):
-                                pdftoppm_path = path
-                                # Temporarily add to PATH for this process
-                                bin_dir = os.path.dirname(path)
-                                os.environ['PATH'] = bin_dir + os.pathsep + os.environ.get('PATH', '')
-                                logger.info(f"Found Poppler at: {bin_dir}, added to PATH for this session")
-                                break
-                    
-                    if pdftoppm_path:
-                        # Test if it works
-                        result = subprocess.run(
-                            [pdftoppm_path, '-h'], 
-                            capture_output=True, 
-                            text=True, 
-                            timeout=2,
-                            creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
-                        )
-                        if result.returncode != 0 and 'pdftoppm' not in result.stdout and 'pdftoppm' not in result.stderr:
-                            raise FileNotFoundError("pdftoppm command not working correctly")
-                    else:
-                        raise FileNotFoundError("pdftoppm command not found")
-                        
-                except (FileNotFoundError, subprocess.TimeoutExpired, OSError) as e:
-                    ocr_error_msg = f"Poppler is not installed or not in PATH. pdf2image requires Poppler to convert PDF pages to images. Error: {str(e)}"
-                    logger.error(ocr_error_msg)
-                    
-                    # Check if Poppler exists in common paths but not in PATH
-                    common_bin_paths = [
-                        r"C:\Program Files\poppler\Library\bin",
-                        r"C:\poppler\Library\bin",
-                    ]
-                    
-                    found_path = None
-                    for path in common_bin_paths:
-                        if os.path.exists(os.path.join(path, "pdftoppm.exe")):
-                            found_path = path
-                            break
-                    
-                    if found_path:
-                        ocr_error_msg += f"\n\n[SOLUTION] Poppler is installed at: {found_path}\n"
-                        ocr_error_msg += "But it's not in your system PATH. Restart your server after adding it to PATH:\n"
-                        ocr_error_msg += f"1. Add this to PATH: {found_path}\n"
-                        ocr_error_msg += "2. Restart your server/terminal for PATH changes to take effect."
-                    
-                    raise Exception(ocr_error_msg)
+                if ocr_page_numbers is None:
+                    logger.info("No text extracted from PDF. Attempting OCR on image-based PDF...")
+                else:
+                    logger.info(f"{len(ocr_page_numbers)} of {len(pages)} pages have no text layer. Attempting OCR on those pages...")
                 
-                # Convert PDF pages to images
-                images = convert_from_bytes(file_content, dpi=300)  # Higher DPI for better OCR quality
-                logger.info(f"Converted PDF to {len(images)} page images")
+                # Poppler (required by pdf2image) is discovered once and cached
+                if not ocr_toolchain.capabilities()['poppler']['available']:
+                    raise Exception(ocr_toolchain.poppler_error())
                 
-                # Extract text from each page image
+                # Render and OCR pages in a bounded streaming pipeline
                 # Try Gemini OCR first, fallback to OpenAI Vision if available
-                page_texts = []
-                use_openai_fallback = False
-                
-                # Try Gemini OCR first
-                try:
-                    from app.utils.gemini_ocr import extract_text_from_image
-                    gemini_available = True
-                except ImportError:
-                    gemini_available = False
+                gemini_available = 'gemini' in ocr_toolchain.vision_engines()
+                if not gemini_available:
                     logger.warning("Gemini OCR not available, will try OpenAI Vision if configured")
                 
-                for page_num, image in enumerate(images, 1):
-                    try:
-                        # Convert PIL Image to bytes
-                        img_byte_arr = io.BytesIO()
-                        image.save(img_byte_arr, format='PNG')
-                        img_bytes = img_byte_arr.getvalue()
-                        
-                        page_text = None
-                        
-                        # Try Gemini OCR first (if available and not already failed)
-                        if gemini_available and not use_openai_fallback:
-                            try:
-                                logger.info(f"Processing page {page_num}/{len(images)} with Gemini OCR...")
-                                page_text = extract_text_from_image(img_bytes, mime_type="image/png")
-                                if page_text and page_text.strip():
-                                    page_texts.append(f"--- Page {page_num} ---\n{page_text}")
-                                    logger.info(f"Extracted {len(page_text)} characters from page {page_num} using Gemini")
-                                    continue
-                            except Exception as gemini_error:
-                                error_str = str(gemini_error).lower()
-                                # If Gemini fails due to API key issues, try OpenAI fallback
-                                if "leaked" in error_str or "permission_denied" in error_str or "403" in str(gemini_error) or "authentication" in error_str:
-                                    logger.warning(f"Gemini OCR failed on page {page_num}, trying OpenAI Vision fallback...")
-                                    use_openai_fallback = True
-                                    # Store error but continue to OpenAI fallback
-                                    if not ocr_error_msg:
-                                        ocr_error_msg = f"Gemini OCR failed: {str(gemini_error)}. Trying OpenAI Vision as fallback."
-                                else:
-                                    # Other Gemini errors - store and continue
-                                    if not ocr_error_msg:
-                                        ocr_error_msg = f"OCR error on page {page_num}: {str(gemini_error)}"
-                        
-                        # Fallback to OpenAI Vision if Gemini failed or not available
-                        if (use_openai_fallback or not gemini_available) and OPENAI_VISION_AVAILABLE and self.settings and self.settings.OPENAI_API_KEY:
-                            try:
-                                logger.info(f"Processing page {page_num}/{len(images)} with OpenAI Vision...")
-                                client = OpenAI(api_key=self.settings.OPENAI_API_KEY)
-                                image_base64 = base64.b64encode(img_bytes).decode('utf-8')
-                                
-                                response = client.chat.completions.create(
-                                    model="gpt-4o",
-                                    messages=[
-                                        {
-                                            "role": "user",
-                                            "content": [
-                                                {"type": "text", "text": "Extract all text from this legal document image. Preserve formatting and structure."},
-                                                {
-                                                    "type": "image_url",
-                                                    "image_url": {
-                                                        "url": f"data:image/png;base64,{image_base64}"
-                                                    }
-                                                }
-                                            ]
-                                        }
-                                    ],
-                                    max_tokens=4000
-                                )
-                                
-                                if response and response.choices and response.choices[0].message.content:
-                                    page_text = response.choices[0].message.content
-                                    if page_text and page_text.strip():
-                                        page_texts.append(f"--- Page {page_num} ---\n{page_text}")
-                                        logger.info(f"Extracted {len(page_text)} characters from page {page_num} using OpenAI Vision")
-                                        continue
-                            except Exception as openai_error:
-                                logger.error(f"OpenAI Vision also failed on page {page_num}: {openai_error}")
-                                if not ocr_error_msg or "Gemini" not in ocr_error_msg:
-                                    ocr_error_msg = f"Both Gemini and OpenAI Vision failed. Last error: {str(openai_error)}"
-                        
-                        # If no text extracted from this page
-                        if not page_text or not page_text.strip():
-                            logger.warning(f"No text extracted from page {page_num}")
-                            
-                    except Exception as page_error:
-                        logger.error(f"Error processing page {page_num} with OCR: {page_error}")
-                        if not ocr_error_msg:
-                            ocr_error_msg = f"OCR error on page {page_num}: {str(page_error)}"
-                        continue
+                ocr_state = {
+                    # Gemini batches only ever hold pages of this document
+                    'batch_key': uuid.uuid4().hex,
+                    'gemini_available': gemini_available,
+                    'use_openai_fallback': False,
+                    'error': None,
+                }
+                
+                async def ocr_page(img_bytes: bytes, page_num: int) -> Optional[str]:
+                    return await self._ocr_page_image(img_bytes, page_num, ocr_state)
+                
+                # Local Tesseract is CPU-bound: keep every pool worker busy
+                ocr_concurrency = self.settings.OCR_CONCURRENCY
+                if local_ocr.policy != REMOTE_FIRST and local_ocr.available():
+                    ocr_concurrency = max(ocr_concurrency, local_ocr.max_workers)
                 
-                if page_texts:
-                    extracted_text = "\n\n".join(page_texts)
-                    logger.info(f"Successfully extracted text from {len(page_texts)} pages using OCR")
-                    return extracted_text
+                # Oversized pages render at a lower DPI to stay within the A4 pixel budget
+                page_dpi = {
+                    page["number"]: ocr_dpi_for_page(page["width"], page["height"], self.settings.OCR_DPI)
+                    for page in pages
+                }
+                page_results = await ocr_pdf_streaming(
+                    file_content,
+                    ocr_page,
+                    page_numbers=ocr_page_numbers,
+                    dpi=self.settings.OCR_DPI,
+                    page_dpi=page_dpi,
+                    concurrency=ocr_concurrency,
+                    window=max(self.settings.OCR_PAGE_WINDOW, ocr_concurrency),
+                    run_blocking=extraction_workers.run,
+                    file_path=file_path,
+                )
+                ocr_error_msg = ocr_state['error']
+                if ocr_state.get('confidence'):
+                    logger.info(f"Tesseract confidence per page: {ocr_state['confidence']}")
+                ocr_success = sum(1 for text in page_results.values() if text and text.strip())
+                
+                if ocr_success:
+                    logger.info(f"Successfully extracted text from {ocr_success} of {len(page_results)} pages using OCR")
+                    report['complete'] = ocr_success == len(page_results) and not ocr_state.get('uncacheable_pages')
+                    return merge_page_texts(pages, page_results)
+                elif len(native_text.strip()) >= 50:
+                    logger.warning("OCR returned no text for the scanned pages; returning the native text layer only")
+                    report['complete'] = False
+                    return native_text
                 else:
                     logger.warning("OCR processing completed but no text was extracted from any page")
                     # If no text was extracted but no errors were raised, it might be an API issue
                     if not ocr_error_msg:
                         ocr_error_msg = "OCR processing completed but returned no text from any page. This could indicate an API key issue, empty pages, or API quota limit."
-                    
             except Exception as ocr_error:
                 ocr_error_msg = str(ocr_error)
                 logger.error(f"OCR fallback failed: {ocr_error_msg}")
@@ -320,6 +239,12 @@ class DocumentProcessor:
                 import traceback
                 logger.error(f"OCR error traceback: {traceback.format_exc()}")
         
+        # OCR failed or is unavailable: still return the pages that had a text layer
+        if len(native_text.strip()) >= 50:
+            logger.warning("OCR unavailable for the scanned pages; returning the native text layer only")
+            report['complete'] = False
+            return native_text
+        
         # If OCR also failed or is not available, raise an informative error
         error_msg = "Could not extract text from PDF. "
         if last_error:
@@ -395,14 +320,175 @@ class DocumentProcessor:
         
         raise Exception(error_msg)
     
-    async def process_word(self, file_content: bytes, file_extension: str) -> str:
+    async def _ocr_page_image(self, img_bytes: bytes, page_num: int, state: dict) -> Optional[str]:
+        """
+        OCR one rendered PDF page with Tesseract and/or the vision APIs (OCR_POLICY)
+        
+        Results are cached by the SHA-256 of the page image.
+        
+        Args:
+            img_bytes: PNG bytes of the page
+            page_num: 1-based page number (for logging)
+            state: Shared per-document state: batch_key (Gemini batch id
+                of this document), gemini_available, use_openai_fallback
+                (set once Gemini has an auth failure), error (first OCR
+                error message) and confidence (Tesseract confidence per page)
+        
+        Returns:
+            Page text, or None if no text was extracted
+        """
+        logger = logging.getLogger(__name__)
+        
+        # The same scanned page often appears in several bundles
+        page_key = content_hash(img_bytes)
+        cached_text = extraction_cache.get(page_key, PAGE_LEVEL, source_bytes=len(img_bytes))
+        if cached_text:
+            logger.info(f"Page {page_num}: using cached OCR text")
+            return cached_text
+        
+        page_text = await self._ocr_page_image_uncached(img_bytes, page_num, state)
+        if page_text and page_num not in state.get('uncacheable_pages', ()):
+            extraction_cache.put(page_key, page_text, PAGE_LEVEL)
+        return page_text
+    
+    async def _ocr_page_image_uncached(self, img_bytes: bytes, page_num: int, state: dict) -> Optional[str]:
+        """OCR one page image locally and/or via the vision APIs, per OCR_POLICY"""
+        logger = logging.getLogger(__name__)
+        policy = local_ocr.policy
+        local_result = None
+        
+        if policy != REMOTE_FIRST and local_ocr.available():
+            local_result = await self._ocr_page_image_local(img_bytes, page_num, state)
+            if local_result and (policy == LOCAL_FIRST or not local_ocr.is_low_confidence(local_result)):
+                return local_result['text']
+            if local_result:
+                logger.info(
+                    f"Page {page_num}: Tesseract confidence {local_result['confidence']:.0f} "
+                    f"below {local_ocr.min_confidence:.0f}, sending to vision OCR"
+                )
+        
+        page_text = await self._ocr_page_image_remote(img_bytes, page_num, state)
+        if page_text:
+            return page_text
+        
+        # Vision APIs failed or are not configured: fall back to Tesseract
+        if local_result is None and policy == REMOTE_FIRST and local_ocr.available():
+            local_result = await self._ocr_page_image_local(img_bytes, page_num, state)
+        if local_result:
+            if local_ocr.is_low_confidence(local_result):
+                # Better than nothing, but not worth caching over a later vision result
+                state.setdefault('uncacheable_pages', set()).add(page_num)
+            return local_result['text']
+        return None
+    
+    async def _ocr_page_image_local(self, img_bytes: bytes, page_num: int, state: dict) -> Optional[dict]:
+        """Tesseract OCR of one page; records its confidence in state['confidence']"""
+        logger = logging.getLogger(__name__)
+        try:
+            result = await local_ocr.ocr_image(img_bytes)
+        except Exception as tesseract_error:
+            logger.warning(f"Tesseract OCR failed on page {page_num}: {tesseract_error}")
+            if not state['error']:
+                state['error'] = f"Tesseract OCR error on page {page_num}: {str(tesseract_error)}"
+            return None
+        state.setdefault('confidence', {})[page_num] = result['confidence']
+        if not result['text'].strip():
+            return None
+        logger.info(f"Extracted {len(result['text'])} characters from page {page_num} using Tesseract (confidence {result['confidence']:.0f})")
+        return result
+    
+    async def _ocr_page_image_remote(self, img_bytes: bytes, page_num: int, state: dict) -> Optional[str]:
+        """OCR one page image via the vision APIs: Gemini first, OpenAI Vision as fallback"""
+        logger = logging.getLogger(__name__)
+        
+        # Try Gemini OCR first (if available and not already failed)
+        if state['gemini_available'] and not state['use_openai_fallback']:
+            try:
+                from app.utils.gemini_ocr import extract_text_from_image_async
+                logger.info(f"Processing page {page_num} with Gemini OCR...")
+                page_text = await extract_text_from_image_async(
+                    img_bytes, "image/png", batch_key=state.get('batch_key')
+                )
+                if page_text and page_text.strip():
+                    logger.info(f"Extracted {len(page_text)} characters from page {page_num} using Gemini")
+                    return page_text
+            except Exception as gemini_error:
+                error_str = str(gemini_error).lower()
+                # If Gemini fails due to API key issues, try OpenAI fallback
+                if "leaked" in error_str or "permission_denied" in error_str or "403" in str(gemini_error) or "authentication" in error_str:
+                    logger.warning(f"Gemini OCR failed on page {page_num}, trying OpenAI Vision fallback...")
+                    state['use_openai_fallback'] = True
+                    if not state['error']:
+                        state['error'] = f"Gemini OCR failed: {str(gemini_error)}. Trying OpenAI Vision as fallback."
+                elif not state['error']:
+                    state['error'] = f"OCR error on page {page_num}: {str(gemini_error)}"
+        
+        # Fallback to OpenAI Vision if Gemini failed or not available
+        if (state['use_openai_fallback'] or not state['gemini_available']) and OPENAI_VISION_AVAILABLE and self.settings and self.settings.OPENAI_API_KEY:
+            try:
+                logger.info(f"Processing page {page_num} with OpenAI Vision...")
+                client = self._get_openai_client()
+                image_base64 = base64.b64encode(img_bytes).decode('utf-8')
+                
+                response = await client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": [
+                                {"type": "text", "text": "Extract all text from this legal document image. Preserve formatting and structure."},
+                                {
+                                    "type": "image_url",
+                                    "image_url": {
+                                        "url": f"data:image/png;base64,{image_base64}"
+                                    }
+                                }
+                            ]
+                        }
+                    ],
+                    max_tokens=4000
+                )
+                
+                if response and response.choices and response.choices[0].message.content:
+                    page_text = response.choices[0].message.content
+                    if page_text.strip():
+                        logger.info(f"Extracted {len(page_text)} characters from page {page_num} using OpenAI Vision")
+                        return page_text
+            except Exception as openai_error:
+                logger.error(f"OpenAI Vision also failed on page {page_num}: {openai_error}")
+                if not state['error'] or "Gemini" not in state['error']:
+                    state['error'] = f"Both Gemini and OpenAI Vision failed. Last error: {str(openai_error)}"
+        
+        logger.warning(f"No text extracted from page {page_num}")
+        return None
+    
+    async def process_word(self, file_content: BytesLike, file_extension: str) -> str:
         """Extract text from Word document"""
+        return await extraction_workers.run(self.extract_word_text, file_content)
+    
+    def extract_word_text(self, file_content: BytesLike) -> str:
+        """
+        Extract paragraphs and table rows from a Word document (blocking, CPU-bound)
+        
+        word/document.xml is streamed (see docx_extraction), keeping reading
+        order with bounded memory; python-docx is the fallback for files the
+        streaming parser cannot read.
+        """
+        logger = logging.getLogger(__name__)
+        try:
+            text = extract_docx_text(file_content)
+            return text if text else "No text could be extracted from the document."
+        except Exception as e:
+            logger.warning(f"Streaming DOCX extraction failed, falling back to python-docx: {e}")
+        return self.extract_word_text_python_docx(file_content)
+    
+    def extract_word_text_python_docx(self, file_content: BytesLike) -> str:
+        """Extract paragraphs, then table rows, by loading the document with python-docx"""
         if not DOCX_AVAILABLE:
             raise Exception("Word document processing not available. Please install python-docx.")
         
         try:
-            docx_file = io.BytesIO(file_content)
-            doc = Document(docx_file)
+            doc = Document(open_binary(file_content))
             
             text_parts = []
             for paragraph in doc.paragraphs:
@@ -421,20 +507,48 @@ class DocumentProcessor:
         except Exception as e:
             raise Exception(f"Error processing Word document: {str(e)}")
     
-    async def process_image(self, file_content: bytes, filename: str) -> str:
-        """Extract text from image using OCR or AI vision"""
+    async def process_image(
+        self, file_content: BytesLike, filename: str, report: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Extract text from image using OCR or AI vision
+        
+        Args:
+            report: Optional dict; 'complete' is set to False when the text is
+                a low-confidence Tesseract fallback that should not be cached
+        """
         logger = logging.getLogger(__name__)
+        report = report if report is not None else {}
+        report['complete'] = True
         gemini_error = None
         openai_error = None
         last_error = None
         
+        capabilities = ocr_toolchain.capabilities()
+        local_result = None
+        
+        # Local Tesseract first unless the policy prefers the vision APIs
+        if local_ocr.policy != REMOTE_FIRST and local_ocr.available():
+            try:
+                local_result = await local_ocr.ocr_image(file_content)
+                logger.info(f"Tesseract OCR: {len(local_result['text'])} characters, confidence {local_result['confidence']:.0f}")
+                if local_result['text'].strip() and (
+                    local_ocr.policy == LOCAL_FIRST or not local_ocr.is_low_confidence(local_result)
+                ):
+                    return local_result['text']
+            except Exception as e:
+                last_error = f"OCR error: {str(e)}"
+                logger.warning(f"Tesseract OCR failed: {str(e)}")
+        
         # Try Gemini OCR utility first (recommended approach)
         try:
-            from app.utils.gemini_ocr import extract_text_from_image, get_mime_type_from_filename
+            if not capabilities['gemini']['available']:
+                raise ImportError("Gemini OCR not configured")
+            from app.utils.gemini_ocr import extract_text_from_image_async, get_mime_type_from_filename
             
             logger.info("Attempting Gemini OCR (using gemini_ocr utility)...")
             mime_type = get_mime_type_from_filename(filename)
-            extracted_text = extract_text_from_image(file_content, mime_type)
+            extracted_text = await extract_text_from_image_async(file_content, mime_type)
             logger.info(f"Gemini OCR successful: Extracted {len(extracted_text)} characters")
             return extracted_text
         except ImportError:
@@ -453,7 +567,7 @@ class DocumentProcessor:
         if OPENAI_VISION_AVAILABLE and self.settings:
             try:
                 if self.settings.OPENAI_API_KEY:
-                    client = OpenAI(api_key=self.settings.OPENAI_API_KEY)
+                    client = self._get_openai_client()
                     
                     # Convert image to base64
                     image_base64 = base64.b64encode(file_content).decode('utf-8')
@@ -463,7 +577,7 @@ class DocumentProcessor:
                     if filename.lower().endswith('.png'):
                         image_mime = "image/png"
                     
-                    response = client.chat.completions.create(
+                    response = await client.chat.completions.create(
                         model="gpt-4o",  # or gpt-4-vision-preview
                         messages=[
                             {
@@ -489,18 +603,18 @@ class DocumentProcessor:
                     last_error = f"OpenAI Vision API error: {str(e)}"
                 logger.warning(f"OpenAI vision failed: {str(e)}")
         
-        # Fallback to OCR using pytesseract
-        if TESSERACT_AVAILABLE and PIL_AVAILABLE:
+        # Fallback to local Tesseract OCR (or its low-confidence result from above)
+        if local_result is None and local_ocr.available():
             try:
-                image = Image.open(io.BytesIO(file_content))
-                text = pytesseract.image_to_string(image)
-                if text and text.strip():
-                    return text
-                else:
-                    raise Exception("OCR returned empty text")
+                local_result = await local_ocr.ocr_image(file_content)
             except Exception as e:
                 last_error = f"OCR error: {str(e)}"
                 logger.warning(f"OCR failed: {str(e)}")
+        if local_result is not None:
+            if local_result['text'].strip():
+                report['complete'] = not local_ocr.is_low_confidence(local_result)
+                return local_result['text']
+            last_error = "OCR error: OCR returned empty text"
         
         # If all methods failed, provide helpful error message
         logger.error(f"All image processing methods failed.")
@@ -0,0 +1,406 @@
+"""
+Local passage retrieval over uploaded documents for LegalMitra
+
+process_legal_query accepts relevant_cases, but they only ever came from the
+user. This index splits the extracted text of stored documents into
+passages (chunked_review.split_document) and represents each as a hashed
+TF-IDF vector: terms (words and word pairs) are hashed into a fixed number
+of signed dimensions, term frequency is log-scaled, and IDF is applied on
+the query side, so appending documents never requires re-weighting stored
+vectors. Vectors are unit length and live in one float32 file that is
+appended to and read through a NumPy memory map; a query is a single
+matrix-vector product followed by a top-k partition (cosine similarity).
+
+Passage text, document frequencies and bookkeeping are kept in SQLite
+(data/retrieval/chunks.db). The index follows document_storage
+incrementally: documents stored after the last sync are appended.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+from hashlib import blake2b
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from app.services.chunked_review import estimate_tokens, split_document
+
+logger = logging.getLogger(__name__)
+
+RETRIEVAL_DIR = Path("data/retrieval")
+
+# Passage size in tokens
+CHUNK_TOKENS = 250
+
+# Documents read from storage per sync batch
+SYNC_BATCH = 100
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were "
+    "which with shall any such under said been".split()
+)
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    row INTEGER PRIMARY KEY,
+    document_id TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    chunk_no INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_document ON chunks(document_id);
+CREATE TABLE IF NOT EXISTS term_df (
+    term TEXT PRIMARY KEY,
+    df INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS retrieval_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words (stopwords dropped) followed by adjacent word pairs"""
+    words = [word for word in _WORD_RE.findall(text.lower()) if word not in _STOPWORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+@lru_cache(maxsize=200_000)
+def _feature(term: str, dimensions: int) -> Tuple[int, float]:
+    """Dimension and sign a term is hashed to"""
+    value = int.from_bytes(blake2b(term.encode("utf-8"), digest_size=8).digest(), "big")
+    return value % dimensions, (1.0 if value >> 63 else -1.0)
+
+
+class DocumentRetrieval:
+    """Hashed TF-IDF passage index with a memory-mapped vector matrix"""
+
+    def __init__(self, directory: Path = RETRIEVAL_DIR, dimensions: int = 1024, enabled: bool = True):
+        """
+        Initialize the index
+
+        Args:
+            directory: Holds chunks.db and vectors.f32
+            dimensions: Hashed vector width (changing it rebuilds the index)
+            enabled: False turns retrieval off
+        """
+        self.directory = directory
+        self.dimensions = dimensions
+        self.enabled = enabled and NUMPY_AVAILABLE
+        self.db_path = directory / "chunks.db"
+        self.vectors_path = directory / "vectors.f32"
+        self._row_bytes = dimensions * 4
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._matrix_rows = 0
+        self._initialized = False
+
+    def _ensure_initialized(self):
+        """Create the files and drop vectors written without their chunk rows"""
+        if self._initialized:
+            return
+        with self._lock:
+            if self._initialized:
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with self._connect() as conn:
+                conn.executescript(_SCHEMA)
+                stored = conn.execute("SELECT value FROM retrieval_meta WHERE key = 'dimensions'").fetchone()
+                rows = conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+                vector_rows = self._vector_rows()
+                if (stored and int(stored[0]) != self.dimensions) or vector_rows < rows:
+                    logger.warning("Retrieval index does not match its vectors or dimensions, rebuilding")
+                    conn.execute("DELETE FROM chunks")
+                    conn.execute("DELETE FROM term_df")
+                    conn.execute("DELETE FROM retrieval_meta")
+                    rows = 0
+                conn.execute(
+                    "INSERT OR REPLACE INTO retrieval_meta (key, value) VALUES ('dimensions', ?)",
+                    (str(self.dimensions),)
+                )
+                self._truncate_vectors(rows)
+            self._initialized = True
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Short-lived connection that commits on success and always closes"""
+        conn = sqlite3.connect(str(self.db_path), timeout=10)
+        try:
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _vector_rows(self) -> int:
+        try:
+            return self.vectors_path.stat().st_size // self._row_bytes
+        except OSError:
+            return 0
+
+    def _truncate_vectors(self, rows: int):
+        """Cut the vector file to `rows` rows (leftovers of an interrupted append)"""
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(rows * self._row_bytes)
+
+    def _open_matrix(self):
+        """Memory map of all stored vectors (remapped when the file grew)"""
+        rows = self._vector_rows()
+        if rows != self._matrix_rows or self._matrix is None:
+            self._matrix = np.memmap(
+                self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dimensions)
+            ) if rows else None
+            self._matrix_rows = rows
+        return self._matrix
+
+    def _passage_vector(self, terms: List[str]) -> "np.ndarray":
+        """Unit vector of log-scaled term frequencies"""
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for term, count in Counter(terms).items():
+            index, sign = _feature(term, self.dimensions)
+            vector[index] += sign * (1.0 + math.log(count))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def add_document(self, document_id: str, title: str, text: str) -> int:
+        """
+        Append a document's passages to the index
+
+        Args:
+            document_id: Stored document id
+            title: Shown with its passages
+            text: Extracted text
+
+        Returns:
+            Passages added (0 if disabled, empty or already indexed)
+        """
+        if not self.enabled:
+            return 0
+        self._ensure_initialized()
+        return self._append([(document_id, title, text)])
+
+    def _append(self, documents: List[Tuple[str, str, str]], storage_rowid: Optional[int] = None) -> int:
+        """
+        Append (document_id, title, text) items in one transaction and one vector write
+
+        Args:
+            storage_rowid: Last document_storage row covered, recorded as synced
+
+        Returns:
+            Passages added
+        """
+        items = []
+        for document_id, title, text in documents:
+            for chunk_no, passage in enumerate(p for p in split_document(text, CHUNK_TOKENS) if p.strip()):
+                items.append((document_id, title, chunk_no, passage, tokenize(passage)))
+
+        with self._lock, self._connect() as conn:
+            # Serializes appenders across processes: row numbers come from the table
+            conn.execute("BEGIN IMMEDIATE")
+            if storage_rowid is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO retrieval_meta (key, value) VALUES ('storage_rowid', ?)",
+                    (str(storage_rowid),)
+                )
+            document_ids = sorted({item[0] for item in items})
+            indexed = {row[0] for row in conn.execute(
+                f"SELECT DISTINCT document_id FROM chunks WHERE document_id IN ({', '.join('?' * len(document_ids))})",
+                document_ids
+            )} if document_ids else set()
+            items = [item for item in items if item[0] not in indexed]
+            if not items:
+                return 0
+            vectors = np.stack([self._passage_vector(item[4]) for item in items])
+            document_frequency = Counter(term for item in items for term in set(item[4]))
+
+            start = conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+            self._truncate_vectors(start)
+            with open(self.vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            conn.executemany(
+                "INSERT INTO chunks (row, document_id, title, chunk_no, text) VALUES (?, ?, ?, ?, ?)",
+                [(start + i, item[0], item[1], item[2], item[3]) for i, item in enumerate(items)]
+            )
+            conn.executemany(
+                "INSERT INTO term_df (term, df) VALUES (?, ?) ON CONFLICT(term) DO UPDATE SET df = df + excluded.df",
+                list(document_frequency.items())
+            )
+        return len(items)
+
+    def sync_with_storage(self, storage=None) -> int:
+        """
+        Append documents stored since the last sync (near-duplicates excluded)
+
+        Args:
+            storage: DocumentStorage (default: the shared instance)
+
+        Returns:
+            Passages added
+        """
+        if not self.enabled:
+            return 0
+        if storage is None:
+            from app.services.document_storage import document_storage as storage
+        self._ensure_initialized()
+        added = 0
+        while True:
+            with self._connect() as conn:
+                row = conn.execute("SELECT value FROM retrieval_meta WHERE key = 'storage_rowid'").fetchone()
+            documents = storage.canonical_documents_after(int(row[0]) if row else 0, SYNC_BATCH)
+            if not documents:
+                break
+            added += self._append(
+                [
+                    (document["id"], document["filename"].rsplit(".", 1)[0], document["extracted_text"])
+                    for document in documents
+                ],
+                storage_rowid=documents[-1]["rowid"],
+            )
+        if added:
+            logger.info(f"Indexed {added} passages of stored documents for retrieval")
+        return added
+
+    def _query_vector(self, conn: sqlite3.Connection, query: str) -> Optional["np.ndarray"]:
+        """Unit vector of IDF-weighted query terms (None if no known term)"""
+        counts = Counter(tokenize(query))
+        if not counts:
+            return None
+        total = conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        terms = list(counts)
+        df = dict(conn.execute(
+            f"SELECT term, df FROM term_df WHERE term IN ({', '.join('?' * len(terms))})", terms
+        ).fetchall())
+        if not df:
+            return None
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for term, count in counts.items():
+            if term in df:
+                index, sign = _feature(term, self.dimensions)
+                vector[index] += sign * (1.0 + math.log(count)) * (math.log((total + 1) / (df[term] + 1)) + 1.0)
+        return vector / np.linalg.norm(vector)
+
+    def search(self, query: str, top_k: int = 8) -> List[Dict[str, Any]]:
+        """
+        Passages most similar to a query
+
+        Returns:
+            Dicts with document_id, title, chunk_no, text and score
+            (cosine, higher is better), best first
+        """
+        if not self.enabled:
+            return []
+        self._ensure_initialized()
+        with self._connect() as conn:
+            query_vector = self._query_vector(conn, query)
+            with self._lock:
+                matrix = self._open_matrix()
+            if query_vector is None or matrix is None:
+                return []
+            scores = matrix @ query_vector
+            k = min(top_k, len(scores))
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+            rows = {
+                row["row"]: row for row in conn.execute(
+                    f"SELECT row, document_id, title, chunk_no, text FROM chunks WHERE row IN ({', '.join('?' * k)})",
+                    [int(i) for i in best]
+                )
+            }
+        return [
+            {
+                "document_id": rows[i]["document_id"],
+                "title": rows[i]["title"],
+                "chunk_no": rows[i]["chunk_no"],
+                "text": rows[i]["text"],
+                "score": round(float(scores[i]), 4),
+            }
+            for i in (int(i) for i in best) if i in rows
+        ]
+
+    def relevant_passages(
+        self,
+        query: str,
+        token_budget: int = 1500,
+        top_k: int = 8,
+        min_score: float = 0.1
+    ) -> List[Dict[str, Any]]:
+        """
+        Best passages for a query that fit a token budget, as relevant_cases items
+
+        Syncs with document storage first. Passages below min_score are
+        dropped; the rest are taken best first while they fit.
+        """
+        if not self.enabled:
+            return []
+        self.sync_with_storage()
+        cases = []
+        used = 0
+        for passage in self.search(query, top_k):
+            if passage["score"] < min_score:
+                break
+            tokens = estimate_tokens(passage["text"])
+            if used + tokens > token_budget:
+                continue
+            used += tokens
+            cases.append({
+                "title": passage["title"],
+                "source": "uploaded_document",
+                "document_id": passage["document_id"],
+                "passage": passage["text"],
+                "score": passage["score"],
+            })
+        return cases
+
+    async def relevant_passages_async(self, query: str, **kwargs) -> List[Dict[str, Any]]:
+        """relevant_passages off the event loop"""
+        return await asyncio.to_thread(self.relevant_passages, query, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Index size"""
+        if not self.enabled:
+            return {"enabled": False, "numpy_available": NUMPY_AVAILABLE}
+        self._ensure_initialized()
+        with self._connect() as conn:
+            passages = conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+            documents = conn.execute("SELECT COUNT(DISTINCT document_id) FROM chunks").fetchone()[0]
+        return {
+            "enabled": True,
+            "dimensions": self.dimensions,
+            "documents": documents,
+            "passages": passages,
+            "vectors_mb": round(passages * self._row_bytes / 2**20, 1),
+        }
+
+
+def _create_retrieval() -> DocumentRetrieval:
+    """Build the shared index from settings"""
+    from app.core.config import get_settings
+    settings = get_settings()
+    return DocumentRetrieval(
+        dimensions=settings.RETRIEVAL_DIMENSIONS,
+        enabled=settings.RETRIEVAL_ENABLED,
+    )
+
+
+# Global retrieval index
+document_retrieval = _create_retrieval()
@@ -1,175 +1,587 @@
 """
 Document Storage Service
 Handles storage and retrieval of uploaded documents (cases, news, etc.)
-Uses file-based storage (JSON) for simplicity, can be upgraded to MongoDB later
+
+Documents live in a SQLite database (data/documents/documents.db) with
+indexes on created_at, is_case, is_news and document_type, so saving one
+upload is a single transactional insert instead of rewriting every stored
+document. A documents row is metadata only (title, flags, dates and the
+first SUMMARY_CHARS of text): the extracted text is stored once per
+distinct content in document_bodies, zlib-compressed and keyed by its
+SHA-256, and is read only when a document is opened or searched, so the
+listings never touch it. The newest rows of each listing are also kept in
+memory, updated on save and reloaded when the database files change.
+A document that near-duplicates a stored one (see near_duplicates) is
+marked as a duplicate of that canonical copy and left out of the listings
+and the search index; it keeps its own body (a near-duplicate can carry
+extra content such as annexures), which get_document returns. Filenames
+and text are indexed in an FTS5 table for BM25-ranked search with phrase
+and prefix queries. Documents from the old JSON files (documents.json,
+cases.json, news.json) are imported by run_maintenance, which the app
+runs off the event loop on startup, once per version of each file.
 """
 
+import hashlib
 import json
-import os
-from typing import List, Dict, Optional
+import logging
+import random
+import re
+import sqlite3
+import threading
+import zlib
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-import logging
-import time
+from typing import Dict, Iterator, List, Optional, Tuple
 
-logger = logging.getLogger(__name__)
+from app.services.near_duplicates import (
+    DUPLICATE_THRESHOLD, lsh_buckets, minhash_signature, pack_signature,
+    signature_similarity, unpack_signature
+)
 
-# File locking (cross-platform)
-try:
-    if os.name == 'nt':  # Windows
-        import msvcrt
-        HAS_FILE_LOCKING = True
-    else:  # Unix/Linux
-        import fcntl
-        HAS_FILE_LOCKING = True
-except ImportError:
-    HAS_FILE_LOCKING = False
-    logger.warning("File locking not available - may have race conditions with concurrent requests")
+logger = logging.getLogger(__name__)
 
 # Storage directory
 STORAGE_DIR = Path("data/documents")
 STORAGE_DIR.mkdir(parents=True, exist_ok=True)
 
+DATABASE_FILE = STORAGE_DIR / "documents.db"
+
+# Legacy JSON stores, migrated into the database on first start
 CASES_FILE = STORAGE_DIR / "cases.json"
 NEWS_FILE = STORAGE_DIR / "news.json"
 DOCUMENTS_FILE = STORAGE_DIR / "documents.json"
 
+# Limit extracted text size to prevent huge rows (max 1MB of text)
+MAX_TEXT_LENGTH = 1000000
+
+# Characters of body text fetched for listing summaries
+SUMMARY_CHARS = 300
+
+# Newest rows per listing kept in memory (larger limits are read from the database)
+RECENT_INDEX_SIZE = 50
+
+# Listings: SQL filter to load one, and the same filter in Python to add a
+# newly saved document to it in memory
+RECENT_LISTINGS = {
+    'cases': ("is_case = 1 AND is_news = 0", lambda d: d["is_case"] and not d["is_news"]),
+    'pdf': ("document_type = 'pdf' AND is_news = 0", lambda d: d["document_type"] == 'pdf' and not d["is_news"]),
+    'news': ("is_news = 1 AND is_case = 0", lambda d: d["is_news"] and not d["is_case"]),
+    'word_text': (
+        "document_type IN ('word', 'text') AND is_case = 0",
+        lambda d: d["document_type"] in ('word', 'text') and not d["is_case"],
+    ),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    document_type TEXT NOT NULL DEFAULT '',
+    body_hash TEXT NOT NULL,
+    text_head TEXT NOT NULL DEFAULT '',
+    text_length INTEGER NOT NULL DEFAULT 0,
+    metadata TEXT NOT NULL DEFAULT '{}',
+    created_at TEXT NOT NULL,
+    is_case INTEGER NOT NULL DEFAULT 0,
+    is_news INTEGER NOT NULL DEFAULT 0,
+    duplicate_of TEXT
+);
+CREATE TABLE IF NOT EXISTS document_bodies (
+    hash TEXT PRIMARY KEY,
+    body BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_documents_created_at ON documents(created_at);
+CREATE INDEX IF NOT EXISTS idx_documents_is_case ON documents(is_case, created_at);
+CREATE INDEX IF NOT EXISTS idx_documents_is_news ON documents(is_news, created_at);
+CREATE INDEX IF NOT EXISTS idx_documents_type ON documents(document_type, created_at);
+-- MinHash signature per canonical document (NULL: too short to compare)
+CREATE TABLE IF NOT EXISTS document_signatures (
+    doc_rowid INTEGER PRIMARY KEY,
+    signature BLOB
+);
+-- LSH bucket of every signature band
+CREATE TABLE IF NOT EXISTS document_lsh (
+    bucket INTEGER NOT NULL,
+    doc_rowid INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_document_lsh_bucket ON document_lsh(bucket);
+CREATE TABLE IF NOT EXISTS storage_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+-- Decompressed text per document: content table of the full-text index
+CREATE VIEW IF NOT EXISTS document_text AS
+SELECT d.rowid AS doc_rowid, d.filename AS filename, body_text(b.body) AS extracted_text
+FROM documents d JOIN document_bodies b ON b.hash = d.body_hash;
+"""
+
+# Schema before bodies were split out (text inline in documents, FTS kept by triggers)
+_INLINE_TEXT_OBJECTS = """
+DROP TRIGGER IF EXISTS documents_ai;
+DROP TRIGGER IF EXISTS documents_ad;
+DROP TRIGGER IF EXISTS documents_au;
+DROP TABLE IF EXISTS documents_fts;
+DROP INDEX IF EXISTS idx_documents_created_at;
+DROP INDEX IF EXISTS idx_documents_is_case;
+DROP INDEX IF EXISTS idx_documents_is_news;
+DROP INDEX IF EXISTS idx_documents_type;
+ALTER TABLE documents RENAME TO documents_inline;
+"""
+
+# Rows are indexed by _insert_document (the text is at hand uncompressed there);
+# snippets and 'rebuild' read the text back through the document_text view
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    filename, extracted_text,
+    content='document_text', content_rowid='doc_rowid',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+"""
+
+# BM25 column weights: filename, extracted_text
+BM25_WEIGHTS = (10.0, 1.0)
+
+# Snippet highlighting (Markdown bold, as rendered by the frontend) and size in tokens
+SNIPPET_START = "**"
+SNIPPET_END = "**"
+SNIPPET_TOKENS = 24
+
+# Broad queries are ranked among the newest matches only: BM25 has to score
+# every candidate, and a term found in most documents ranks poorly anyway
+RANK_CANDIDATES = 2000
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+# "quoted phrase" | word* | word
+_QUERY_PART_RE = re.compile(r'"([^"]*)"|(\w+)(\*)?', re.UNICODE)
+
+
+def build_document_match(query: str) -> Optional[str]:
+    """
+    Build an FTS5 MATCH expression from a user search
+
+    Quoted text becomes a phrase ("section 482"), a trailing * a prefix
+    query (arbitrat*), and everything else must match as whole words
+    (implicit AND). FTS5 operators typed by the user are treated as words.
+
+    Returns:
+        MATCH expression, or None if the query has no searchable tokens
+    """
+    terms = []
+    for phrase, word, star in _QUERY_PART_RE.findall(query.lower()):
+        if phrase:
+            tokens = _TOKEN_RE.findall(phrase)
+            if tokens:
+                terms.append('"{}"'.format(" ".join(tokens)))
+        elif word:
+            terms.append('"{}"{}'.format(word, "*" if star else ""))
+    return " ".join(terms) if terms else None
+
+
+# Case keywords (stronger weight for legal case indicators)
+CASE_KEYWORDS = {
+    "judgment": 3, "court": 2, "petitioner": 3, "respondent": 3,
+    "case": 2, "citation": 3, "supreme court": 4, "high court": 4,
+    "judge": 2, "order": 2, "verdict": 3, "legal notice": 2,
+    "plaintiff": 2, "defendant": 2, "writ petition": 4
+}
+
+# News keywords
+NEWS_KEYWORDS = {
+    "news": 2, "update": 2, "amendment": 3, "reform": 2,
+    "notification": 3, "circular": 3, "ministry": 2,
+    "government": 1, "gst": 2, "finance act": 3, "press release": 3
+}
+
+
+def classify_document(text: str) -> Tuple[bool, bool]:
+    """
+    Detect whether a document is a case or news based on content
+
+    Uses a scoring system: a document is a case OR news, not both. If scores
+    are too low or equal it is neither (and appears in both listings as a
+    fallback).
+
+    Returns:
+        (is_case, is_news)
+    """
+    text_lower = text.lower()
+    case_score = sum(weight for keyword, weight in CASE_KEYWORDS.items() if keyword in text_lower)
+    news_score = sum(weight for keyword, weight in NEWS_KEYWORDS.items() if keyword in text_lower)
+
+    # Assign to category with higher score (with minimum threshold)
+    if case_score >= 3 and case_score >= news_score:
+        return True, False
+    if news_score >= 3 and news_score > case_score:
+        return False, True
+    return False, False
+
+
+def body_hash(text: str) -> str:
+    """Content address of a document body"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def compress_body(text: str) -> bytes:
+    return zlib.compress(text.encode('utf-8'), 6)
+
+
+def decompress_body(body: Optional[bytes]) -> str:
+    return zlib.decompress(body).decode('utf-8') if body else ""
+
+
+def _display_title(filename: Optional[str], default: str) -> str:
+    """Title from filename without the document extension"""
+    title = filename or default
+    if title.endswith(('.pdf', '.doc', '.docx', '.txt')):
+        title = title.rsplit('.', 1)[0]
+    return title
+
+
+def _summary(head: str, text_length: int, default: str) -> str:
+    """First 300 chars as summary"""
+    if not head:
+        return default
+    return head[:SUMMARY_CHARS] + "..." if text_length > SUMMARY_CHARS else head
+
+
+def _created_at(value: Optional[str]) -> datetime:
+    """Safe date parsing"""
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return datetime.now()
+
 
 class DocumentStorage:
     """Service for storing and retrieving uploaded documents"""
-    
-    def __init__(self):
-        self._ensure_files_exist()
-    
-    def _ensure_files_exist(self):
-        """Ensure storage files exist"""
-        for file_path in [CASES_FILE, NEWS_FILE, DOCUMENTS_FILE]:
-            if not file_path.exists():
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump([], f, ensure_ascii=False, indent=2)
-    
-    def _lock_file(self, file_handle):
-        """Lock file for exclusive access (cross-platform)"""
-        if not HAS_FILE_LOCKING:
-            return  # Skip locking if not available
+
+    def __init__(self, db_path: Path = DATABASE_FILE, legacy_dir: Optional[Path] = STORAGE_DIR):
+        """
+        Initialize document storage
+
+        Args:
+            db_path: SQLite database file
+            legacy_dir: Directory holding the old JSON stores to migrate
+                in run_maintenance (None skips migration)
+        """
+        self.db_path = db_path
+        self.legacy_dir = legacy_dir
+        self._lock = threading.Lock()
+        self.fts_available = False
+        # Listing name -> newest rows first; valid while the files' signature is unchanged
+        self._recent_index: Dict[str, List[Dict]] = {}
+        self._index_signature: Optional[Tuple] = None
+        self._index_lock = threading.Lock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            self._detach_inline_text(conn)
+            conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(documents)")}
+            if "duplicate_of" not in columns:
+                conn.execute("ALTER TABLE documents ADD COLUMN duplicate_of TEXT")
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'documents_inline'").fetchone():
+                self._move_inline_text(conn)
+        self._init_fts()
+
+    def run_maintenance(self) -> Dict[str, int]:
+        """
+        Import the old JSON stores and sign documents that have no signature
+
+        Both passes can take seconds on a large store, so they are not run
+        on construction; main.py runs this in an executor on startup.
+
+        Returns:
+            Counts of documents migrated and marked as duplicates
+        """
+        migrated = self.migrate_from_json(self.legacy_dir) if self.legacy_dir is not None else 0
+        return {"migrated": migrated, "duplicates": self.index_unsigned_documents()}
+
+    def _init_fts(self):
+        """Create the full-text index, building it for rows stored before it existed"""
         try:
-            if os.name == 'nt':  # Windows
-                msvcrt.locking(file_handle.fileno(), msvcrt.LK_NBLCK, 1)
-            else:  # Unix/Linux
-                fcntl.flock(file_handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
-        except (IOError, OSError) as e:
-            # File is locked by another process, wait and retry
-            logger.debug(f"File is locked, will retry: {e}")
-            raise
-        except Exception as e:
-            logger.warning(f"Could not lock file: {e}")
-    
-    def _unlock_file(self, file_handle):
-        """Unlock file"""
-        if not HAS_FILE_LOCKING:
-            return
+            with self._connect() as conn:
+                exists = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'documents_fts'"
+                ).fetchone()
+                conn.executescript(_FTS_SCHEMA)
+                if not exists and conn.execute("SELECT 1 FROM documents LIMIT 1").fetchone():
+                    conn.execute("INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')")
+                    logger.info("Built full-text index for stored documents")
+            self.fts_available = True
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5: search falls back to a substring scan
+            logger.warning(f"Document full-text search disabled: {e}")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Short-lived connection that commits on success and always closes"""
+        conn = sqlite3.connect(str(self.db_path), timeout=10)
         try:
-            if os.name == 'nt':  # Windows
-                msvcrt.locking(file_handle.fileno(), msvcrt.LK_UNLCK, 1)
-            else:  # Unix/Linux
-                fcntl.flock(file_handle.fileno(), fcntl.LOCK_UN)
-        except Exception:
-            pass  # Ignore unlock errors
-    
-    def _load_json(self, file_path: Path) -> List[Dict]:
-        """Load JSON data from file with error handling and retry"""
-        max_retries = 3
-        retry_delay = 0.1
-        
-        for attempt in range(max_retries):
-            try:
-                if not file_path.exists():
-                    return []
-                
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    try:
-                        self._lock_file(f)
-                    except (IOError, OSError):
-                        # File locked, wait a bit and retry
-                        time.sleep(0.1)
-                        continue
-                    try:
-                        data = json.load(f)
-                        return data if isinstance(data, list) else []
-                    finally:
-                        self._unlock_file(f)
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON decode error in {file_path} (attempt {attempt + 1}/{max_retries}): {e}")
-                if attempt < max_retries - 1:
-                    # Try to backup corrupted file and create new one
-                    try:
-                        backup_path = file_path.with_suffix('.json.bak')
-                        if file_path.exists():
-                            import shutil
-                            shutil.copy2(file_path, backup_path)
-                        # Create empty file
-                        with open(file_path, 'w', encoding='utf-8') as f:
-                            json.dump([], f, ensure_ascii=False, indent=2)
-                        logger.warning(f"Created new file after corruption detected. Backup saved to {backup_path}")
-                        return []
-                    except Exception as backup_error:
-                        logger.error(f"Failed to recover from JSON corruption: {backup_error}")
-                time.sleep(retry_delay * (attempt + 1))
-            except Exception as e:
-                logger.error(f"Error loading {file_path} (attempt {attempt + 1}/{max_retries}): {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay * (attempt + 1))
-                else:
-                    return []
-        
-        return []
-    
-    def _save_json(self, file_path: Path, data: List[Dict]):
-        """Save JSON data to file with error handling and atomic write"""
-        max_retries = 3
-        retry_delay = 0.1
-        
-        for attempt in range(max_retries):
-            try:
-                # Atomic write: write to temp file first, then rename
-                temp_path = file_path.with_suffix('.json.tmp')
-                
-                with open(temp_path, 'w', encoding='utf-8') as f:
-                    self._lock_file(f)
-                    try:
-                        json.dump(data, f, ensure_ascii=False, indent=2)
-                        f.flush()
-                        os.fsync(f.fileno())  # Force write to disk
-                    finally:
-                        self._unlock_file(f)
-                
-                # Atomic rename (works on both Windows and Unix)
-                if os.name == 'nt':  # Windows
-                    # On Windows, rename might fail if file exists, so remove first
-                    if file_path.exists():
-                        os.remove(file_path)
-                os.rename(temp_path, file_path)
-                return  # Success
-                
-            except PermissionError as e:
-                logger.error(f"Permission error saving {file_path} (attempt {attempt + 1}/{max_retries}): {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay * (attempt + 1))
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # Python's lower() (Unicode-aware) for case-insensitive search
+            conn.create_function("py_lower", 1, lambda s: s.lower() if s else "", deterministic=True)
+            conn.create_function("body_text", 1, decompress_body, deterministic=True)
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _detach_inline_text(conn: sqlite3.Connection):
+        """Rename a documents table that still holds text inline to documents_inline"""
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(documents)")}
+        if "extracted_text" in columns:
+            conn.executescript(_INLINE_TEXT_OBJECTS)
+
+    def _move_inline_text(self, conn: sqlite3.Connection):
+        """Copy documents_inline rows into documents + document_bodies"""
+        moved = 0
+        for row in conn.execute("SELECT * FROM documents_inline ORDER BY rowid").fetchall():
+            moved += bool(self._insert_document(
+                conn, row["id"], row["filename"], row["document_type"], row["extracted_text"] or "",
+                row["metadata"], row["created_at"], row["is_case"], row["is_news"],
+                ignore_existing=True,  # Resuming an interrupted move
+            ))
+        conn.execute("DROP TABLE documents_inline")
+        logger.info(f"Moved the text of {moved} documents into compressed bodies")
+
+    def _insert_document(
+        self,
+        conn: sqlite3.Connection,
+        document_id: str,
+        filename: str,
+        document_type: str,
+        text: str,
+        metadata_json: str,
+        created_at: str,
+        is_case: bool,
+        is_news: bool,
+        ignore_existing: bool = False,
+        duplicate_of: Optional[sqlite3.Row] = None
+    ) -> int:
+        """
+        Insert a metadata row, its body (if the content is new) and index it
+
+        Args:
+            duplicate_of: Canonical document (rowid, id, body_hash) this one
+                near-duplicates; the row is then marked as its duplicate and
+                not indexed for search
+
+        Returns:
+            rowid of the new row, 0 if ignore_existing and the id exists
+
+        Raises:
+            sqlite3.IntegrityError: If the id exists and not ignore_existing
+        """
+        content_hash = body_hash(text)
+        cursor = conn.execute(
+            f"""
+            INSERT {'OR IGNORE ' if ignore_existing else ''}INTO documents
+                (id, filename, document_type, body_hash, text_head, text_length,
+                 metadata, created_at, is_case, is_news, duplicate_of)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                document_id, filename, document_type, content_hash, text[:SUMMARY_CHARS], len(text),
+                metadata_json, created_at, int(bool(is_case)), int(bool(is_news)),
+                duplicate_of["id"] if duplicate_of else None,
+            )
+        )
+        if not cursor.rowcount:
+            return 0
+        # Identical content (the same upload again) shares one body
+        conn.execute(
+            "INSERT OR IGNORE INTO document_bodies (hash, body) VALUES (?, ?)",
+            (content_hash, compress_body(text))
+        )
+        if duplicate_of:
+            return cursor.lastrowid
+        if self.fts_available:
+            conn.execute(
+                "INSERT INTO documents_fts(rowid, filename, extracted_text) VALUES (?, ?, ?)",
+                (cursor.lastrowid, filename, text)
+            )
+        return cursor.lastrowid
+
+    def _find_duplicate(self, conn: sqlite3.Connection, signature: List[int]) -> Optional[sqlite3.Row]:
+        """Most similar canonical document at or above DUPLICATE_THRESHOLD, via the LSH buckets"""
+        buckets = lsh_buckets(signature)
+        candidates = conn.execute(
+            f"""
+            SELECT DISTINCT s.doc_rowid, s.signature FROM document_lsh l
+            JOIN document_signatures s ON s.doc_rowid = l.doc_rowid
+            WHERE l.bucket IN ({", ".join("?" * len(buckets))})
+            """,
+            buckets
+        ).fetchall()
+        best_rowid, best_similarity = None, DUPLICATE_THRESHOLD
+        for candidate in candidates:
+            similarity = signature_similarity(signature, unpack_signature(candidate["signature"]))
+            if similarity >= best_similarity:
+                best_rowid, best_similarity = candidate["doc_rowid"], similarity
+        if best_rowid is None:
+            return None
+        return conn.execute(
+            "SELECT rowid, id, body_hash FROM documents WHERE rowid = ?", (best_rowid,)
+        ).fetchone()
+
+    @staticmethod
+    def _add_signature(conn: sqlite3.Connection, rowid: int, signature: Optional[List[int]]):
+        """Record a canonical document's signature and its LSH buckets"""
+        conn.execute(
+            "INSERT OR REPLACE INTO document_signatures (doc_rowid, signature) VALUES (?, ?)",
+            (rowid, pack_signature(signature) if signature else None)
+        )
+        if signature:
+            conn.executemany(
+                "INSERT INTO document_lsh (bucket, doc_rowid) VALUES (?, ?)",
+                [(bucket, rowid) for bucket in lsh_buckets(signature)]
+            )
+
+    def _mark_duplicate(self, conn: sqlite3.Connection, row: sqlite3.Row, text: str, canonical: sqlite3.Row):
+        """Mark a stored document as a duplicate of its canonical copy (its body is kept)"""
+        conn.execute(
+            "UPDATE documents SET duplicate_of = ? WHERE rowid = ?",
+            (canonical["id"], row["rowid"])
+        )
+        if self.fts_available:
+            conn.execute(
+                "INSERT INTO documents_fts(documents_fts, rowid, filename, extracted_text) VALUES ('delete', ?, ?, ?)",
+                (row["rowid"], row["filename"], text)
+            )
+
+    def index_unsigned_documents(self) -> int:
+        """
+        Sign stored documents that have no signature yet, oldest first
+
+        Covers documents imported from JSON or stored before duplicate
+        detection; ones that near-duplicate an older document are marked as
+        its duplicates (hidden from listings and search, text unchanged).
+
+        Returns:
+            Number of documents marked as duplicates
+        """
+        duplicates = 0
+        with self._lock, self._connect() as conn:
+            rowids = [row[0] for row in conn.execute(
+                """
+                SELECT d.rowid FROM documents d
+                LEFT JOIN document_signatures s ON s.doc_rowid = d.rowid
+                WHERE s.doc_rowid IS NULL AND d.duplicate_of IS NULL
+                ORDER BY d.created_at, d.rowid
+                """
+            )]
+            for rowid in rowids:
+                row = conn.execute(
+                    """
+                    SELECT d.rowid, d.id, d.filename, d.body_hash, b.body FROM documents d
+                    LEFT JOIN document_bodies b ON b.hash = d.body_hash WHERE d.rowid = ?
+                    """,
+                    (rowid,)
+                ).fetchone()
+                text = decompress_body(row["body"])
+                signature = minhash_signature(text)
+                canonical = self._find_duplicate(conn, signature) if signature else None
+                if canonical:
+                    self._mark_duplicate(conn, row, text, canonical)
+                    duplicates += 1
                 else:
-                    raise
-            except Exception as e:
-                logger.error(f"Error saving {file_path} (attempt {attempt + 1}/{max_retries}): {e}")
-                # Clean up temp file if it exists
+                    self._add_signature(conn, rowid, signature)
+        if rowids:
+            logger.info(f"Signed {len(rowids)} stored documents, {duplicates} near-duplicates found")
+            if duplicates:
+                with self._index_lock:
+                    self._recent_index.clear()
+        return duplicates
+
+    @staticmethod
+    def _row_to_document(row: sqlite3.Row, text: Optional[str] = None) -> Dict:
+        """Document dict; extracted_text only if the body was loaded"""
+        try:
+            metadata = json.loads(row["metadata"] or "{}")
+        except ValueError:
+            metadata = {}
+        document = {
+            "id": row["id"],
+            "filename": row["filename"],
+            "document_type": row["document_type"],
+            "text_length": row["text_length"],
+            "metadata": metadata,
+            "created_at": row["created_at"],
+            "is_case": bool(row["is_case"]),
+            "is_news": bool(row["is_news"]),
+            "duplicate_of": row["duplicate_of"],
+        }
+        if text is not None:
+            document["extracted_text"] = text
+        return document
+
+    def migrate_from_json(self, legacy_dir: Path) -> int:
+        """
+        One-time import of the old JSON stores
+
+        Runs in a single transaction. Each file's size and mtime are recorded,
+        so it is read again only if it changes (e.g. an older instance still
+        writing JSON); entries whose id already exists are skipped.
+
+        Returns:
+            Number of documents imported
+        """
+        files = [
+            (legacy_dir / DOCUMENTS_FILE.name, {}),
+            (legacy_dir / CASES_FILE.name, {"is_case": True}),
+            (legacy_dir / NEWS_FILE.name, {"is_news": True}),
+        ]
+        files = [(path, defaults) for path, defaults in files if path.exists()]
+        if not files:
+            return 0
+
+        imported = 0
+        with self._lock, self._connect() as conn:
+            for path, defaults in files:
+                stat = path.stat()
+                signature = f"{stat.st_size}:{stat.st_mtime_ns}"
+                marker_key = f"migrated:{path.name}"
+                marker = conn.execute("SELECT value FROM storage_meta WHERE key = ?", (marker_key,)).fetchone()
+                if marker and marker["value"] == signature:
+                    continue
                 try:
-                    if temp_path.exists():
-                        os.remove(temp_path)
-                except:
-                    pass
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay * (attempt + 1))
-                else:
-                    raise
-    
+                    with open(path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.error(f"Could not read {path} for migration, leaving it in place: {e}")
+                    continue
+                for doc in data if isinstance(data, list) else []:
+                    if not isinstance(doc, dict) or not doc.get("id"):
+                        continue
+                    imported += bool(self._insert_document(
+                        conn,
+                        doc["id"],
+                        doc.get("filename") or "unnamed_document",
+                        doc.get("document_type") or "",
+                        doc.get("extracted_text") or "",
+                        json.dumps(doc.get("metadata") or {}, ensure_ascii=False),
+                        doc.get("created_at") or datetime.now().isoformat(),
+                        doc.get("is_case", defaults.get("is_case", False)),
+                        doc.get("is_news", defaults.get("is_news", False)),
+                        ignore_existing=True,
+                    ))
+                conn.execute(
+                    "INSERT OR REPLACE INTO storage_meta (key, value) VALUES (?, ?)",
+                    (marker_key, signature)
+                )
+
+        if imported:
+            logger.info(f"Migrated {imported} documents from JSON into {self.db_path}")
+            with self._index_lock:
+                self._recent_index.clear()
+            self.index_unsigned_documents()
+        return imported
+
     async def save_document(
         self,
         filename: str,
@@ -179,268 +591,300 @@ class DocumentStorage:
     ) -> str:
         """
         Save an uploaded document with error handling
-        
+
         Returns: document_id
         """
         try:
-            documents = self._load_json(DOCUMENTS_FILE)
-            
-            # Generate unique document ID with timestamp and random component
-            import random
-            random_suffix = random.randint(1000, 9999)
-            document_id = f"doc_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{random_suffix}"
-            
-            # Limit extracted text size to prevent huge files (max 1MB of text)
-            max_text_length = 1000000  # ~1MB
-            if len(extracted_text) > max_text_length:
-                extracted_text = extracted_text[:max_text_length] + "\n\n[Text truncated due to size]"
-                logger.warning(f"Document text truncated to {max_text_length} characters")
-            
-            document = {
+            if len(extracted_text) > MAX_TEXT_LENGTH:
+                extracted_text = extracted_text[:MAX_TEXT_LENGTH] + "\n\n[Text truncated due to size]"
+                logger.warning(f"Document text truncated to {MAX_TEXT_LENGTH} characters")
+
+            is_case, is_news = classify_document(extracted_text)
+            created_at = datetime.now()
+            signature = minhash_signature(extracted_text)
+
+            with self._index_lock:
+                signature_before = self._file_signature()
+            with self._connect() as conn:
+                duplicate_of = self._find_duplicate(conn, signature) if signature else None
+                # Unique document ID with timestamp and random component
+                for _ in range(5):
+                    document_id = f"doc_{created_at.strftime('%Y%m%d_%H%M%S')}_{random.randint(1000, 9999)}"
+                    try:
+                        rowid = self._insert_document(
+                            conn,
+                            document_id,
+                            filename or "unnamed_document",
+                            document_type,
+                            extracted_text,
+                            json.dumps(metadata or {}, ensure_ascii=False),
+                            created_at.isoformat(),
+                            is_case,
+                            is_news,
+                            duplicate_of=duplicate_of,
+                        )
+                        break
+                    except sqlite3.IntegrityError:
+                        continue
+                else:
+                    raise RuntimeError("Could not allocate a unique document id")
+                if duplicate_of is None:
+                    self._add_signature(conn, rowid, signature)
+
+            self._index_saved({
                 "id": document_id,
                 "filename": filename or "unnamed_document",
+                "created_at": created_at.isoformat(),
+                "head": extracted_text[:SUMMARY_CHARS],
+                "text_length": len(extracted_text),
                 "document_type": document_type,
-                "extracted_text": extracted_text,
-                "metadata": metadata or {},
-                "created_at": datetime.now().isoformat(),
-                "is_case": False,
-                "is_news": False
-            }
-            
-            # Try to detect if it's a case or news based on content
-            # Use scoring system: document is case OR news, not both
-            text_lower = extracted_text.lower()
-            
-            case_score = 0
-            news_score = 0
-            
-            # Case keywords (stronger weight for legal case indicators)
-            case_keywords = {
-                "judgment": 3, "court": 2, "petitioner": 3, "respondent": 3, 
-                "case": 2, "citation": 3, "supreme court": 4, "high court": 4,
-                "judge": 2, "order": 2, "verdict": 3, "legal notice": 2,
-                "plaintiff": 2, "defendant": 2, "writ petition": 4
-            }
-            
-            # News keywords
-            news_keywords = {
-                "news": 2, "update": 2, "amendment": 3, "reform": 2,
-                "notification": 3, "circular": 3, "ministry": 2,
-                "government": 1, "gst": 2, "finance act": 3, "press release": 3
-            }
-            
-            # Calculate scores
-            for keyword, weight in case_keywords.items():
-                if keyword in text_lower:
-                    case_score += weight
-            
-            for keyword, weight in news_keywords.items():
-                if keyword in text_lower:
-                    news_score += weight
-            
-            # Assign to category with higher score (with minimum threshold)
-            if case_score >= 3 and case_score >= news_score:
-                document["is_case"] = True
-                document["is_news"] = False
-            elif news_score >= 3 and news_score > case_score:
-                document["is_news"] = True
-                document["is_case"] = False
-            # If scores are too low or equal, don't mark as either (will appear in both as fallback)
-            
-            documents.append(document)
-            self._save_json(DOCUMENTS_FILE, documents)
-            
-            logger.info(f"Saved document {document_id}: {filename} (type: {document_type})")
-            return document_id
-        except Exception as e:
-            logger.error(f"Failed to save document {filename}: {e}", exc_info=True)
-            # Return a temporary ID even if save fails, so the request doesn't completely fail
-            return f"doc_temp_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            
-            documents.append(document)
-            self._save_json(DOCUMENTS_FILE, documents)
-            
-            logger.info(f"Saved document {document_id}: {filename} (type: {document_type})")
+                "is_case": is_case,
+                "is_news": is_news,
+                "duplicate_of": duplicate_of["id"] if duplicate_of else None,
+            }, signature_before)
+
+            if duplicate_of:
+                logger.info(f"Saved document {document_id}: {filename} as a near-duplicate of {duplicate_of['id']}")
+            else:
+                logger.info(f"Saved document {document_id}: {filename} (type: {document_type})")
             return document_id
         except Exception as e:
             logger.error(f"Failed to save document {filename}: {e}", exc_info=True)
             # Return a temporary ID even if save fails, so the request doesn't completely fail
             return f"doc_temp_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    
+
+    def _file_signature(self) -> Tuple:
+        """mtime and size of the database and its WAL; any commit, from any process, changes it"""
+        signature = []
+        for path in (self.db_path, Path(f"{self.db_path}-wal")):
+            try:
+                stat = path.stat()
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _load_listing(self, listing: str, limit: int) -> List[Dict]:
+        """Newest rows of a listing from the database"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT id, filename, created_at, text_head AS head, text_length, document_type, is_case, is_news
+                FROM documents WHERE duplicate_of IS NULL AND {RECENT_LISTINGS[listing][0]}
+                ORDER BY created_at DESC LIMIT ?
+                """,
+                (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _listing(self, listing: str, limit: int) -> List[Dict]:
+        """Newest `limit` rows of a listing, from memory when possible"""
+        if limit > RECENT_INDEX_SIZE:
+            return self._load_listing(listing, limit)
+        with self._index_lock:
+            signature = self._file_signature()
+            if signature != self._index_signature:
+                # Written by another process (or connection) since loaded
+                self._recent_index.clear()
+                self._index_signature = signature
+            if listing not in self._recent_index:
+                self._recent_index[listing] = self._load_listing(listing, RECENT_INDEX_SIZE)
+            return self._recent_index[listing][:limit]
+
+    def _index_saved(self, row: Dict, signature_before: Tuple):
+        """Add a document this instance just saved to the in-memory listings"""
+        with self._index_lock:
+            if signature_before != self._index_signature:
+                # Other writes happened too; reload on next use
+                self._recent_index.clear()
+            elif not row["duplicate_of"]:
+                for listing, rows in self._recent_index.items():
+                    if RECENT_LISTINGS[listing][1](row):
+                        rows.append(row)
+                        rows.sort(key=lambda r: r["created_at"], reverse=True)
+                        del rows[RECENT_INDEX_SIZE:]
+            self._index_signature = self._file_signature()
+
+    def _recent(self, listing: str, fallback_listing: str, limit: int) -> List[Dict]:
+        """Newest documents of a listing (or of fallback_listing if it is empty)"""
+        return self._listing(listing, limit) or self._listing(fallback_listing, limit)
+
     async def get_recent_cases(self, limit: int = 5) -> List[Dict]:
         """Get recent cases from uploaded documents with error handling"""
         try:
-            documents = self._load_json(DOCUMENTS_FILE)
-            
-            if not documents:
-                return []
-            
-            # Filter for cases - only documents explicitly marked as cases
-            # Exclude documents that are marked as news (to avoid duplicates)
-            cases = [
-                doc for doc in documents
-                if isinstance(doc, dict) and doc.get("is_case", False) and not doc.get("is_news", False)
-            ]
-            
-            # If no explicit cases found, include PDFs that aren't marked as news
-            if not cases:
-                cases = [
-                    doc for doc in documents
-                    if isinstance(doc, dict) and doc.get("document_type") == "pdf" and not doc.get("is_news", False)
-                ]
-            
-            # Sort by created_at (most recent first) with error handling
-            def safe_sort_key(x):
-                try:
-                    created_at = x.get("created_at", "")
-                    if created_at:
-                        return created_at
-                    return ""
-                except:
-                    return ""
-            
-            cases.sort(key=safe_sort_key, reverse=True)
-            
+            # Only documents explicitly marked as cases (not news, to avoid duplicates);
+            # if there are none, PDFs that aren't marked as news
+            rows = self._recent('cases', 'pdf', limit)
+
             # Convert to CaseItem format
             result = []
-            for case in cases[:limit]:
-                try:
-                    # Extract title from filename or first line of text
-                    title = case.get("filename", "Uploaded Case Document") or "Uploaded Case Document"
-                    if title.endswith(('.pdf', '.doc', '.docx', '.txt')):
-                        title = title.rsplit('.', 1)[0]
-                    
-                    text = case.get("extracted_text", "")
-                    if text:
-                        # Use first 300 chars as summary
-                        summary = text[:300] + "..." if len(text) > 300 else text
-                    else:
-                        summary = "Case document uploaded by user."
-                    
-                    # Safe date parsing
-                    try:
-                        created_at_str = case.get("created_at", datetime.now().isoformat())
-                        year = datetime.fromisoformat(created_at_str).year
-                    except:
-                        year = datetime.now().year
-                    
-                    result.append({
-                        "title": title[:200],  # Limit title length
-                        "court": "Uploaded Document",
-                        "year": year,
-                        "citation": None,
-                        "summary": summary[:500],  # Limit summary length
-                        "query": f"Tell me about the case: {title[:100]}",
-                        "source": "uploaded_document",
-                        "document_id": case.get("id")
-                    })
-                except Exception as e:
-                    logger.warning(f"Error processing case document: {e}")
-                    continue
-            
+            for case in rows:
+                title = _display_title(case["filename"], "Uploaded Case Document")
+                summary = _summary(case["head"], case["text_length"], "Case document uploaded by user.")
+                result.append({
+                    "title": title[:200],  # Limit title length
+                    "court": "Uploaded Document",
+                    "year": _created_at(case["created_at"]).year,
+                    "citation": None,
+                    "summary": summary[:500],  # Limit summary length
+                    "query": f"Tell me about the case: {title[:100]}",
+                    "source": "uploaded_document",
+                    "document_id": case["id"]
+                })
             return result
         except Exception as e:
             logger.error(f"Error getting recent cases: {e}", exc_info=True)
             return []
-    
+
     async def get_recent_news(self, limit: int = 5) -> List[Dict]:
         """Get recent news from uploaded documents with error handling"""
         try:
-            documents = self._load_json(DOCUMENTS_FILE)
-            
-            if not documents:
-                return []
-            
-            # Filter for news - only documents explicitly marked as news
-            # Exclude documents that are marked as cases (to avoid duplicates)
-            news_items = [
-                doc for doc in documents
-                if isinstance(doc, dict) and doc.get("is_news", False) and not doc.get("is_case", False)
-            ]
-            
-            # If no explicit news found, include non-PDF documents that aren't marked as cases
-            if not news_items:
-                news_items = [
-                    doc for doc in documents
-                    if isinstance(doc, dict) and doc.get("document_type") in ["word", "text"] and not doc.get("is_case", False)
-                ]
-            
-            # Sort by created_at (most recent first) with error handling
-            def safe_sort_key(x):
-                try:
-                    created_at = x.get("created_at", "")
-                    if created_at:
-                        return created_at
-                    return ""
-                except:
-                    return ""
-            
-            news_items.sort(key=safe_sort_key, reverse=True)
-            
+            # Only documents explicitly marked as news (not cases, to avoid duplicates);
+            # if there are none, Word/text documents that aren't marked as cases
+            rows = self._recent('news', 'word_text', limit)
+
             # Convert to NewsItem format
             result = []
-            for news in news_items[:limit]:
-                try:
-                    # Extract title from filename or first line of text
-                    title = news.get("filename", "Uploaded Legal Document") or "Uploaded Legal Document"
-                    if title.endswith(('.pdf', '.doc', '.docx', '.txt')):
-                        title = title.rsplit('.', 1)[0]
-                    
-                    text = news.get("extracted_text", "")
-                    if text:
-                        # Use first 300 chars as summary
-                        summary = text[:300] + "..." if len(text) > 300 else text
-                    else:
-                        summary = "Legal document uploaded by user."
-                    
-                    # Safe date parsing
-                    try:
-                        created_at_str = news.get("created_at", datetime.now().isoformat())
-                        created_at = datetime.fromisoformat(created_at_str)
-                        date_str = created_at.strftime("%Y")
-                    except:
-                        date_str = str(datetime.now().year)
-                    
-                    result.append({
-                        "title": title[:200],  # Limit title length
-                        "source": "Uploaded Document",
-                        "date": date_str,
-                        "summary": summary[:500],  # Limit summary length
-                        "query": f"Tell me more about: {title[:100]}",
-                        "document_id": news.get("id")
-                    })
-                except Exception as e:
-                    logger.warning(f"Error processing news document: {e}")
-                    continue
-            
+            for news in rows:
+                title = _display_title(news["filename"], "Uploaded Legal Document")
+                summary = _summary(news["head"], news["text_length"], "Legal document uploaded by user.")
+                result.append({
+                    "title": title[:200],  # Limit title length
+                    "source": "Uploaded Document",
+                    "date": _created_at(news["created_at"]).strftime("%Y"),
+                    "summary": summary[:500],  # Limit summary length
+                    "query": f"Tell me more about: {title[:100]}",
+                    "document_id": news["id"]
+                })
             return result
         except Exception as e:
             logger.error(f"Error getting recent news: {e}", exc_info=True)
             return []
-    
-    async def search_documents(self, query: str, limit: int = 10) -> List[Dict]:
-        """Search documents by query text"""
-        documents = self._load_json(DOCUMENTS_FILE)
-        
-        query_lower = query.lower()
+
+    async def search_documents(self, query: str, limit: int = 10, offset: int = 0) -> List[Dict]:
+        """
+        Search documents by query text, best matches first
+
+        Supports "quoted phrases" and prefix* terms; filename matches weigh
+        more than body matches (BM25). Queries matching more than
+        RANK_CANDIDATES documents are ranked among the newest of them.
+
+        Args:
+            query: Search text
+            limit: Page size
+            offset: Results to skip (pagination)
+
+        Returns:
+            Document metadata with a highlighted snippet and score (lower
+            is better); get_document loads the full text
+        """
+        if not self.fts_available:
+            return self._scan_documents(query, limit, offset)
+        match = build_document_match(query)
+        if match is None:
+            return []
+        weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+        candidates = max(RANK_CANDIDATES, offset + limit)
+        with self._connect() as conn:
+            # Rowid of the oldest candidate; the doclist is walked without scoring
+            cutoff = conn.execute(
+                "SELECT rowid FROM documents_fts WHERE documents_fts MATCH ? "
+                "ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+                (match, candidates - 1)
+            ).fetchone()
+            ranked = conn.execute(
+                f"""
+                SELECT rowid, bm25(documents_fts, {weights}) AS score
+                FROM documents_fts
+                WHERE documents_fts MATCH ? AND rowid >= ?
+                ORDER BY score
+                LIMIT ? OFFSET ?
+                """,
+                (match, cutoff[0] if cutoff else 0, limit, offset)
+            ).fetchall()
+            if not ranked:
+                return []
+            scores = {row["rowid"]: row["score"] for row in ranked}
+            # Snippets and documents only for the page being returned
+            rows = conn.execute(
+                f"""
+                SELECT d.rowid AS fts_rowid, d.*,
+                       snippet(documents_fts, 1, ?, ?, '…', {SNIPPET_TOKENS}) AS snippet
+                FROM documents_fts
+                JOIN documents d ON d.rowid = documents_fts.rowid
+                WHERE documents_fts MATCH ? AND documents_fts.rowid IN ({", ".join("?" * len(scores))})
+                """,
+                (SNIPPET_START, SNIPPET_END, match, *scores)
+            ).fetchall()
         results = []
-        
-        for doc in documents:
-            text = doc.get("extracted_text", "").lower()
-            filename = doc.get("filename", "").lower()
-            
-            if query_lower in text or query_lower in filename:
-                results.append(doc)
-        
-        # Sort by relevance (simple: documents with query in title ranked higher)
-        results.sort(key=lambda x: (
-            query_lower not in x.get("filename", "").lower(),
-            x.get("created_at", "")
-        ))
-        
-        return results[:limit]
+        for row in sorted(rows, key=lambda r: scores[r["fts_rowid"]]):
+            document = self._row_to_document(row)
+            document["snippet"] = row["snippet"]
+            document["score"] = round(scores[row["fts_rowid"]], 4)
+            results.append(document)
+        return results
+
+    def _scan_documents(self, query: str, limit: int, offset: int) -> List[Dict]:
+        """Substring search without FTS5 (decompresses every body)"""
+        query_lower = query.lower()
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT d.* FROM documents d JOIN document_bodies b ON b.hash = d.body_hash
+                WHERE d.duplicate_of IS NULL
+                  AND (instr(py_lower(body_text(b.body)), :q) > 0 OR instr(py_lower(d.filename), :q) > 0)
+                -- Simple relevance: documents with the query in the filename first
+                ORDER BY instr(py_lower(d.filename), :q) = 0, d.created_at
+                LIMIT :limit OFFSET :offset
+                """,
+                {"q": query_lower, "limit": limit, "offset": offset}
+            ).fetchall()
+        return [self._row_to_document(row) for row in rows]
+
+    def canonical_documents_after(self, rowid: int, limit: int = 100) -> List[Dict]:
+        """
+        Documents stored after a given row, with their text (near-duplicates excluded)
+
+        For indexes that follow the store incrementally (document_retrieval).
+
+        Returns:
+            Up to limit documents in storage order, each with its "rowid"
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT d.rowid, d.*, b.body FROM documents d
+                LEFT JOIN document_bodies b ON b.hash = d.body_hash
+                WHERE d.rowid > ? AND d.duplicate_of IS NULL
+                ORDER BY d.rowid LIMIT ?
+                """,
+                (rowid, limit)
+            ).fetchall()
+        documents = []
+        for row in rows:
+            document = self._row_to_document(row, decompress_body(row["body"]))
+            document["rowid"] = row["rowid"]
+            documents.append(document)
+        return documents
+
+    def get_document(self, document_id: str) -> Optional[Dict]:
+        """Get one stored document by id, with its extracted text"""
+        with self._connect() as conn:
+            row = conn.execute(
+                """
+                SELECT d.*, b.body FROM documents d
+                LEFT JOIN document_bodies b ON b.hash = d.body_hash
+                WHERE d.id = ?
+                """,
+                (document_id,)
+            ).fetchone()
+        return self._row_to_document(row, decompress_body(row["body"])) if row else None
+
+    def count_documents(self) -> int:
+        """Number of stored documents"""
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
 
 
 # Singleton instance
 document_storage = DocumentStorage()
-
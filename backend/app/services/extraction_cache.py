@@ -0,0 +1,193 @@
+"""
+Content-addressed cache of extracted document text for LegalMitra
+
+Advocates re-upload the same judgment or notice many times. Extracted text is
+cached on disk under the SHA-256 of the content: whole uploaded files at the
+"file" level, and rendered page images at the "page" level (so an OCRed
+annexure is reused even inside a different bundle). The cache is bounded by
+total size with least-recently-used eviction.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+FILE_LEVEL = "file"
+PAGE_LEVEL = "page"
+
+# Bump to invalidate cached text when extraction output changes
+EXTRACTION_VERSION = "v1"
+
+
+def content_hash(content: bytes) -> str:
+    """SHA-256 hex digest of raw content"""
+    return hashlib.sha256(content).hexdigest()
+
+
+class ExtractionCache:
+    """Disk-backed, size-bounded LRU cache of extracted text keyed by content hash"""
+
+    def __init__(
+        self,
+        cache_dir: Path = Path("data/extraction_cache"),
+        max_bytes: int = 200 * 1024 * 1024,
+        enabled: bool = True
+    ):
+        """
+        Initialize the extraction cache
+
+        Args:
+            cache_dir: Root directory for cached text
+            max_bytes: Total size of cached text before LRU eviction
+            enabled: If False, get() always misses and put() is a no-op
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # (level, key) -> size in bytes, least recently used first
+        self._index: "OrderedDict[tuple, int]" = OrderedDict()
+        self._total_bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0, 'bytes_saved': 0}
+
+        if self.enabled:
+            self._load_index()
+
+    def _path(self, level: str, key: str) -> Path:
+        return self.cache_dir / EXTRACTION_VERSION / level / key[:2] / f"{key}.txt"
+
+    def _load_index(self):
+        """Rebuild the LRU order from file modification times"""
+        root = self.cache_dir / EXTRACTION_VERSION
+        if not root.exists():
+            return
+        entries = []
+        for level_dir in root.iterdir():
+            if not level_dir.is_dir():
+                continue
+            for path in level_dir.glob("*/*.txt"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, (level_dir.name, path.stem), stat.st_size))
+        for _, entry_key, size in sorted(entries):
+            self._index[entry_key] = size
+            self._total_bytes += size
+        if entries:
+            logger.info(f"Loaded extraction cache index: {len(entries)} entries, {self._total_bytes // 1024} KB")
+
+    def get(self, key: str, level: str = FILE_LEVEL, source_bytes: int = 0) -> Optional[str]:
+        """
+        Get cached text
+
+        Args:
+            key: Content hash (see content_hash)
+            level: FILE_LEVEL or PAGE_LEVEL
+            source_bytes: Size of the content that would otherwise be
+                re-extracted (counted as bytes saved on a hit)
+
+        Returns:
+            Cached text or None
+        """
+        if not self.enabled:
+            return None
+        entry_key = (level, key)
+        with self._lock:
+            if entry_key not in self._index:
+                self.stats['misses'] += 1
+                return None
+            self._index.move_to_end(entry_key)
+
+        path = self._path(level, key)
+        try:
+            text = path.read_text(encoding="utf-8")
+            os.utime(path)  # Persist recency across restarts
+        except OSError:
+            with self._lock:
+                self._total_bytes -= self._index.pop(entry_key, 0)
+                self.stats['misses'] += 1
+            return None
+
+        with self._lock:
+            self.stats['hits'] += 1
+            self.stats['bytes_saved'] += source_bytes
+        return text
+
+    def put(self, key: str, text: str, level: str = FILE_LEVEL):
+        """
+        Store extracted text
+
+        Args:
+            key: Content hash
+            text: Extracted text (empty text is not cached)
+            level: FILE_LEVEL or PAGE_LEVEL
+        """
+        if not self.enabled or not text or not text.strip():
+            return
+        path = self._path(level, key)
+        data = text.encode("utf-8")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write extraction cache entry: {e}")
+            return
+
+        entry_key = (level, key)
+        with self._lock:
+            self._total_bytes -= self._index.pop(entry_key, 0)
+            self._index[entry_key] = len(data)
+            self._total_bytes += len(data)
+            self.stats['writes'] += 1
+            evicted = self._evict_locked()
+        for old_level, old_key in evicted:
+            try:
+                self._path(old_level, old_key).unlink()
+            except OSError:
+                pass
+
+    def _evict_locked(self) -> list:
+        """Drop least recently used entries until under max_bytes (caller holds the lock)"""
+        evicted = []
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            entry_key, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            self.stats['evictions'] += 1
+            evicted.append(entry_key)
+        return evicted
+
+    def get_stats(self) -> Dict[str, object]:
+        """Cache size and hit counters"""
+        with self._lock:
+            total = self.stats['hits'] + self.stats['misses']
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._index),
+                'size_bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hit_rate': round(self.stats['hits'] / total * 100, 2) if total else 0,
+                **self.stats,
+            }
+
+
+def _create_cache() -> ExtractionCache:
+    """Build the shared cache from settings"""
+    from app.core.config import get_settings
+    settings = get_settings()
+    return ExtractionCache(
+        max_bytes=settings.EXTRACTION_CACHE_MAX_MB * 1024 * 1024,
+        enabled=settings.EXTRACTION_CACHE_ENABLED,
+    )
+
+
+# Global extraction cache
+extraction_cache = _create_cache()
@@ -0,0 +1,136 @@
+"""
+Dedicated worker pool for CPU-bound document extraction
+
+Document parsing (pdfplumber, python-docx, page rendering, Tesseract) is
+blocking, CPU-heavy work. It runs on its own separately sized thread pool
+instead of Starlette's shared request thread pool, so a burst of uploads
+cannot starve other endpoints. Large PDFs fan out further into the process
+pool in pdf_extraction. Queue depth, active workers and utilization are
+tracked for the diagnostics endpoint.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionWorkerPool:
+    """Bounded thread pool with queue and utilization metrics"""
+
+    def __init__(self, max_workers: int = 2):
+        """
+        Initialize the pool
+
+        Args:
+            max_workers: Concurrent extraction jobs; further jobs queue
+        """
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._started_at = time.monotonic()
+        self.queued = 0
+        self.active = 0
+        self.stats = {
+            'completed': 0,
+            'failed': 0,
+            'peak_queued': 0,
+            'total_wait_seconds': 0.0,
+            'total_busy_seconds': 0.0,
+        }
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="extraction",
+                )
+            return self._executor
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a blocking extraction function on the pool
+
+        Args:
+            func: Synchronous function
+            *args, **kwargs: Passed to func
+
+        Returns:
+            The function's return value (exceptions propagate)
+        """
+        submitted = time.monotonic()
+        with self._lock:
+            self.queued += 1
+            self.stats['peak_queued'] = max(self.stats['peak_queued'], self.queued)
+
+        state = {'started': False, 'abandoned': False}
+
+        def job():
+            started = time.monotonic()
+            with self._lock:
+                state['started'] = True
+                if not state['abandoned']:
+                    self.queued -= 1
+                self.active += 1
+                self.stats['total_wait_seconds'] += started - submitted
+            ok = False
+            try:
+                result = func(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.stats['total_busy_seconds'] += time.monotonic() - started
+                    self.stats['completed' if ok else 'failed'] += 1
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), job)
+        finally:
+            with self._lock:
+                if not state['started']:
+                    # Cancelled while still queued
+                    state['abandoned'] = True
+                    self.queued -= 1
+
+    def shutdown(self):
+        """Stop the worker threads (queued jobs are cancelled)"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, active workers and utilization since startup"""
+        with self._lock:
+            jobs = self.stats['completed'] + self.stats['failed']
+            uptime = max(time.monotonic() - self._started_at, 1e-9)
+            return {
+                'max_workers': self.max_workers,
+                'active': self.active,
+                'queued': self.queued,
+                'peak_queued': self.stats['peak_queued'],
+                'completed': self.stats['completed'],
+                'failed': self.stats['failed'],
+                'avg_wait_ms': round(self.stats['total_wait_seconds'] / jobs * 1000, 1) if jobs else 0,
+                'avg_run_ms': round(self.stats['total_busy_seconds'] / jobs * 1000, 1) if jobs else 0,
+                'utilization_percent': round(
+                    self.stats['total_busy_seconds'] / (uptime * self.max_workers) * 100, 2
+                ),
+            }
+
+
+def _create_pool() -> ExtractionWorkerPool:
+    """Build the shared pool from settings"""
+    from app.core.config import get_settings
+    return ExtractionWorkerPool(max_workers=get_settings().EXTRACTION_WORKERS)
+
+
+# Global extraction worker pool
+extraction_workers = _create_pool()
@@ -0,0 +1,468 @@
+"""
+Background-refreshed legal feeds for LegalMitra
+
+Builds the "major cases" and "legal news" feeds shown on the home page from
+Google Custom Search, off the request path. The latest snapshot of each feed
+is kept in memory and on disk so that /major-cases and /legal-news can answer
+instantly, and a scheduler rebuilds the snapshots periodically.
+"""
+
+import asyncio
+import json
+import logging
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import get_settings
+from app.services.search_http_client import search_budget
+from app.services.search_quota import PRIORITY_PRELOAD
+
+logger = logging.getLogger(__name__)
+
+FEED_MAJOR_CASES = "major_cases"
+FEED_LEGAL_NEWS = "legal_news"
+
+# Total time allowed for all web searches behind one feed build
+FEED_SEARCH_BUDGET_SECONDS = 20.0
+
+# Minimum gap between request-triggered rebuilds of a feed that keeps failing
+FEED_RETRY_SECONDS = 300
+
+
+def _fresh_web_search():
+    """Build a WebSearchService with freshly loaded settings (picks up new API keys)"""
+    get_settings.cache_clear()
+    from app.services.web_search_service import WebSearchService
+    return WebSearchService()
+
+
+async def build_major_cases(current_year: int) -> List[Dict[str, Any]]:
+    """
+    Search case law databases for recent major judgments
+
+    Returns:
+        List of case dicts (title, court, year, citation, summary, query);
+        empty if web search is unavailable or found nothing usable
+    """
+    web_search = _fresh_web_search()
+    logger.info(f"Web search service available: {web_search.is_available()}")
+    if not web_search.is_available():
+        return []
+
+    logger.info(f"Searching for major cases for year {current_year}...")
+
+    # Try multiple search strategies with better queries
+    search_queries = [
+        f'"{current_year}" "Supreme Court" "judgment" India',
+        f'"{current_year-1}" "Supreme Court" "judgment" India',
+        f'"{current_year}" "High Court" "judgment" India',
+        f'"recent judgment" "{current_year}" India court',
+    ]
+
+    all_results = []
+    # Bound the whole strategy loop by one budget
+    with search_budget(FEED_SEARCH_BUDGET_SECONDS):
+        for search_query in search_queries:
+            # First try case law databases
+            case_results = await web_search.search_legal_sites(
+                search_query,
+                max_results=5,
+                sites=web_search.CASE_LAW_SITES,
+                priority=PRIORITY_PRELOAD
+            )
+            all_results.extend(case_results)
+
+            # If we don't have enough, try broader search without site restriction
+            if len(all_results) < 5:
+                try:
+                    broad_results = await web_search.search_web(
+                        f"{search_query} judgment India",
+                        max_results=5,
+                        priority=PRIORITY_PRELOAD
+                    )
+                    for item in broad_results:
+                        # Only add if not duplicate
+                        if not any(r.get("url") == item.get("url") for r in all_results):
+                            all_results.append(item)
+                            if len(all_results) >= 5:
+                                break
+                except Exception as e:
+                    logger.warning(f"Broader search error: {e}")
+
+            if len(all_results) >= 5:
+                break
+
+    logger.info(f"Found {len(all_results)} search results for major cases")
+
+    # Filter out homepage/results that don't look like actual cases
+    cases = []
+    for result in all_results[:10]:  # Check more to filter better
+        title = result.get("title", "Recent Judgment")
+        snippet = result.get("snippet", "")
+
+        # Skip homepages and non-case pages
+        title_lower = title.lower()
+        if any(skip_word in title_lower for skip_word in [
+            'home', 'welcome', 'login', 'register', 'about', 'contact',
+            'main page', 'index', 'search', 'results'
+        ]):
+            continue
+
+        # Extract court and year from title/snippet
+        court = "Supreme Court of India"
+        year = current_year
+
+        snippet_lower = snippet.lower()
+
+        if "karnataka" in title_lower or "karnataka" in snippet_lower:
+            court = "Karnataka High Court"
+        elif "bombay" in title_lower or "bombay" in snippet_lower:
+            court = "Bombay High Court"
+        elif "delhi" in title_lower or "delhi" in snippet_lower:
+            court = "Delhi High Court"
+        elif "calcutta" in title_lower or "calcutta" in snippet_lower or "kolkata" in title_lower:
+            court = "Calcutta High Court"
+        elif "madras" in title_lower or "madras" in snippet_lower or "chennai" in title_lower:
+            court = "Madras High Court"
+        elif "allahabad" in title_lower or "allahabad" in snippet_lower:
+            court = "Allahabad High Court"
+        elif "high court" in title_lower or "high court" in snippet_lower:
+            court = "High Court"
+        elif "supreme court" in title_lower or "supreme court" in snippet_lower or "sc" in title_lower:
+            court = "Supreme Court of India"
+
+        # Extract year
+        year_match = re.search(r'\b(20\d{2})\b', title + " " + snippet)
+        if year_match:
+            year = int(year_match.group(1))
+
+        cases.append({
+            "title": title[:200],
+            "court": court,
+            "year": year,
+            "citation": None,
+            "summary": snippet[:300] if snippet else "Recent important judgment from Indian courts.",
+            "query": f"Tell me about the case: {title}",
+        })
+
+    return cases
+
+
+async def build_legal_news(current_year: int) -> List[Dict[str, Any]]:
+    """
+    Search official legal sites for the latest legal news
+
+    Returns:
+        List of news dicts (title, source, date, summary, query);
+        empty if web search is unavailable or found nothing
+    """
+    web_search = _fresh_web_search()
+    logger.info(f"Web search service available (news): {web_search.is_available()}")
+    if not web_search.is_available():
+        return []
+
+    logger.info(f"Searching for legal news for year {current_year}...")
+
+    # Try multiple search strategies
+    search_queries = [
+        f"latest legal news India {current_year}",
+        f"legal updates India {current_year} OR {current_year-1}",
+        f"legal reforms India {current_year}",
+        f"law amendments India {current_year}",
+    ]
+
+    all_results = []
+    # Bound the whole strategy loop by one budget
+    with search_budget(FEED_SEARCH_BUDGET_SECONDS):
+        for search_query in search_queries:
+            # Search official legal sites
+            news_results = await web_search.search_legal_sites(
+                search_query,
+                max_results=5,
+                priority=PRIORITY_PRELOAD
+            )
+            all_results.extend(news_results)
+
+            # If we don't have enough, try broader search
+            if len(all_results) < 5:
+                try:
+                    broad_results = await web_search.search_web(
+                        search_query,
+                        max_results=5,
+                        priority=PRIORITY_PRELOAD
+                    )
+                    for item in broad_results:
+                        # Prefer official sites but accept others if needed
+                        if not any(r.get("url") == item.get("url") for r in all_results):
+                            all_results.append(item)
+                            if len(all_results) >= 5:
+                                break
+                except Exception as e:
+                    logger.warning(f"Broader news search error: {e}")
+
+            if len(all_results) >= 5:
+                break
+
+    logger.info(f"Found {len(all_results)} search results for legal news")
+
+    news_items = []
+    for result in all_results[:5]:
+        title = result.get("title", "Latest Legal News")
+        snippet = result.get("snippet", "")
+        url = result.get("url", "")
+
+        # Extract source from URL
+        source = None
+        url_lower = url.lower()
+        if "pib.gov.in" in url_lower:
+            source = "PIB"
+        elif "prsindia.org" in url_lower:
+            source = "PRS Legislative Research"
+        elif "legislative.gov.in" in url_lower:
+            source = "Legislative Department"
+        elif "legalaffairs.gov.in" in url_lower:
+            source = "Department of Legal Affairs"
+        elif "egazette.nic.in" in url_lower:
+            source = "eGazette"
+        elif "indiancode.nic.in" in url_lower:
+            source = "India Code"
+        elif "cbic.gov.in" in url_lower or "gst.gov.in" in url_lower:
+            source = "CBIC"
+        elif "finmin.nic.in" in url_lower:
+            source = "Ministry of Finance"
+        elif "mca.gov.in" in url_lower:
+            source = "Ministry of Corporate Affairs"
+        else:
+            # Extract domain name as source
+            domain_match = re.search(r'://(?:www\.)?([^/]+)', url)
+            if domain_match:
+                source = domain_match.group(1).replace('.in', '').replace('.org', '').title()
+
+        # Extract date
+        date_match = re.search(r'\b(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{1,2},?\s+(\d{4})\b', title + " " + snippet, re.IGNORECASE)
+        date_str = str(current_year)
+        if date_match:
+            date_str = date_match.group(2)
+        else:
+            year_match = re.search(r'\b(20\d{2})\b', title + " " + snippet)
+            if year_match:
+                date_str = year_match.group(1)
+
+        news_items.append({
+            "title": title[:200],
+            "source": source or "Legal Updates",
+            "date": date_str,
+            "summary": snippet[:300] if snippet else "Latest legal news and updates from India.",
+            "query": f"Tell me more about: {title}",
+        })
+
+    return news_items
+
+
+class FeedRefresher:
+    """
+    Keeps the latest snapshot of each feed and rebuilds it in the background
+
+    Snapshots survive restarts via a small JSON file. A refresh never replaces
+    a good snapshot with an empty one, so a failed or quota-limited search
+    keeps serving the previous feed.
+    """
+
+    def __init__(
+        self,
+        builders: Dict[str, Callable[[int], Awaitable[List[Dict[str, Any]]]]],
+        refresh_interval_minutes: int = 360,
+        enable_persistence: bool = True,
+        snapshot_file: Path = Path("data/feed_snapshots.json")
+    ):
+        """
+        Initialize the feed refresher
+
+        Args:
+            builders: Feed name -> async builder taking the current year
+            refresh_interval_minutes: How often the scheduler rebuilds every feed
+            enable_persistence: Save snapshots to disk across restarts
+            snapshot_file: Location of the persisted snapshots
+        """
+        self.builders = builders
+        self.refresh_interval_minutes = refresh_interval_minutes
+        self.enable_persistence = enable_persistence
+        self.snapshot_file = snapshot_file
+
+        # {feed: {"items": [...], "generated_at": iso str}}
+        self.snapshots: Dict[str, Dict[str, Any]] = {}
+        self.last_error: Dict[str, Optional[str]] = {}
+        self.last_attempt: Dict[str, datetime] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._scheduler: Optional[asyncio.Task] = None
+
+        if self.enable_persistence:
+            self._load_from_disk()
+
+    def get_snapshot(self, feed: str) -> Optional[Dict[str, Any]]:
+        """
+        Latest snapshot of a feed with its age
+
+        Returns:
+            Dict with items, generated_at and age_seconds, or None if never built
+        """
+        snapshot = self.snapshots.get(feed)
+        if not snapshot:
+            return None
+        generated_at = datetime.fromisoformat(snapshot["generated_at"])
+        return {
+            "items": snapshot["items"],
+            "generated_at": snapshot["generated_at"],
+            "age_seconds": round((datetime.now() - generated_at).total_seconds(), 1),
+        }
+
+    def is_stale(self, feed: str) -> bool:
+        """True if a feed was never built or is older than the refresh interval"""
+        snapshot = self.get_snapshot(feed)
+        return snapshot is None or snapshot["age_seconds"] > self.refresh_interval_minutes * 60
+
+    def refresh(self, feed: str) -> asyncio.Task:
+        """
+        Start rebuilding a feed in the background
+
+        Concurrent triggers for the same feed share one in-flight build.
+
+        Returns:
+            The task building the feed (await it to wait for completion)
+        """
+        if feed not in self.builders:
+            raise KeyError(f"Unknown feed: {feed}")
+        task = self._inflight.get(feed)
+        if task is None or task.done():
+            task = asyncio.create_task(self._rebuild(feed))
+            self._inflight[feed] = task
+        return task
+
+    def refresh_if_stale(self, feed: str) -> Optional[asyncio.Task]:
+        """
+        Start a background rebuild if the feed is stale
+
+        Called on the request path; a feed whose builds keep failing is retried
+        at most every FEED_RETRY_SECONDS rather than on every page load.
+        """
+        if not self.is_stale(feed):
+            return None
+        last_attempt = self.last_attempt.get(feed)
+        if last_attempt and (datetime.now() - last_attempt).total_seconds() < FEED_RETRY_SECONDS:
+            return None
+        return self.refresh(feed)
+
+    async def refresh_all(self):
+        """Rebuild every feed and wait for completion"""
+        await asyncio.gather(*(self.refresh(feed) for feed in self.builders))
+
+    async def _rebuild(self, feed: str) -> bool:
+        """Build one feed and store it if the build produced items"""
+        self.last_attempt[feed] = datetime.now()
+        try:
+            items = await self.builders[feed](datetime.now().year)
+        except Exception as e:
+            logger.error(f"Feed refresh failed for {feed}: {e}", exc_info=True)
+            self.last_error[feed] = str(e)
+            return False
+
+        if not items:
+            logger.warning(f"Feed refresh for {feed} returned no items; keeping previous snapshot")
+            self.last_error[feed] = "no items"
+            return False
+
+        self.snapshots[feed] = {
+            "items": items,
+            "generated_at": datetime.now().isoformat(),
+        }
+        self.last_error[feed] = None
+        logger.info(f"Refreshed feed {feed} with {len(items)} items")
+        self._save_to_disk()
+        return True
+
+    def start(self):
+        """Start the periodic refresh scheduler (call from the running event loop)"""
+        if self._scheduler is None or self._scheduler.done():
+            self._scheduler = asyncio.create_task(self._run_scheduler())
+
+    async def stop(self):
+        """Stop the scheduler and any in-flight builds"""
+        tasks = [t for t in [self._scheduler, *self._inflight.values()] if t and not t.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._scheduler = None
+        self._inflight.clear()
+
+    async def _run_scheduler(self):
+        """Refresh stale feeds immediately, then every refresh interval"""
+        while True:
+            for feed in self.builders:
+                if self.is_stale(feed):
+                    try:
+                        await self.refresh(feed)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        logger.error(f"Scheduled refresh failed for {feed}: {e}")
+            await asyncio.sleep(self.refresh_interval_minutes * 60)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Age, size and refresh state of every feed"""
+        status = {}
+        for feed in self.builders:
+            snapshot = self.get_snapshot(feed)
+            task = self._inflight.get(feed)
+            status[feed] = {
+                "items": len(snapshot["items"]) if snapshot else 0,
+                "generated_at": snapshot["generated_at"] if snapshot else None,
+                "age_seconds": snapshot["age_seconds"] if snapshot else None,
+                "stale": self.is_stale(feed),
+                "refreshing": bool(task and not task.done()),
+                "last_error": self.last_error.get(feed),
+            }
+        return {
+            "refresh_interval_minutes": self.refresh_interval_minutes,
+            "scheduler_running": bool(self._scheduler and not self._scheduler.done()),
+            "feeds": status,
+        }
+
+    def _load_from_disk(self):
+        """Load persisted snapshots"""
+        try:
+            if not self.snapshot_file.exists():
+                return
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.snapshots = {
+                feed: snapshot for feed, snapshot in data.get("snapshots", {}).items()
+                if feed in self.builders and snapshot.get("items")
+            }
+            logger.info(f"Loaded {len(self.snapshots)} feed snapshots from disk")
+        except Exception as e:
+            logger.warning(f"Could not load feed snapshots from disk: {e}")
+
+    def _save_to_disk(self):
+        """Persist snapshots"""
+        if not self.enable_persistence:
+            return
+        try:
+            self.snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.snapshot_file.with_suffix(".tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({"snapshots": self.snapshots}, f, indent=2, ensure_ascii=False)
+            tmp_file.replace(self.snapshot_file)
+        except Exception as e:
+            logger.warning(f"Could not save feed snapshots to disk: {e}")
+
+
+# Global feed refresher
+feed_refresher = FeedRefresher(
+    builders={
+        FEED_MAJOR_CASES: build_major_cases,
+        FEED_LEGAL_NEWS: build_legal_news,
+    },
+    refresh_interval_minutes=get_settings().FEED_REFRESH_INTERVAL_MINUTES,
+)
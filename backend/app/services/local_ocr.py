@@ -0,0 +1,320 @@
+"""
+Local Tesseract OCR engine for LegalMitra
+
+Scanned documents used to depend on the Gemini / OpenAI vision APIs, with
+their latency, quota and cost. This engine runs Tesseract (eng+hin by
+default) locally in a process pool, one page per task, after cleaning the
+page up for OCR: grayscale, deskew (projection-profile search over small
+angles) and Otsu binarization. Each page result carries Tesseract's mean
+word confidence, which the OCR policy uses to decide whether a page still
+needs a remote vision model:
+
+    remote_first           vision APIs first, Tesseract only if they fail
+    local_first            Tesseract first, vision APIs only if it fails
+    remote_low_confidence  Tesseract first, vision APIs for pages below
+                           OCR_MIN_CONFIDENCE
+"""
+
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+try:
+    import pytesseract
+    TESSERACT_AVAILABLE = True
+except ImportError:
+    TESSERACT_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+REMOTE_FIRST = "remote_first"
+LOCAL_FIRST = "local_first"
+REMOTE_LOW_CONFIDENCE = "remote_low_confidence"
+OCR_POLICIES = (REMOTE_FIRST, LOCAL_FIRST, REMOTE_LOW_CONFIDENCE)
+
+# Skew search range and step in degrees (scanner skew is rarely beyond 5)
+MAX_SKEW_DEGREES = 5.0
+SKEW_STEP_DEGREES = 0.5
+# Width the skew search runs at; the correction is applied to the full page
+SKEW_SEARCH_WIDTH = 800
+
+
+def otsu_threshold(histogram: List[int]) -> int:
+    """Otsu's threshold for a 256-bin grayscale histogram"""
+    total = sum(histogram)
+    if not total:
+        return 128
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+    sum_background = 0.0
+    weight_background = 0
+    best_threshold, best_variance = 0, -1.0
+    for i, count in enumerate(histogram):
+        weight_background += count
+        if weight_background == 0:
+            continue
+        weight_foreground = total - weight_background
+        if weight_foreground == 0:
+            break
+        sum_background += i * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = i, variance
+    return best_threshold
+
+
+def binarize(img: "Image.Image") -> "Image.Image":
+    """Grayscale, stretch contrast and threshold with Otsu (black text on white)"""
+    gray = ImageOps.autocontrast(img.convert("L"), cutoff=1)
+    threshold = otsu_threshold(gray.histogram())
+    return gray.point(lambda p: 255 if p > threshold else 0)
+
+
+def estimate_skew(img: "Image.Image") -> float:
+    """
+    Skew angle in degrees that straightens the text lines of a binarized page
+
+    Text lines are horizontal when the row-sum profile of ink is most peaked,
+    so the page is rotated through candidate angles and the one with the
+    highest profile variance wins.
+    """
+    scale = min(1.0, SKEW_SEARCH_WIDTH / img.width)
+    small = img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))))
+    ink = ImageOps.invert(small.convert("L"))
+    steps = int(MAX_SKEW_DEGREES / SKEW_STEP_DEGREES)
+    best_angle, best_score = 0.0, -1.0
+    for i in range(-steps, steps + 1):
+        angle = i * SKEW_STEP_DEGREES
+        rotated = ink.rotate(angle, resample=Image.BILINEAR, fillcolor=0)
+        # BOX-resizing to one column gives the mean ink of every row
+        profile = list(rotated.resize((1, rotated.height), Image.BOX).getdata())
+        mean = sum(profile) / len(profile)
+        score = sum((value - mean) ** 2 for value in profile)
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+
+def preprocess_page(img: "Image.Image") -> Tuple["Image.Image", float]:
+    """Binarize and deskew a page image; returns (image, angle corrected)"""
+    page = binarize(img)
+    angle = estimate_skew(page)
+    if angle:
+        page = page.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+        page = page.point(lambda p: 255 if p > 127 else 0)
+    return page, angle
+
+
+def assemble_ocr_data(data: Dict[str, List[Any]]) -> Tuple[str, float]:
+    """
+    Text and confidence from pytesseract.image_to_data output
+
+    Words are joined into lines, with a blank line between paragraphs.
+    Confidence is the mean word confidence (0-100) weighted by word length.
+    """
+    lines: "OrderedDict[tuple, List[str]]" = OrderedDict()
+    weighted, weight = 0.0, 0
+    for i, word in enumerate(data.get("text", [])):
+        word = (word or "").strip()
+        confidence = float(data["conf"][i])
+        if not word or confidence < 0:
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append(word)
+        weighted += confidence * len(word)
+        weight += len(word)
+
+    text_lines: List[str] = []
+    previous_paragraph = None
+    for (block, paragraph, _), words in lines.items():
+        if previous_paragraph is not None and (block, paragraph) != previous_paragraph:
+            text_lines.append("")
+        text_lines.append(" ".join(words))
+        previous_paragraph = (block, paragraph)
+    return "\n".join(text_lines), round(weighted / weight, 1) if weight else 0.0
+
+
+def ocr_image(image_bytes: bytes, lang: str = "eng", preprocess: bool = True) -> Dict[str, Any]:
+    """
+    OCR one image with Tesseract
+
+    Runs inside pool workers, so it must stay a picklable module-level function.
+
+    Args:
+        image_bytes: Encoded image (PNG/JPEG/...)
+        lang: Tesseract languages, e.g. "eng+hin"
+        preprocess: Binarize and deskew first
+
+    Returns:
+        Dict with text, confidence (0-100) and skew (degrees corrected)
+    """
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        img = ImageOps.exif_transpose(img)
+        if preprocess:
+            page, angle = preprocess_page(img)
+        else:
+            page, angle = img.convert("L"), 0.0
+    data = pytesseract.image_to_data(page, lang=lang, output_type=pytesseract.Output.DICT)
+    text, confidence = assemble_ocr_data(data)
+    return {"text": text, "confidence": confidence, "skew": angle}
+
+
+def normalize_policy(policy: str) -> str:
+    """Validate an OCR_POLICY value (unknown values fall back to remote_first)"""
+    value = (policy or "").strip().lower().replace("-", "_")
+    if value not in OCR_POLICIES:
+        logger.warning(f"Unknown OCR_POLICY '{policy}', using '{REMOTE_FIRST}'")
+        return REMOTE_FIRST
+    return value
+
+
+class LocalOcrEngine:
+    """Tesseract OCR of page images across a process pool"""
+
+    def __init__(
+        self,
+        max_workers: int = 0,
+        lang: str = "eng+hin",
+        min_confidence: float = 70.0,
+        policy: str = REMOTE_FIRST
+    ):
+        """
+        Initialize the engine
+
+        Args:
+            max_workers: Worker processes (0 = one per CPU, capped at 4)
+            lang: Tesseract languages; ones not installed are dropped
+            min_confidence: Pages below this mean word confidence count
+                as low confidence (see is_low_confidence)
+            policy: One of OCR_POLICIES
+        """
+        if max_workers <= 0:
+            max_workers = min(4, os.cpu_count() or 1)
+        self.max_workers = max_workers
+        self.lang = lang
+        self.min_confidence = min_confidence
+        self.policy = normalize_policy(policy)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._resolved_lang: Optional[str] = None
+        self.stats = {'pages': 0, 'failures': 0, 'low_confidence': 0, 'confidence_total': 0.0}
+
+    def available(self) -> bool:
+        """Whether pytesseract and the tesseract binary are usable (cached probe)"""
+        if not (TESSERACT_AVAILABLE and PIL_AVAILABLE):
+            return False
+        from app.services.ocr_toolchain import ocr_toolchain
+        return ocr_toolchain.capabilities()['tesseract']['available']
+
+    def languages(self) -> str:
+        """Requested languages that are installed (e.g. "eng" if hin is missing)"""
+        if self._resolved_lang is None:
+            from app.services.ocr_toolchain import ocr_toolchain
+            installed = set(ocr_toolchain.capabilities()['tesseract'].get('languages') or [])
+            requested = [lang for lang in self.lang.split("+") if lang]
+            usable = [lang for lang in requested if lang in installed] if installed else requested
+            missing = sorted(set(requested) - set(usable))
+            if missing:
+                logger.warning(f"Tesseract language packs not installed: {', '.join(missing)}")
+            self._resolved_lang = "+".join(usable) or "eng"
+        return self._resolved_lang
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Lazily start the pool (spawn: forking a threaded server is unsafe)"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                logger.info(f"Started Tesseract OCR pool with {self.max_workers} workers ({self.languages()})")
+            return self._executor
+
+    async def ocr_image(self, image_bytes: bytes) -> Dict[str, Any]:
+        """
+        OCR one page image in the pool
+
+        Args:
+            image_bytes: Encoded page image
+
+        Returns:
+            Dict with text, confidence (0-100) and skew
+
+        Raises:
+            Exception: If Tesseract is unavailable or the worker fails
+        """
+        if not self.available():
+            raise Exception("Tesseract OCR is not available (install tesseract and pytesseract)")
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(
+                self._get_executor(), ocr_image, bytes(image_bytes), self.languages()
+            )
+        except BrokenProcessPool:
+            self.shutdown()
+            self.stats['failures'] += 1
+            raise Exception("Tesseract OCR worker crashed")
+        except Exception:
+            self.stats['failures'] += 1
+            raise
+        self.stats['pages'] += 1
+        self.stats['confidence_total'] += result['confidence']
+        if self.is_low_confidence(result):
+            self.stats['low_confidence'] += 1
+        return result
+
+    def is_low_confidence(self, result: Dict[str, Any]) -> bool:
+        """Whether a page result is empty or below min_confidence"""
+        return not result['text'].strip() or result['confidence'] < self.min_confidence
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool size, policy and confidence counters"""
+        pages = self.stats['pages']
+        return {
+            'policy': self.policy,
+            'max_workers': self.max_workers,
+            'lang': self.lang,
+            'min_confidence': self.min_confidence,
+            'pool_running': self._executor is not None,
+            'pages': pages,
+            'failures': self.stats['failures'],
+            'low_confidence': self.stats['low_confidence'],
+            'avg_confidence': round(self.stats['confidence_total'] / pages, 1) if pages else 0,
+        }
+
+
+def _create_engine() -> LocalOcrEngine:
+    """Build the shared engine from settings"""
+    from app.core.config import get_settings
+    settings = get_settings()
+    return LocalOcrEngine(
+        max_workers=settings.TESSERACT_WORKERS,
+        lang=settings.TESSERACT_LANG,
+        min_confidence=settings.OCR_MIN_CONFIDENCE,
+        policy=settings.OCR_POLICY,
+    )
+
+
+# Global local OCR engine
+local_ocr = _create_engine()
@@ -0,0 +1,115 @@
+"""
+Near-duplicate detection for stored documents
+
+The same judgment often arrives as a PDF, a scan and a DOCX. Their texts
+differ in layout, headers and OCR errors but share most word sequences, so
+documents are compared by the Jaccard similarity of their word 3-gram
+(shingle) sets. The similarity is estimated from fixed-size MinHash
+signatures, and LSH buckets (bands of the signature) narrow the comparison
+to the few stored documents that share a bucket with the new one instead
+of all of them.
+
+Signatures use one-permutation hashing: each shingle is hashed once and
+falls into one of SIGNATURE_SIZE bins that keep their minimum (empty bins
+borrow from the next non-empty one), so a signature costs one hash per
+shingle rather than one per shingle and permutation.
+"""
+
+import hashlib
+import re
+import struct
+from typing import Dict, List, Optional, Set
+
+SHINGLE_WORDS = 3
+SIGNATURE_SIZE = 128
+# 32 bands of 4 bins: documents at 0.6 similarity share a bucket with ~99%
+# probability, documents at 0.2 with ~5%
+LSH_BANDS = 32
+LSH_ROWS = SIGNATURE_SIZE // LSH_BANDS
+# Estimated shingle Jaccard from which a document is a duplicate (OCR of a
+# scan typically lands around 0.65-0.8 against the typed original)
+DUPLICATE_THRESHOLD = 0.6
+# Shorter texts are never treated as duplicates: too little to tell
+MIN_SHINGLES = 25
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_MASK = (1 << 64) - 1
+# Odd multipliers that make the shingle hash depend on word order
+_POSITION_MULTIPLIERS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 1)
+_BIN_BITS = SIGNATURE_SIZE.bit_length() - 1
+# Offset per bin skipped when an empty bin borrows a value (keeps borrowed
+# values distinct from real ones)
+_BORROW_OFFSET = 1 << (64 - _BIN_BITS)
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+def shingle_hashes(text: str) -> Set[int]:
+    """64-bit hashes of the word 3-grams of a text (case-insensitive)"""
+    word_hashes: Dict[str, int] = {}
+    hashes = []
+    for word in _WORD_RE.findall(text.lower()):
+        value = word_hashes.get(word)
+        if value is None:
+            value = word_hashes[word] = _hash64(word.encode("utf-8"))
+        hashes.append(value)
+    m0, m1, m2 = _POSITION_MULTIPLIERS
+    return {
+        ((a * m0) ^ (b * m1) ^ (c * m2)) & _MASK
+        for a, b, c in zip(hashes, hashes[1:], hashes[2:])
+    }
+
+
+def minhash_signature(text: str) -> Optional[List[int]]:
+    """
+    MinHash signature of a text
+
+    Returns:
+        SIGNATURE_SIZE unsigned 64-bit values, or None if the text has fewer
+        than MIN_SHINGLES distinct shingles
+    """
+    hashes = shingle_hashes(text)
+    if len(hashes) < MIN_SHINGLES:
+        return None
+    bins: List[Optional[int]] = [None] * SIGNATURE_SIZE
+    for value in hashes:
+        index = value & (SIGNATURE_SIZE - 1)
+        value >>= _BIN_BITS
+        current = bins[index]
+        if current is None or value < current:
+            bins[index] = value
+
+    # Densify: an empty bin takes the value of the next non-empty bin (circularly)
+    signature = []
+    for index in range(SIGNATURE_SIZE):
+        for skipped in range(SIGNATURE_SIZE):
+            value = bins[(index + skipped) % SIGNATURE_SIZE]
+            if value is not None:
+                signature.append(value + skipped * _BORROW_OFFSET)
+                break
+    return signature
+
+
+def signature_similarity(a: List[int], b: List[int]) -> float:
+    """Estimated Jaccard similarity of the texts behind two signatures"""
+    return sum(1 for x, y in zip(a, b) if x == y) / SIGNATURE_SIZE
+
+
+def lsh_buckets(signature: List[int]) -> List[int]:
+    """One bucket key per band (signed 64-bit, to fit an SQLite INTEGER)"""
+    buckets = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        digest = hashlib.blake2b(struct.pack(f">I{LSH_ROWS}Q", band, *rows), digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, "big", signed=True))
+    return buckets
+
+
+def pack_signature(signature: List[int]) -> bytes:
+    return struct.pack(f"<{SIGNATURE_SIZE}Q", *signature)
+
+
+def unpack_signature(data: bytes) -> List[int]:
+    return list(struct.unpack(f"<{SIGNATURE_SIZE}Q", data))
@@ -0,0 +1,189 @@
+"""
+OCR toolchain discovery for LegalMitra
+
+Which OCR tools exist (Poppler for rendering PDF pages, local Tesseract,
+Gemini / OpenAI vision) does not change while the server runs. The toolchain
+is probed once - at startup, or on first use - and the resulting capability
+matrix is cached, so picking an extraction strategy for an upload costs a
+dict lookup instead of a PATH search and a pdftoppm process spawn.
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Where the Windows Poppler builds usually end up when not on PATH
+WINDOWS_POPPLER_DIRS = [
+    r"C:\Program Files\poppler\Library\bin",
+    r"C:\poppler\Library\bin",
+    r"C:\Program Files (x86)\poppler\Library\bin",
+]
+
+
+def _run_version(command: List[str]) -> Optional[str]:
+    """First line of a tool's version/help output, or None if it does not run"""
+    try:
+        result = subprocess.run(
+            command,
+            capture_output=True,
+            text=True,
+            timeout=5,
+            creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    output = (result.stderr or result.stdout or "").strip()
+    if result.returncode != 0 and os.path.basename(command[0]).split(".")[0] not in output:
+        return None
+    return output.splitlines()[0] if output else ""
+
+
+def probe_poppler() -> Dict[str, Any]:
+    """Find pdftoppm on PATH or in the usual Windows install directories"""
+    path = shutil.which("pdftoppm")
+    added_to_path = False
+    if not path:
+        for bin_dir in WINDOWS_POPPLER_DIRS:
+            candidate = os.path.join(bin_dir, "pdftoppm.exe")
+            if os.path.exists(candidate):
+                path = candidate
+                # pdf2image looks tools up on PATH; add the directory once for this process
+                os.environ['PATH'] = bin_dir + os.pathsep + os.environ.get('PATH', '')
+                added_to_path = True
+                logger.info(f"Found Poppler at: {bin_dir}, added to PATH for this session")
+                break
+    if not path:
+        return {'available': False, 'path': None, 'version': None, 'error': "pdftoppm command not found"}
+    version = _run_version([path, "-v"])
+    if version is None:
+        return {'available': False, 'path': path, 'version': None, 'error': "pdftoppm command not working correctly"}
+    return {'available': True, 'path': path, 'version': version, 'added_to_path': added_to_path, 'error': None}
+
+
+def probe_tesseract() -> Dict[str, Any]:
+    """Check pytesseract, the tesseract binary and its installed languages"""
+    try:
+        import pytesseract
+    except ImportError:
+        return {'available': False, 'version': None, 'languages': [], 'error': "pytesseract not installed"}
+    try:
+        version = str(pytesseract.get_tesseract_version())
+        languages = sorted(lang for lang in pytesseract.get_languages(config="") if lang != "osd")
+    except Exception as e:
+        return {'available': False, 'version': None, 'languages': [], 'error': f"tesseract binary not usable: {e}"}
+    return {'available': True, 'version': version, 'languages': languages, 'error': None}
+
+
+def probe_vision_apis(settings) -> Dict[str, Dict[str, Any]]:
+    """Vision OCR providers: SDK importable and API key configured (no network calls)"""
+    try:
+        from google import genai  # noqa: F401
+        genai_installed = True
+    except ImportError:
+        genai_installed = False
+    try:
+        from openai import AsyncOpenAI  # noqa: F401
+        openai_installed = True
+    except Exception:
+        openai_installed = False
+
+    gemini_key = bool(settings and settings.GOOGLE_GEMINI_API_KEY)
+    openai_key = bool(settings and settings.OPENAI_API_KEY)
+    return {
+        'gemini': {
+            'available': genai_installed and gemini_key,
+            'sdk_installed': genai_installed,
+            'api_key_configured': gemini_key,
+        },
+        'openai': {
+            'available': openai_installed and openai_key,
+            'sdk_installed': openai_installed,
+            'api_key_configured': openai_key,
+        },
+    }
+
+
+class OcrToolchain:
+    """Cached capability matrix of the OCR toolchain"""
+
+    def __init__(self):
+        self._capabilities: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def probe(self) -> Dict[str, Any]:
+        """Probe every tool now and replace the cached matrix (blocking)"""
+        from app.core.config import get_settings
+        started = time.monotonic()
+        try:
+            settings = get_settings()
+        except Exception:
+            settings = None
+        try:
+            import pdf2image  # noqa: F401
+            pdf2image_installed = True
+        except ImportError:
+            pdf2image_installed = False
+        try:
+            import PIL  # noqa: F401
+            pil_installed = True
+        except ImportError:
+            pil_installed = False
+
+        capabilities = {
+            'poppler': probe_poppler(),
+            'tesseract': probe_tesseract(),
+            **probe_vision_apis(settings),
+            'pdf2image_installed': pdf2image_installed,
+            'pil_installed': pil_installed,
+        }
+        capabilities['pdf_ocr_available'] = (
+            pdf2image_installed and pil_installed and capabilities['poppler']['available']
+        )
+        capabilities['probed_at'] = datetime.now().isoformat()
+        capabilities['probe_ms'] = round((time.monotonic() - started) * 1000, 1)
+
+        with self._lock:
+            self._capabilities = capabilities
+        logger.info(
+            "OCR toolchain: poppler=%s tesseract=%s gemini=%s openai=%s (%.0f ms)",
+            capabilities['poppler']['available'], capabilities['tesseract']['available'],
+            capabilities['gemini']['available'], capabilities['openai']['available'],
+            capabilities['probe_ms'],
+        )
+        return capabilities
+
+    def capabilities(self) -> Dict[str, Any]:
+        """The cached capability matrix (probed on first use)"""
+        with self._lock:
+            capabilities = self._capabilities
+        return capabilities if capabilities is not None else self.probe()
+
+    def vision_engines(self) -> List[str]:
+        """Remote OCR engines to try, in order of preference"""
+        capabilities = self.capabilities()
+        return [name for name in ('gemini', 'openai') if capabilities[name]['available']]
+
+    def poppler_error(self) -> str:
+        """User-facing explanation of why PDF pages cannot be rendered"""
+        poppler = self.capabilities()['poppler']
+        message = (
+            "Poppler is not installed or not in PATH. pdf2image requires Poppler to convert "
+            f"PDF pages to images. Error: {poppler['error']}"
+        )
+        if poppler['path']:
+            bin_dir = os.path.dirname(poppler['path'])
+            message += f"\n\n[SOLUTION] Poppler was found at: {bin_dir}\n"
+            message += "But it could not be run. Reinstall Poppler, add it to PATH, and restart the server."
+        return message
+
+
+# Global toolchain matrix
+ocr_toolchain = OcrToolchain()
@@ -0,0 +1,328 @@
+"""
+Parallel PDF text extraction for LegalMitra
+
+pdfplumber text extraction is CPU-bound and holds the GIL, so a long judgment
+is parsed one page at a time. Large PDFs are split into contiguous page
+ranges that run in a process pool; each worker reopens the PDF file, and
+the page texts are merged back in page order. Small PDFs use the serial path,
+where starting workers would cost more than it saves.
+
+Each page comes back with its size and image count. That lets mixed
+documents (typed orders with scanned annexures) be classified page by page:
+pages with a usable text layer keep it, and only image-only pages are OCRed.
+"""
+
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from app.services.upload_spool import BytesLike, open_binary
+
+try:
+    import pdfplumber
+    PDF_PLUMBER_AVAILABLE = True
+except ImportError:
+    PDF_PLUMBER_AVAILABLE = False
+
+try:
+    import PyPDF2
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Each worker gets a few ranges so one dense range does not stall the merge
+RANGES_PER_WORKER = 2
+
+# Pages with less native text than this are treated as scanned
+# (0.5 chars per square inch is about 48 characters on an A4 page)
+MIN_TEXT_CHARS_PER_SQ_INCH = 0.5
+
+POINTS_PER_INCH = 72.0
+
+
+def page_text_density(page: Dict[str, Any]) -> float:
+    """Non-whitespace characters of native text per square inch of page"""
+    area = (page["width"] / POINTS_PER_INCH) * (page["height"] / POINTS_PER_INCH)
+    chars = len("".join(page["text"].split()))
+    return chars / area if area > 0 else float(chars)
+
+
+def page_needs_ocr(page: Dict[str, Any]) -> bool:
+    """
+    Whether a page has no usable text layer and should be OCRed
+
+    Pages below the density threshold are OCRed only if they contain images
+    (or the image count is unknown), so genuinely blank pages cost nothing.
+    """
+    if page_text_density(page) >= MIN_TEXT_CHARS_PER_SQ_INCH:
+        return False
+    return page.get("images") is None or page["images"] > 0
+
+
+def native_text_length(pages: List[Dict[str, Any]]) -> int:
+    """Characters of native (text layer) text across pages, ignoring whitespace"""
+    return sum(len(page["text"].strip()) for page in pages)
+
+
+def merge_page_texts(pages: List[Dict[str, Any]], ocr_texts: Optional[Dict[int, Optional[str]]] = None) -> str:
+    """
+    Merge native and OCR page texts in page order
+
+    OCR text is used (with a page marker) for pages that were OCRed
+    successfully; other pages keep their native text. Empty pages are skipped.
+
+    Args:
+        pages: Page dicts from extraction (may be empty if the PDF was unreadable)
+        ocr_texts: Mapping of page number to OCR text
+
+    Returns:
+        Merged document text
+    """
+    ocr_texts = ocr_texts or {}
+    parts: List[str] = []
+    numbers = [page["number"] for page in pages] or sorted(ocr_texts)
+    native = {page["number"]: page["text"] for page in pages}
+    for number in numbers:
+        ocr_text = ocr_texts.get(number)
+        if ocr_text and ocr_text.strip():
+            parts.append(f"--- Page {number} ---\n{ocr_text}")
+        elif native.get(number, "").strip():
+            parts.append(native[number])
+    return "\n\n".join(parts)
+
+
+def _write_temp_pdf(file_content: BytesLike) -> str:
+    """Write PDF content to a temp file once, so pool workers get a path instead of a pickled copy"""
+    fd, path = tempfile.mkstemp(prefix="extract_", suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        f.write(file_content)
+    return path
+
+
+def _open_pdf(source: Union[BytesLike, str]):
+    """Open a PDF from a file path or in-memory content"""
+    if isinstance(source, str):
+        return pdfplumber.open(source)
+    return pdfplumber.open(open_binary(source))
+
+
+def extract_page_range(source: Union[BytesLike, str], start: int, end: int) -> List[Dict[str, Any]]:
+    """
+    Extract text from pages [start, end) of a PDF
+
+    Runs inside pool workers, so it must stay a picklable module-level function.
+
+    Args:
+        source: PDF content, or a file path (what pool workers receive)
+        start: First page index (0-based, inclusive)
+        end: Last page index (exclusive)
+
+    Returns:
+        List of page dicts with number (1-based), text, width, height (points)
+        and images (embedded image count); pages that fail to extract give ""
+    """
+    pages: List[Dict[str, Any]] = []
+    with _open_pdf(source) as pdf:
+        for index in range(start, min(end, len(pdf.pages))):
+            page = pdf.pages[index]
+            try:
+                text = page.extract_text() or ""
+                images = len(page.images)
+            except Exception as page_error:
+                logger.warning(f"Error extracting text from page {index + 1} with pdfplumber: {page_error}")
+                text, images = "", None
+            pages.append({
+                "number": index + 1,
+                "text": text,
+                "width": float(page.width),
+                "height": float(page.height),
+                "images": images,
+            })
+            # pdfplumber caches layout objects per page; drop them as we go
+            page.flush_cache()
+    return pages
+
+
+def extract_pages_pypdf2(file_content: BytesLike) -> List[Dict[str, Any]]:
+    """
+    Serial PyPDF2 fallback producing the same page dicts
+
+    PyPDF2 does not report images cheaply, so images is None (unknown).
+    """
+    reader = PyPDF2.PdfReader(open_binary(file_content))
+    pages: List[Dict[str, Any]] = []
+    for index, page in enumerate(reader.pages):
+        try:
+            text = page.extract_text() or ""
+        except Exception as page_error:
+            logger.warning(f"Error extracting text from page {index + 1} with PyPDF2: {page_error}")
+            text = ""
+        pages.append({
+            "number": index + 1,
+            "text": text,
+            "width": float(page.mediabox.width),
+            "height": float(page.mediabox.height),
+            "images": None,
+        })
+    return pages
+
+
+def split_page_ranges(page_count: int, parts: int) -> List[Tuple[int, int]]:
+    """
+    Split page_count pages into at most `parts` contiguous, near-equal ranges
+
+    Args:
+        page_count: Number of pages
+        parts: Desired number of ranges
+
+    Returns:
+        List of (start, end) ranges covering every page once, in order
+    """
+    parts = max(1, min(parts, page_count))
+    size, extra = divmod(page_count, parts)
+    ranges = []
+    start = 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        if end > start:
+            ranges.append((start, end))
+        start = end
+    return ranges
+
+
+class ParallelPdfExtractor:
+    """Per-page pdfplumber extraction, fanned out across a process pool"""
+
+    def __init__(self, max_workers: int = 0, min_pages: int = 8):
+        """
+        Initialize the extractor
+
+        Args:
+            max_workers: Worker processes (0 = one per CPU, capped at 4;
+                1 disables the pool)
+            min_pages: PDFs with fewer pages use the serial path
+        """
+        if max_workers <= 0:
+            max_workers = min(4, os.cpu_count() or 1)
+        self.max_workers = max_workers
+        self.min_pages = min_pages
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.stats = {'parallel_documents': 0, 'serial_documents': 0, 'pages': 0, 'pool_failures': 0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Lazily start the pool (spawn: forking a threaded server is unsafe)"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                logger.info(f"Started PDF extraction pool with {self.max_workers} workers")
+            return self._executor
+
+    def _reset_executor(self):
+        """Drop a broken pool so the next call starts a fresh one"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def extract_pages(
+        self,
+        file_content: BytesLike,
+        parallel: Optional[bool] = None,
+        path: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Extract the text of every page, in page order
+
+        Args:
+            file_content: PDF content (bytes or a zero-copy view)
+            parallel: Force (True) or skip (False) the pool; None decides by page count
+            path: File holding the same content; pool workers open it
+                instead of receiving a pickled copy of the bytes. Without
+                one, the content is written to a temp file once for the pool
+
+        Returns:
+            One page dict per page (see extract_page_range); text is "" for
+            pages with no text layer or errors
+        """
+        if not PDF_PLUMBER_AVAILABLE:
+            raise Exception("pdfplumber is not installed")
+
+        with _open_pdf(file_content) as pdf:
+            page_count = len(pdf.pages)
+
+        if parallel is None:
+            parallel = self.max_workers > 1 and page_count >= self.min_pages
+        self.stats['pages'] += page_count
+
+        if parallel and page_count > 1:
+            temp_path = None
+            if path is None:
+                temp_path = path = _write_temp_pdf(file_content)
+            try:
+                pages = self._extract_parallel(path, page_count)
+                self.stats['parallel_documents'] += 1
+                return pages
+            except BrokenProcessPool as e:
+                logger.warning(f"PDF extraction pool failed, falling back to serial extraction: {e}")
+                self.stats['pool_failures'] += 1
+                self._reset_executor()
+            finally:
+                if temp_path:
+                    os.unlink(temp_path)
+
+        self.stats['serial_documents'] += 1
+        return extract_page_range(file_content, 0, page_count)
+
+    def _extract_parallel(self, path: str, page_count: int) -> List[Dict[str, Any]]:
+        """Fan page ranges out to the pool and merge the results in order"""
+        executor = self._get_executor()
+        ranges = split_page_ranges(page_count, self.max_workers * RANGES_PER_WORKER)
+        futures = [
+            executor.submit(extract_page_range, path, start, end)
+            for start, end in ranges
+        ]
+        pages: List[Dict[str, Any]] = []
+        for future in futures:
+            pages.extend(future.result())
+        return pages
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+    def get_stats(self) -> dict:
+        """Pool configuration and usage counters"""
+        return {
+            'max_workers': self.max_workers,
+            'min_pages': self.min_pages,
+            'pool_running': self._executor is not None,
+            **self.stats,
+        }
+
+
+def _create_extractor() -> ParallelPdfExtractor:
+    """Build the shared extractor from settings"""
+    from app.core.config import get_settings
+    settings = get_settings()
+    return ParallelPdfExtractor(
+        max_workers=settings.PDF_EXTRACTION_WORKERS,
+        min_pages=settings.PDF_PARALLEL_MIN_PAGES,
+    )
+
+
+# Global extractor (the pool itself starts on first large PDF)
+pdf_extractor = _create_extractor()
@@ -0,0 +1,234 @@
+"""
+Streaming OCR pipeline for scanned PDFs
+
+Rendering a whole scan with convert_from_bytes(dpi=300) keeps every page
+in memory as a full-resolution PIL image before the first OCR call. Here,
+pages are rendered a few at a time with first_page/last_page windows. Each
+image is compressed to PNG and released straight away, and a bounded queue
+feeds a fixed number of concurrent OCR workers. Peak memory depends on the
+window size, not on the page count.
+
+Render resolution is chosen per page. Oversized pages (A3 annexures, legal
+sheets) get a lower DPI, so every page renders to roughly the pixel budget
+of an A4 page at the base DPI.
+"""
+
+import asyncio
+import io
+import logging
+import math
+import os
+import tempfile
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from pdf2image import convert_from_path, pdfinfo_from_path
+    PDF2IMAGE_AVAILABLE = True
+except ImportError:
+    PDF2IMAGE_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# OCR callable: (png_bytes, page_number) -> text or None
+OcrPageFn = Callable[[bytes, int], Awaitable[Optional[str]]]
+# Progress callback: (pages_done, total_pages)
+ProgressFn = Callable[[int, int], None]
+# Runs a blocking function off the event loop: (func, *args) -> awaitable result
+RunBlockingFn = Callable[..., Awaitable[Any]]
+
+
+# A4 in inches; the base DPI applies to pages up to this area
+A4_SQ_INCHES = 8.27 * 11.69
+MIN_OCR_DPI = 150
+
+
+def ocr_dpi_for_page(width: float, height: float, base_dpi: int = 300) -> int:
+    """
+    Render DPI for a page so that it stays within the A4 pixel budget
+
+    Args:
+        width: Page width in points
+        height: Page height in points
+        base_dpi: DPI for A4-sized and smaller pages
+
+    Returns:
+        DPI between MIN_OCR_DPI and base_dpi
+    """
+    area = (width / 72.0) * (height / 72.0)
+    if area <= A4_SQ_INCHES:
+        return base_dpi
+    scaled = int(base_dpi * math.sqrt(A4_SQ_INCHES / area))
+    return max(MIN_OCR_DPI, min(base_dpi, scaled))
+
+
+def count_pdf_pages(pdf_path: str) -> int:
+    """Page count via pdfinfo (no rendering)"""
+    return int(pdfinfo_from_path(pdf_path)["Pages"])
+
+
+def render_pages(pdf_path: str, first_page: int, last_page: int, dpi: int = 300) -> List[Tuple[int, bytes]]:
+    """
+    Render pages first_page..last_page (1-based, inclusive) to PNG bytes
+
+    Each PIL image is encoded and closed before the next one is kept, so only
+    compressed pages leave this function.
+
+    Returns:
+        List of (page_number, png_bytes)
+    """
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=first_page, last_page=last_page)
+    rendered = []
+    for offset, image in enumerate(images):
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG", optimize=False)
+        image.close()
+        rendered.append((first_page + offset, buffer.getvalue()))
+    images.clear()
+    return rendered
+
+
+def page_windows(
+    page_numbers: Iterable[int],
+    window: int,
+    page_dpi: Optional[Dict[int, int]] = None,
+) -> List[Tuple[int, int]]:
+    """
+    Group sorted page numbers into contiguous (first, last) runs of at most `window` pages
+
+    Example: [1, 2, 3, 7, 8] with window 2 -> [(1, 2), (3, 3), (7, 8)]
+
+    Args:
+        page_numbers: 1-based pages
+        window: Maximum pages per run
+        page_dpi: Optional per-page DPI; a run never mixes DPIs
+    """
+    page_dpi = page_dpi or {}
+    runs: List[Tuple[int, int]] = []
+    for page in sorted(set(page_numbers)):
+        if (
+            runs
+            and page == runs[-1][1] + 1
+            and page - runs[-1][0] < window
+            and page_dpi.get(page) == page_dpi.get(runs[-1][0])
+        ):
+            runs[-1] = (runs[-1][0], page)
+        else:
+            runs.append((page, page))
+    return runs
+
+
+def _log_progress(done: int, total: int):
+    logger.info(f"OCR progress: {done}/{total} pages")
+
+
+def _write_temp_pdf(file_content) -> str:
+    fd, path = tempfile.mkstemp(prefix="ocr_", suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        f.write(file_content)
+    return path
+
+
+async def ocr_pdf_streaming(
+    file_content,
+    ocr_page: OcrPageFn,
+    page_numbers: Optional[List[int]] = None,
+    dpi: int = 300,
+    page_dpi: Optional[Dict[int, int]] = None,
+    concurrency: int = 3,
+    window: int = 4,
+    progress: Optional[ProgressFn] = None,
+    run_blocking: Optional[RunBlockingFn] = None,
+    file_path: Optional[str] = None,
+) -> Dict[int, Optional[str]]:
+    """
+    Render and OCR PDF pages in a bounded streaming pipeline
+
+    Args:
+        file_content: PDF content (bytes or a zero-copy view)
+        ocr_page: Async OCR function for one PNG page
+        page_numbers: 1-based pages to OCR (default: all pages)
+        dpi: Render resolution for pages missing from page_dpi
+        page_dpi: Optional per-page render resolution (see ocr_dpi_for_page)
+        concurrency: OCR calls in flight at once
+        window: Pages rendered per pdftoppm call (also the queue depth)
+        progress: Called with (done, total) after each page; defaults to logging
+        run_blocking: Runs page counting and rendering off the event loop
+            (default asyncio.to_thread)
+        file_path: File holding the same content. Without one, the content
+            is written to a temp file once (pdftoppm reads from disk either
+            way; convert_from_bytes would rewrite it for every window)
+
+    Returns:
+        Mapping of page number to OCR text (None where OCR returned nothing)
+
+    Raises:
+        Exception: If rendering fails (e.g. Poppler missing). A page whose
+            OCR raises is recorded as None.
+    """
+    run_blocking = run_blocking or asyncio.to_thread
+    temp_path = None
+    if file_path is None:
+        temp_path = file_path = await run_blocking(_write_temp_pdf, file_content)
+    try:
+        return await _ocr_from_path(
+            file_path, ocr_page, page_numbers, dpi, page_dpi, concurrency, window, progress, run_blocking
+        )
+    finally:
+        if temp_path:
+            os.unlink(temp_path)
+
+
+async def _ocr_from_path(
+    file_path: str,
+    ocr_page: OcrPageFn,
+    page_numbers: Optional[List[int]],
+    dpi: int,
+    page_dpi: Optional[Dict[int, int]],
+    concurrency: int,
+    window: int,
+    progress: Optional[ProgressFn],
+    run_blocking: RunBlockingFn,
+) -> Dict[int, Optional[str]]:
+    """Pipeline body of ocr_pdf_streaming, reading the PDF from file_path"""
+    if page_numbers is None:
+        page_count = await run_blocking(count_pdf_pages, file_path)
+        page_numbers = list(range(1, page_count + 1))
+    total = len(page_numbers)
+    progress = progress or _log_progress
+    concurrency = max(1, concurrency)
+    window = max(1, window)
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=window)
+    results: Dict[int, Optional[str]] = {}
+    done = 0
+
+    async def producer():
+        try:
+            for first, last in page_windows(page_numbers, window, page_dpi):
+                run_dpi = (page_dpi or {}).get(first, dpi)
+                rendered = await run_blocking(render_pages, file_path, first, last, run_dpi)
+                for page_number, png in rendered:
+                    await queue.put((page_number, png))
+                del rendered
+        finally:
+            for _ in range(concurrency):
+                await queue.put(None)
+
+    async def worker():
+        nonlocal done
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            page_number, png = item
+            try:
+                results[page_number] = await ocr_page(png, page_number)
+            except Exception as e:
+                # Keep draining the queue so the producer never blocks
+                logger.error(f"Error processing page {page_number} with OCR: {e}")
+                results[page_number] = None
+            done += 1
+            progress(done, total)
+
+    await asyncio.gather(producer(), *(worker() for _ in range(concurrency)))
+    return results
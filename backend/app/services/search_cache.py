@@ -91,8 +91,8 @@ class SearchCache:
 
         # Check if cache is still valid
         if datetime.now() - cached_time > self.cache_duration:
-            # Cache expired, remove it
-            del self.cache[cache_key]
+            # Cache expired - keep the entry (cleanup_expired/eviction remove it)
+            # so get_stale() can still serve it when search quota runs out
             self.stats['misses'] += 1
             return None
 
@@ -102,6 +102,25 @@ class SearchCache:
 
         return cache_entry['results']
 
+    def get_stale(self, query: str, params: Optional[Dict] = None) -> Optional[List[Dict]]:
+        """
+        Get cached results regardless of age
+
+        Used as a cache-only fallback when the search quota governor refuses
+        a live API call. Does not affect hit/miss statistics.
+
+        Args:
+            query: Search query
+            params: Optional search parameters
+
+        Returns:
+            Cached results (possibly expired) or None
+        """
+        cache_entry = self.cache.get(self._generate_cache_key(query, params))
+        if cache_entry is None:
+            return None
+        return cache_entry['results']
+
     def set(self, query: str, results: List[Dict], params: Optional[Dict] = None):
         """
         Store search results in cache
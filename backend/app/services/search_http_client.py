@@ -0,0 +1,250 @@
+"""
+Shared HTTP client for Google Custom Search traffic in LegalMitra
+
+One pooled, keep-alive ``httpx.AsyncClient`` is reused for every CSE call so
+that a single page load no longer pays a TLS handshake per search query.
+Transient failures (timeouts, 429, 5xx) are retried with jittered backoff, and
+every attempt is bounded by the time left in the calling request's budget.
+"""
+
+import asyncio
+import contextvars
+import logging
+import random
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+CSE_ENDPOINT = "https://www.googleapis.com/customsearch/v1"
+
+# HTTP status codes worth retrying (rate limited / upstream trouble)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Absolute deadline (time.monotonic()) of the request currently being served
+_request_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "search_request_deadline", default=None
+)
+
+
+@contextmanager
+def search_budget(seconds: float) -> Iterator[None]:
+    """
+    Bound all search calls made inside this block by a total time budget.
+
+    Usage:
+        with search_budget(20):
+            results = await web_search_service.search_legal_sites(query)
+
+    Nested budgets never extend an outer one; the earliest deadline wins.
+    """
+    deadline = time.monotonic() + seconds
+    outer = _request_deadline.get()
+    if outer is not None:
+        deadline = min(deadline, outer)
+    token = _request_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _request_deadline.reset(token)
+
+
+def remaining_budget() -> Optional[float]:
+    """Seconds left in the current request budget, or None if unbounded"""
+    deadline = _request_deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+class SearchBudgetExceeded(Exception):
+    """Raised when the calling request has no time left for another search"""
+
+
+class SearchHttpClient:
+    """Lazily created, process-wide pooled client for search API calls"""
+
+    def __init__(
+        self,
+        max_connections_per_host: int = 4,
+        max_keepalive_connections: int = 4,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 10.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 4.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        """
+        Initialize the shared search client
+
+        Args:
+            max_connections_per_host: Concurrent connections allowed per host
+            max_keepalive_connections: Idle connections kept open for reuse
+            keepalive_expiry: Seconds an idle connection stays in the pool
+            timeout: Per-attempt timeout when the caller has no budget
+            max_retries: Retries after the first attempt for transient errors
+            backoff_base: Base delay (seconds) for exponential backoff
+            backoff_cap: Maximum backoff delay (seconds)
+            transport: Optional httpx transport (used by tests)
+        """
+        self.max_connections_per_host = max_connections_per_host
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.transport = transport
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+        self.stats = {
+            'requests': 0,
+            'retries': 0,
+            'failures': 0,
+            'budget_exhausted': 0,
+        }
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the pooled client, recreating it if the event loop changed"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            # A client (and its semaphores) is bound to the loop it was created on;
+            # tests and CLI scripts may run several loops in one process.
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections_per_host * 4,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                headers={"Accept": "application/json"},
+                transport=self.transport,
+            )
+            self._client_loop = loop
+            self._host_semaphores = {}
+        return self._client
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        """Per-host concurrency limiter"""
+        host = urlsplit(url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_connections_per_host)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff: uniform(0, min(cap, base * 2^attempt))"""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def _attempt_timeout(self) -> float:
+        """Timeout for the next attempt, clipped to the caller's remaining budget"""
+        remaining = remaining_budget()
+        if remaining is None:
+            return self.timeout
+        if remaining <= 0:
+            self.stats['budget_exhausted'] += 1
+            raise SearchBudgetExceeded("Search request budget exhausted")
+        return min(self.timeout, remaining)
+
+    async def get_json(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        GET a JSON document with retries and budget-aware timeouts
+
+        Args:
+            url: Endpoint URL
+            params: Query string parameters
+            timeout: Optional total budget for this call (combined with any
+                enclosing ``search_budget``)
+
+        Returns:
+            Decoded JSON body
+
+        Raises:
+            httpx.HTTPError: When all attempts fail
+            SearchBudgetExceeded: When the caller's budget runs out
+        """
+        if timeout is not None:
+            with search_budget(timeout):
+                return await self.get_json(url, params)
+
+        client = self._get_client()
+        semaphore = self._host_semaphore(url)
+        last_error: Optional[Exception] = None
+
+        for attempt in range(self.max_retries + 1):
+            attempt_timeout = self._attempt_timeout()
+            self.stats['requests'] += 1
+            try:
+                async with semaphore:
+                    response = await client.get(url, params=params, timeout=attempt_timeout)
+                if response.status_code in RETRYABLE_STATUS_CODES and attempt < self.max_retries:
+                    last_error = httpx.HTTPStatusError(
+                        f"Retryable status {response.status_code}",
+                        request=response.request,
+                        response=response,
+                    )
+                else:
+                    response.raise_for_status()
+                    return response.json()
+            except (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError) as e:
+                last_error = e
+
+            if attempt >= self.max_retries:
+                break
+
+            delay = self._backoff_delay(attempt)
+            remaining = remaining_budget()
+            if remaining is not None and delay >= remaining:
+                # Not enough budget left to wait and try again
+                break
+            self.stats['retries'] += 1
+            logger.info(f"Retrying search request in {delay:.2f}s after: {last_error}")
+            await asyncio.sleep(delay)
+
+        self.stats['failures'] += 1
+        raise last_error if last_error else SearchBudgetExceeded("Search request budget exhausted")
+
+    async def aclose(self):
+        """Close pooled connections (called on application shutdown)"""
+        if self._client is not None and not self._client.is_closed:
+            try:
+                await self._client.aclose()
+            except RuntimeError:
+                # Loop the client was bound to is already gone
+                pass
+        self._client = None
+        self._client_loop = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Connection pool configuration and request counters"""
+        return {
+            'max_connections_per_host': self.max_connections_per_host,
+            'max_keepalive_connections': self.max_keepalive_connections,
+            'max_retries': self.max_retries,
+            **self.stats,
+        }
+
+
+_settings = get_settings()
+search_http_client = SearchHttpClient(
+    max_connections_per_host=_settings.WEB_SEARCH_MAX_CONNECTIONS,
+    max_keepalive_connections=_settings.WEB_SEARCH_MAX_CONNECTIONS,
+    timeout=_settings.WEB_SEARCH_TIMEOUT_SECONDS,
+    max_retries=_settings.WEB_SEARCH_MAX_RETRIES,
+)
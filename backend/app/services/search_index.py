@@ -0,0 +1,263 @@
+"""
+Local full-text index of legal search results for LegalMitra
+
+Every result returned by Google Custom Search (title, URL and snippet, plus
+page text for results that carry it) is persisted into a SQLite FTS5 index
+ranked with BM25.
+Case lookups query this index first and only go to the web when local recall
+is poor, which saves CSE quota for judgments we have already seen and keeps
+case search working offline.
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# BM25 column weights: title, snippet, body
+BM25_WEIGHTS = (10.0, 4.0, 1.0)
+
+# Local hits needed before a keyword lookup skips the web.
+# An exact citation phrase match needs only one.
+LOCAL_MIN_RESULTS = 3
+LOCAL_MIN_CITATION_RESULTS = 1
+
+# Rows written between checks of the max_rows limit
+PRUNE_INTERVAL_ROWS = 500
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL DEFAULT '',
+    snippet TEXT NOT NULL DEFAULT '',
+    body TEXT NOT NULL DEFAULT '',
+    source_query TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    times_seen INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_results_last_seen ON results(last_seen);
+CREATE VIRTUAL TABLE IF NOT EXISTS results_fts USING fts5(
+    title, snippet, body,
+    content='results', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS results_ai AFTER INSERT ON results BEGIN
+    INSERT INTO results_fts(rowid, title, snippet, body)
+    VALUES (new.id, new.title, new.snippet, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS results_ad AFTER DELETE ON results BEGIN
+    INSERT INTO results_fts(results_fts, rowid, title, snippet, body)
+    VALUES ('delete', old.id, old.title, old.snippet, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS results_au AFTER UPDATE ON results BEGIN
+    INSERT INTO results_fts(results_fts, rowid, title, snippet, body)
+    VALUES ('delete', old.id, old.title, old.snippet, old.body);
+    INSERT INTO results_fts(rowid, title, snippet, body)
+    VALUES (new.id, new.title, new.snippet, new.body);
+END;
+"""
+
+
+def _fts_terms(text: str) -> List[str]:
+    """Split free text into FTS5-safe quoted terms"""
+    return ['"{}"'.format(token) for token in _TOKEN_RE.findall(text.lower())]
+
+
+def build_match_query(text: str, phrase: bool = False) -> Optional[str]:
+    """
+    Build an FTS5 MATCH expression from user text
+
+    Args:
+        text: Free text (citation, case name, keywords)
+        phrase: If True, require the tokens as one adjacent phrase
+            (e.g. "CRL. A 567 / 2019" -> "crl a 567 2019")
+
+    Returns:
+        MATCH expression, or None if the text has no searchable tokens
+    """
+    tokens = _TOKEN_RE.findall(text.lower())
+    if not tokens:
+        return None
+    if phrase:
+        return '"{}"'.format(" ".join(tokens))
+    # Implicit AND of all terms
+    return " ".join(_fts_terms(text))
+
+
+class LocalSearchIndex:
+    """SQLite FTS5 index of search results with BM25 ranking"""
+
+    def __init__(
+        self,
+        db_path: Path = Path("data/search_index.db"),
+        max_rows: int = 50000
+    ):
+        """
+        Initialize the local search index
+
+        Args:
+            db_path: SQLite database file
+            max_rows: Oldest (least recently seen) results are pruned beyond this
+        """
+        self.db_path = db_path
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self.available = False
+        self._written_since_prune = PRUNE_INTERVAL_ROWS  # Check on the first write
+        self.stats = {'local_hits': 0, 'local_misses': 0, 'indexed': 0}
+
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._connect() as conn:
+                conn.executescript(_SCHEMA)
+            self.available = True
+        except Exception as e:
+            # SQLite built without FTS5, read-only filesystem, ...
+            logger.warning(f"Local search index disabled: {e}")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Short-lived connection that commits on success and always closes"""
+        conn = sqlite3.connect(str(self.db_path), timeout=10)
+        try:
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def add_results(self, results: List[Dict[str, str]], source_query: Optional[str] = None) -> int:
+        """
+        Insert or refresh search results
+
+        Args:
+            results: Dicts with url, title, snippet and optionally text (page body)
+            source_query: Query that produced the results
+
+        Returns:
+            Number of results written
+        """
+        if not self.available or not results:
+            return 0
+        now = datetime.now().isoformat()
+        rows = [
+            (
+                r["url"], r.get("title", ""), r.get("snippet", ""), r.get("text", ""),
+                source_query, now, now,
+            )
+            for r in results if r.get("url")
+        ]
+        try:
+            with self._lock, self._connect() as conn:
+                conn.executemany(
+                    """
+                    INSERT INTO results (url, title, snippet, body, source_query, first_seen, last_seen)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(url) DO UPDATE SET
+                        title = excluded.title,
+                        snippet = excluded.snippet,
+                        body = CASE WHEN excluded.body != '' THEN excluded.body ELSE results.body END,
+                        last_seen = excluded.last_seen,
+                        times_seen = results.times_seen + 1
+                    """,
+                    rows,
+                )
+                self._written_since_prune += len(rows)
+                if self._written_since_prune >= PRUNE_INTERVAL_ROWS:
+                    self._prune(conn)
+                    self._written_since_prune = 0
+            self.stats['indexed'] += len(rows)
+            return len(rows)
+        except Exception as e:
+            logger.warning(f"Could not index search results: {e}")
+            return 0
+
+    def _prune(self, conn: sqlite3.Connection):
+        """Drop least recently seen rows beyond max_rows (every PRUNE_INTERVAL_ROWS writes)"""
+        count = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        excess = count - self.max_rows
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM results WHERE id IN "
+                "(SELECT id FROM results ORDER BY last_seen ASC LIMIT ?)",
+                (excess,),
+            )
+
+    def search(self, text: str, limit: int = 10, phrase: bool = False) -> List[Dict[str, str]]:
+        """
+        BM25-ranked search over indexed results
+
+        Args:
+            text: Query text
+            limit: Maximum number of results
+            phrase: Match the query as one adjacent phrase (for citations)
+
+        Returns:
+            List of results with title, url, snippet and score (lower is better),
+            in the same shape as web search results
+        """
+        match = build_match_query(text, phrase=phrase)
+        if not self.available or match is None:
+            return []
+        try:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    f"""
+                    SELECT r.url, r.title, r.snippet,
+                           bm25(results_fts, {', '.join(str(w) for w in BM25_WEIGHTS)}) AS score
+                    FROM results_fts
+                    JOIN results r ON r.id = results_fts.rowid
+                    WHERE results_fts MATCH ?
+                    ORDER BY score
+                    LIMIT ?
+                    """,
+                    (match, limit),
+                ).fetchall()
+        except Exception as e:
+            logger.warning(f"Local search failed for {text[:50]!r}: {e}")
+            return []
+
+        results = [
+            {
+                "title": row["title"],
+                "url": row["url"],
+                "snippet": row["snippet"],
+                "score": round(row["score"], 4),
+                "source": "local_index",
+            }
+            for row in rows
+        ]
+        self.stats['local_hits' if results else 'local_misses'] += 1
+        return results
+
+    def get_stats(self) -> Dict[str, object]:
+        """Index size and lookup counters"""
+        size = 0
+        if self.available:
+            try:
+                with self._connect() as conn:
+                    size = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            except Exception:
+                pass
+        return {
+            'available': self.available,
+            'indexed_results': size,
+            'max_rows': self.max_rows,
+            **self.stats,
+        }
+
+
+# Global local index
+search_index = LocalSearchIndex()
@@ -0,0 +1,274 @@
+"""
+Google Custom Search quota governor for LegalMitra
+
+The free CSE tier allows 100 queries per day per API key. This service keeps
+persistent per-day, per-key counters and admits searches by priority so that
+background traffic (news and case preloads) can never starve real user
+research. When quota runs low, lower priorities are refused and callers fall
+back to cached results only.
+"""
+
+import contextvars
+import hashlib
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    from zoneinfo import ZoneInfo
+    # CSE quota resets at midnight US Pacific time
+    _QUOTA_TZ = ZoneInfo("America/Los_Angeles")
+except Exception:  # pragma: no cover - tzdata missing (e.g. bare Windows)
+    _QUOTA_TZ = timezone.utc
+
+# Search priorities, highest first
+PRIORITY_RESEARCH = "research"    # Interactive user research queries
+PRIORITY_CITATION = "citation"    # Case citation lookups
+PRIORITY_PRELOAD = "preload"      # News / major-cases feed preloads
+
+PRIORITY_ORDER = [PRIORITY_RESEARCH, PRIORITY_CITATION, PRIORITY_PRELOAD]
+
+# Lowest priority allowed for searches in the current context (see search_priority)
+_priority_cap: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "search_priority_cap", default=None
+)
+
+
+@contextmanager
+def search_priority(priority: str) -> Iterator[None]:
+    """
+    Treat every search made inside this block as at most `priority`.
+
+    Background jobs (e.g. cache warm-up) that reuse user-facing search code
+    wrap it in search_priority(PRIORITY_PRELOAD) so they never spend the
+    quota reserved for real users.
+    """
+    token = _priority_cap.set(priority)
+    try:
+        yield
+    finally:
+        _priority_cap.reset(token)
+
+
+# Query allowance shared by the tasks of the current context (see search_query_allowance)
+_search_query_allowance: contextvars.ContextVar[Optional[Dict[str, int]]] = contextvars.ContextVar(
+    "search_query_allowance", default=None
+)
+
+
+@contextmanager
+def search_query_allowance(limit: int) -> Iterator[Dict[str, int]]:
+    """
+    Admit at most `limit` searches made inside this block.
+
+    The allowance is shared by every task started in the block and a query
+    is taken from it in the same locked step that takes it from the daily
+    quota, so concurrent searches cannot overshoot it. (Not to be confused
+    with search_http_client.search_budget, a time limit on searches.)
+
+    Yields:
+        Allowance dict with limit and used
+    """
+    allowance = {"limit": max(0, limit), "used": 0}
+    token = _search_query_allowance.set(allowance)
+    try:
+        yield allowance
+    finally:
+        _search_query_allowance.reset(token)
+
+
+def effective_priority(priority: str) -> str:
+    """The lower of a requested priority and the context's priority cap"""
+    cap = _priority_cap.get()
+    if cap is None or cap not in PRIORITY_ORDER or priority not in PRIORITY_ORDER:
+        return priority
+    return max(priority, cap, key=PRIORITY_ORDER.index)
+
+
+# Fraction of the daily quota that must still be unused for a priority to be admitted.
+# Research may use every last query; citations leave 10% for research;
+# preloads stop once half the day's quota is gone.
+DEFAULT_PRIORITY_RESERVES = {
+    PRIORITY_RESEARCH: 0.0,
+    PRIORITY_CITATION: 0.10,
+    PRIORITY_PRELOAD: 0.50,
+}
+
+# Days of counters kept on disk
+HISTORY_DAYS = 7
+
+
+class SearchQuotaManager:
+    """Tracks CSE usage per day and per key, and admits searches by priority"""
+
+    def __init__(
+        self,
+        daily_limit: int = 100,
+        priority_reserves: Optional[Dict[str, float]] = None,
+        enable_persistence: bool = True,
+        quota_file: Path = Path("data/search_quota.json")
+    ):
+        """
+        Initialize the quota manager
+
+        Args:
+            daily_limit: Queries allowed per key per day (CSE free tier: 100)
+            priority_reserves: Fraction of quota each priority must leave unused
+            enable_persistence: Save counters to disk across restarts
+            quota_file: Location of the persisted counters
+        """
+        self.daily_limit = daily_limit
+        self.priority_reserves = dict(priority_reserves or DEFAULT_PRIORITY_RESERVES)
+        self.enable_persistence = enable_persistence
+        self.quota_file = quota_file
+        self._lock = threading.Lock()
+
+        # {day: {key_id: {"used": int, "exhausted": bool, "by_priority": {...}}}}
+        self.usage: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # Searches refused (degraded to cache-only) per priority, since startup
+        self.denied: Dict[str, int] = {p: 0 for p in self.priority_reserves}
+
+        if self.enable_persistence:
+            self._load_from_disk()
+
+    @staticmethod
+    def key_id(api_key: Optional[str]) -> str:
+        """Stable, non-reversible identifier for an API key"""
+        return hashlib.sha256((api_key or "").encode()).hexdigest()[:12]
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(_QUOTA_TZ).date().isoformat()
+
+    def _entry(self, key_id: str) -> Dict[str, Any]:
+        day = self.usage.setdefault(self._today(), {})
+        return day.setdefault(key_id, {"used": 0, "exhausted": False, "by_priority": {}})
+
+    def _allowance(self, priority: str) -> int:
+        """Highest usage count at which a priority is still admitted"""
+        reserve = self.priority_reserves.get(priority, self.priority_reserves[PRIORITY_PRELOAD])
+        return int(self.daily_limit * (1 - reserve))
+
+    def remaining(self, api_key: Optional[str]) -> int:
+        """Queries left today for a key"""
+        with self._lock:
+            entry = self._entry(self.key_id(api_key))
+            if entry["exhausted"]:
+                return 0
+            return max(0, self.daily_limit - entry["used"])
+
+    def try_acquire(self, api_key: Optional[str], priority: str = PRIORITY_RESEARCH) -> bool:
+        """
+        Reserve one query for a search if its priority is admitted
+
+        Args:
+            api_key: CSE API key the query will be billed to
+            priority: One of PRIORITY_RESEARCH, PRIORITY_CITATION, PRIORITY_PRELOAD
+
+        Returns:
+            True if the caller may hit the API, False to serve from cache only
+        """
+        priority = effective_priority(priority)
+        query_allowance = _search_query_allowance.get()
+        with self._lock:
+            entry = self._entry(self.key_id(api_key))
+            if (
+                entry["exhausted"] or entry["used"] >= self._allowance(priority)
+                or (query_allowance is not None and query_allowance["used"] >= query_allowance["limit"])
+            ):
+                self.denied[priority] = self.denied.get(priority, 0) + 1
+                return False
+            if query_allowance is not None:
+                query_allowance["used"] += 1
+            entry["used"] += 1
+            entry["by_priority"][priority] = entry["by_priority"].get(priority, 0) + 1
+        self._save_to_disk()
+        return True
+
+    def mark_exhausted(self, api_key: Optional[str]):
+        """Record that Google reported the key's quota as exceeded (HTTP 429)"""
+        with self._lock:
+            entry = self._entry(self.key_id(api_key))
+            if entry["exhausted"]:
+                return
+            entry["exhausted"] = True
+        logger.warning("Google Custom Search quota exhausted for today")
+        self._save_to_disk()
+
+    def _describe(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Summarize one key's counters for today"""
+        remaining = 0 if entry["exhausted"] else max(0, self.daily_limit - entry["used"])
+        return {
+            "used": entry["used"],
+            "remaining": remaining,
+            "exhausted": entry["exhausted"],
+            "by_priority": dict(entry["by_priority"]),
+            "admitted_priorities": [
+                p for p in self.priority_reserves
+                if not entry["exhausted"] and entry["used"] < self._allowance(p)
+            ],
+        }
+
+    def get_key_stats(self, api_key: Optional[str]) -> Dict[str, Any]:
+        """Quota usage for today for a single key"""
+        with self._lock:
+            day = self.usage.get(self._today(), {})
+            entry = day.get(self.key_id(api_key), {"used": 0, "exhausted": False, "by_priority": {}})
+            return self._describe(entry)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Quota usage for today across all keys"""
+        with self._lock:
+            today = self._today()
+            return {
+                "day": today,
+                "daily_limit": self.daily_limit,
+                "priority_reserves": dict(self.priority_reserves),
+                "keys": {
+                    key: self._describe(entry)
+                    for key, entry in self.usage.get(today, {}).items()
+                },
+                "denied_since_startup": dict(self.denied),
+            }
+
+    def _load_from_disk(self):
+        """Load persisted counters"""
+        try:
+            if not self.quota_file.exists():
+                return
+            with open(self.quota_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.usage = data.get("usage", {})
+        except Exception as e:
+            logger.warning(f"Could not load search quota from disk: {e}")
+
+    def _save_to_disk(self):
+        """Persist counters, keeping only recent days"""
+        if not self.enable_persistence:
+            return
+        try:
+            with self._lock:
+                for day in sorted(self.usage)[:-HISTORY_DAYS]:
+                    del self.usage[day]
+                data = {"usage": self.usage, "saved_at": datetime.now().isoformat()}
+                self.quota_file.parent.mkdir(parents=True, exist_ok=True)
+                tmp_file = self.quota_file.with_suffix(".tmp")
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2)
+                tmp_file.replace(self.quota_file)
+        except Exception as e:
+            logger.warning(f"Could not save search quota to disk: {e}")
+
+
+# Global quota manager
+# Counters are persisted even on Render: the file is tiny and losing it on
+# restart would let the app overspend the daily quota.
+search_quota = SearchQuotaManager(daily_limit=get_settings().GOOGLE_CSE_DAILY_QUOTA)
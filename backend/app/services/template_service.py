@@ -105,10 +105,13 @@ class TemplateService:
         # Python code is the authoritative source with exactly 112 templates
         # JSON files are legacy/backup only
 
+        self._templates_loaded = True
         logger.info(f"✅ Loaded {python_count} templates from Python code (authoritative source)")
 
     def get_template(self, template_id: str) -> Optional[Dict]:
         """Get template by ID"""
+        if not self._templates_loaded:
+            self._load_templates()
         return self.templates_cache.get(template_id)
 
     def list_templates(
@@ -0,0 +1,211 @@
+"""
+Spooled, size-limited upload handling
+
+Uploads are read in chunks into a spool that stays in memory while small
+and rolls over to a named temporary file once it grows past a threshold.
+The size limit is enforced and the SHA-256 is computed while streaming,
+so an oversized upload is rejected without reading it all into a single
+bytes object.
+
+Parsers get a zero-copy view of the content: the in-memory buffer, or an
+mmap of the spool file. Path-based tools (pdf2image, process-pool workers)
+get the spool file path instead of a copy of the bytes.
+"""
+
+import hashlib
+import io
+import logging
+import mmap
+import os
+import tempfile
+from typing import Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Anything parsers accept as file content: bytes, memoryview or mmap
+BytesLike = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised while streaming once an upload exceeds the size limit"""
+
+    def __init__(self, max_bytes: int, received_bytes: int):
+        self.max_bytes = max_bytes
+        self.received_bytes = received_bytes
+        super().__init__(f"Upload exceeds {max_bytes} bytes")
+
+
+class BufferReader(io.RawIOBase):
+    """Seekable read-only file object over a buffer, without copying it"""
+
+    def __init__(self, buffer: BytesLike):
+        self._view = memoryview(buffer).cast("B")
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        chunk = self._view[self._pos:self._pos + len(b)]
+        n = len(chunk)
+        b[:n] = chunk
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = len(self._view) + offset
+        self._pos = max(0, self._pos)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self):
+        self._view.release()
+        super().close()
+
+
+def open_binary(content: BytesLike) -> io.IOBase:
+    """
+    Seekable binary stream over file content for parsers that take file objects
+
+    bytes are wrapped in BytesIO (which shares the buffer); views and mmaps
+    get a BufferReader so nothing is copied up front.
+    """
+    if isinstance(content, bytes):
+        return io.BytesIO(content)
+    return io.BufferedReader(BufferReader(content))
+
+
+class SpooledUpload:
+    """Upload content spooled to memory or disk, with running size and hash"""
+
+    def __init__(self, spool_bytes: int = 1024 * 1024, suffix: str = ""):
+        """
+        Args:
+            spool_bytes: Content above this size is moved to a temp file
+            suffix: Temp file suffix (e.g. ".pdf") for tools that sniff it
+        """
+        self.spool_bytes = spool_bytes
+        self.suffix = suffix
+        self.size = 0
+        self.path: Optional[str] = None
+        self._hash = hashlib.sha256()
+        self._memory: Optional[io.BytesIO] = io.BytesIO()
+        self._file = None
+        self._view = None
+
+    def write(self, chunk: bytes):
+        """Append a chunk, rolling over to disk past spool_bytes"""
+        self._hash.update(chunk)
+        self.size += len(chunk)
+        if self._file is None and self.size > self.spool_bytes:
+            fd, self.path = tempfile.mkstemp(prefix="upload_", suffix=self.suffix)
+            self._file = os.fdopen(fd, "w+b")
+            self._file.write(self._memory.getbuffer())
+            self._memory = None
+            self._file.write(chunk)
+        elif self._file is not None:
+            self._file.write(chunk)
+        else:
+            self._memory.write(chunk)
+
+    @property
+    def sha256(self) -> str:
+        """SHA-256 hex digest of everything written"""
+        return self._hash.hexdigest()
+
+    @property
+    def on_disk(self) -> bool:
+        return self._file is not None
+
+    def content(self) -> BytesLike:
+        """
+        Zero-copy view of the content (memoryview in memory, mmap on disk)
+
+        The view is valid until close().
+        """
+        if self._view is None:
+            if self._file is not None:
+                self._file.flush()
+                self._view = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+            else:
+                self._view = self._memory.getbuffer()
+        return self._view
+
+    def close(self):
+        """Release the view and delete the spool file"""
+        view, self._view = self._view, None
+        if view is not None and not isinstance(view, bytes):
+            try:
+                if isinstance(view, memoryview):
+                    view.release()
+                else:
+                    view.close()
+            except BufferError:
+                # A parser still holds a slice; the buffer is freed when it is collected
+                logger.debug("Upload view still referenced at close")
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+            self.path = None
+        self._memory = None
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+async def spool_upload(
+    upload,
+    max_bytes: int,
+    spool_bytes: int = 1024 * 1024,
+    chunk_size: int = CHUNK_SIZE,
+    suffix: str = "",
+) -> SpooledUpload:
+    """
+    Stream a FastAPI UploadFile into a SpooledUpload
+
+    Args:
+        upload: UploadFile (anything with async read(n))
+        max_bytes: Size limit enforced while streaming
+        spool_bytes: In-memory threshold before rolling to disk
+        chunk_size: Read size
+        suffix: Temp file suffix
+
+    Returns:
+        SpooledUpload (caller must close it)
+
+    Raises:
+        UploadTooLarge: As soon as more than max_bytes have been received
+    """
+    spool = SpooledUpload(spool_bytes=spool_bytes, suffix=suffix)
+    try:
+        while True:
+            chunk = await upload.read(chunk_size)
+            if not chunk:
+                break
+            if spool.size + len(chunk) > max_bytes:
+                raise UploadTooLarge(max_bytes, spool.size + len(chunk))
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    return spool
@@ -3,10 +3,26 @@ Web Search Service for LegalMitra
 Fetches latest legal information from official government and legal websites
 """
 
+import asyncio
 from typing import List, Dict, Optional
-import httpx
 from app.core.config import get_settings
 from app.services.search_cache import search_cache
+from app.services.search_http_client import search_http_client, CSE_ENDPOINT
+from app.services.search_quota import (
+    search_quota,
+    PRIORITY_RESEARCH,
+    PRIORITY_CITATION,
+)
+from app.services.search_index import (
+    search_index,
+    LOCAL_MIN_RESULTS,
+    LOCAL_MIN_CITATION_RESULTS,
+)
+import httpx
+
+
+class SearchQuotaDenied(Exception):
+    """Raised when the quota governor refuses a live search for its priority"""
 
 
 class WebSearchService:
@@ -51,13 +67,105 @@ class WebSearchService:
     def is_available(self) -> bool:
         """Check if web search is configured"""
         return bool(self.api_key and self.search_engine_id)
+
+    async def _query_cse(
+        self,
+        search_query: str,
+        max_results: int,
+        priority: str = PRIORITY_RESEARCH
+    ) -> List[Dict[str, str]]:
+        """
+        Run one Google Custom Search query over the shared pooled client
+
+        Args:
+            search_query: Fully built query string (including any site filters)
+            max_results: Maximum number of results to return
+            priority: Quota priority of the caller (see search_quota)
+
+        Returns:
+            List of search results with title, url, and snippet
+
+        Raises:
+            SearchQuotaDenied: If the daily quota left is reserved for higher priorities
+        """
+        if not search_quota.try_acquire(self.api_key, priority):
+            raise SearchQuotaDenied(f"Search quota reserved; '{priority}' search served from cache only")
+
+        try:
+            data = await search_http_client.get_json(
+                CSE_ENDPOINT,
+                params={
+                    "key": self.api_key,
+                    "cx": self.search_engine_id,
+                    "q": search_query,
+                    "num": min(max_results, 10),  # Google API max is 10
+                }
+            )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 429:
+                search_quota.mark_exhausted(self.api_key)
+            raise
+
+        results = []
+        for item in data.get("items", [])[:max_results]:
+            results.append({
+                "title": item.get("title", ""),
+                "url": item.get("link", ""),
+                "snippet": item.get("snippet", ""),
+            })
+
+        # Keep every result in the local full-text index for offline reuse
+        await asyncio.to_thread(search_index.add_results, results, search_query)
+        return results
+
+    async def search_web(
+        self,
+        query: str,
+        max_results: int = 5,
+        use_cache: bool = True,
+        priority: str = PRIORITY_RESEARCH
+    ) -> List[Dict[str, str]]:
+        """
+        Search the whole web (no site restriction)
+
+        Args:
+            query: Search query
+            max_results: Maximum number of results to return
+            use_cache: Whether to use cached results (default: True)
+            priority: Quota priority of the caller (default: user research)
+
+        Returns:
+            List of search results with title, url, and snippet
+        """
+        if not self.is_available():
+            return []
+
+        cache_params = {'max_results': max_results, 'sites': 'web'}
+        if use_cache:
+            cached_results = search_cache.get(query, cache_params)
+            if cached_results is not None:
+                return cached_results
+
+        try:
+            results = await self._query_cse(query, max_results, priority)
+        except SearchQuotaDenied as e:
+            print(f"⏸️ {e}")
+            return search_cache.get_stale(query, cache_params) or []
+        except Exception as e:
+            print(f"⚠️ Web search error: {e}")
+            return []
+
+        if use_cache and results:
+            search_cache.set(query, results, cache_params)
+        return results
     
     async def search_legal_sites(
         self,
         query: str,
         max_results: int = 5,
         sites: Optional[List[str]] = None,
-        use_cache: bool = True
+        use_cache: bool = True,
+        priority: str = PRIORITY_RESEARCH
     ) -> List[Dict[str, str]]:
         """
         Search legal websites for latest information
@@ -67,6 +175,7 @@ class WebSearchService:
             max_results: Maximum number of results to return
             sites: Optional list of specific sites to search (defaults to all legal sites)
             use_cache: Whether to use cached results (default: True)
+            priority: Quota priority of the caller (default: user research)
 
         Returns:
             List of search results with title, url, and snippet
@@ -96,37 +205,18 @@ class WebSearchService:
             print(f"❌ Cache MISS for query: {query[:50]}...")
 
         try:
-            # Google Custom Search API endpoint
-            url = "https://www.googleapis.com/customsearch/v1"
-            
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(
-                    url,
-                    params={
-                        "key": self.api_key,
-                        "cx": self.search_engine_id,
-                        "q": search_query,
-                        "num": min(max_results, 10),  # Google API max is 10
-                    }
-                )
-                response.raise_for_status()
-                data = response.json()
-
-                results = []
-                for item in data.get("items", [])[:max_results]:
-                    results.append({
-                        "title": item.get("title", ""),
-                        "url": item.get("link", ""),
-                        "snippet": item.get("snippet", ""),
-                    })
-
-                # Cache the results
-                if use_cache and results:
-                    search_cache.set(search_query, results, cache_params)
-                    print(f"💾 Cached {len(results)} results for query: {query[:50]}...")
-
-                return results
+            results = await self._query_cse(search_query, max_results, priority)
+
+            # Cache the results
+            if use_cache and results:
+                search_cache.set(search_query, results, cache_params)
+                print(f"💾 Cached {len(results)} results for query: {query[:50]}...")
+
+            return results
 
+        except SearchQuotaDenied as e:
+            print(f"⏸️ {e}")
+            return search_cache.get_stale(search_query, cache_params) or []
         except Exception as e:
             import traceback
             error_details = traceback.format_exc()
@@ -181,6 +271,9 @@ class WebSearchService:
         """
         Search for a specific case by citation
         
+        Looks in the local full-text index first and only searches the web
+        if the citation has not been seen before.
+        
         Args:
             case_citation: Case citation (e.g., "CRL. A 567 / 2019", "2025:KHC:15464")
             max_results: Maximum number of results to return
@@ -188,8 +281,10 @@ class WebSearchService:
         Returns:
             List of search results with title, url, and snippet
         """
-        if not self.is_available():
-            return []
+        # Judgments we have seen before are answered from the local index
+        local_results = await asyncio.to_thread(search_index.search, case_citation, limit=max_results, phrase=True)
+        if len(local_results) >= LOCAL_MIN_CITATION_RESULTS or not self.is_available():
+            return local_results
         
         # Search across case law databases
         try:
@@ -201,7 +296,8 @@ class WebSearchService:
             case_results = await self.search_legal_sites(
                 search_query, 
                 max_results=max_results,
-                sites=self.CASE_LAW_SITES
+                sites=self.CASE_LAW_SITES,
+                priority=PRIORITY_CITATION
             )
             
             # If we got results from case law sites, return them
@@ -209,35 +305,16 @@ class WebSearchService:
                 return case_results
             
             # If no results from case law sites, try general search without site restriction
-            # We'll use the Google Custom Search API without site filters
-            url = "https://www.googleapis.com/customsearch/v1"
-            
-            async with httpx.AsyncClient(timeout=15.0) as client:
-                response = await client.get(
-                    url,
-                    params={
-                        "key": self.api_key,
-                        "cx": self.search_engine_id,
-                        "q": search_query,
-                        "num": min(max_results, 10),
-                    }
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                results = []
-                for item in data.get("items", [])[:max_results]:
-                    results.append({
-                        "title": item.get("title", ""),
-                        "url": item.get("link", ""),
-                        "snippet": item.get("snippet", ""),
-                    })
-                
-                return results
+            web_results = await self.search_web(
+                search_query,
+                max_results=max_results,
+                priority=PRIORITY_CITATION
+            )
+            return web_results or local_results
                 
         except Exception as e:
             print(f"⚠️ Case citation search error: {e}")
-            return []
+            return local_results
     
     async def search_case_details(
         self,
@@ -254,19 +331,23 @@ class WebSearchService:
         Returns:
             List of search results with title, url, and snippet
         """
-        if not self.is_available():
-            return []
+        # Use the local index when it already has enough matching results
+        local_results = await asyncio.to_thread(search_index.search, case_query, limit=max_results)
+        if len(local_results) >= LOCAL_MIN_RESULTS or not self.is_available():
+            return local_results
         
         # Build comprehensive search query
         search_query = f'"{case_query}" case judgment India'
         
         # Search both case law databases and official court websites
         all_sites = self.CASE_LAW_SITES + self.LEGAL_SITES
-        return await self.search_legal_sites(
+        web_results = await self.search_legal_sites(
             search_query,
             max_results=max_results,
-            sites=all_sites
+            sites=all_sites,
+            priority=PRIORITY_CITATION
         )
+        return web_results or local_results
 
 
 # Singleton instance
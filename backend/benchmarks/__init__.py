@@ -0,0 +1 @@
+# Offline performance benchmarks (run from backend/: python -m benchmarks.<name>)
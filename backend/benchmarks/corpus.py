@@ -0,0 +1,97 @@
+"""
+Synthetic document corpora for the benchmarks
+
+Everything is generated locally so benchmarks run offline and reproducibly:
+typed judgments as text-layer PDFs, scanned bundles as image-only PDFs,
+agreements with large schedules as DOCX tables, and phone-camera style PNG
+scans.
+"""
+
+import io
+import random
+
+from PIL import Image, ImageDraw, ImageFilter
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+PARAGRAPH = (
+    "The appellant contends that the impugned order passed by the High Court "
+    "under Section 482 of the Code of Criminal Procedure is contrary to law. "
+)
+
+# A4 at 150 DPI: large enough that OCR pre-processing does real work
+SCAN_SIZE = (1240, 1754)
+
+
+def make_text_pdf(pages: int, lines_per_page: int = 45) -> bytes:
+    """Build a text-layer PDF that looks like a typed judgment"""
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    for page in range(1, pages + 1):
+        pdf.setFont("Helvetica", 10)
+        y = height - 50
+        for line in range(lines_per_page):
+            pdf.drawString(40, y, f"{page}.{line + 1} {PARAGRAPH}"[:110])
+            y -= 16
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def render_scan_page(page: int, seed: int = 0, size=SCAN_SIZE) -> Image.Image:
+    """A page image with typed lines, slight blur and speckle, like a scanner copy"""
+    rng = random.Random(seed * 10007 + page)
+    img = Image.new("L", size, 250)
+    draw = ImageDraw.Draw(img)
+    y = 80
+    line = 1
+    while y < size[1] - 80:
+        draw.text((70, y), f"{page}.{line} {PARAGRAPH}"[:120], fill=20)
+        y += 28
+        line += 1
+    for _ in range(size[0] * size[1] // 2000):
+        draw.point((rng.randrange(size[0]), rng.randrange(size[1])), fill=rng.randrange(80, 200))
+    return img.filter(ImageFilter.GaussianBlur(0.6))
+
+
+def make_image_pdf(pages: int, seed: int = 0) -> bytes:
+    """Build a scanned PDF: every page is an image, no text layer"""
+    images = [render_scan_page(page, seed).convert("RGB") for page in range(1, pages + 1)]
+    buffer = io.BytesIO()
+    images[0].save(buffer, format="PDF", save_all=True, append_images=images[1:], resolution=150)
+    return buffer.getvalue()
+
+
+def make_scan_png(seed: int = 0) -> bytes:
+    """A single scanned page as PNG (as uploaded from a phone or scanner)"""
+    buffer = io.BytesIO()
+    render_scan_page(1, seed).convert("RGB").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def make_docx_with_tables(tables: int = 3, rows: int = 400, cols: int = 6, paragraphs: int = 50) -> bytes:
+    """An agreement with long schedules (payment plans, property lists) as Word tables"""
+    from docx import Document
+
+    document = Document()
+    document.add_heading("AGREEMENT FOR SALE", level=1)
+    for i in range(paragraphs):
+        document.add_paragraph(f"{i + 1}. {PARAGRAPH}")
+    for t in range(tables):
+        document.add_heading(f"SCHEDULE {t + 1}", level=2)
+        table = document.add_table(rows=rows, cols=cols)
+        for r, row in enumerate(table.rows):
+            for c, cell in enumerate(row.cells):
+                cell.text = f"S{t + 1}-R{r + 1}-C{c + 1} Rs. {(r + 1) * (c + 7) * 1000:,}"
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def corpus_sizes(quick: bool) -> dict:
+    """Document counts and sizes for a full or --quick run"""
+    if quick:
+        return {'text_pdf_pages': [5, 40], 'image_pdf_pages': [2, 6], 'docx_rows': [100], 'png_scans': 3}
+    return {'text_pdf_pages': [5, 40, 200], 'image_pdf_pages': [2, 10, 30], 'docx_rows': [200, 2000], 'png_scans': 10}
+
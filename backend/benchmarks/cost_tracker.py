@@ -0,0 +1,148 @@
+"""
+CostTracker benchmark at 1M history rows
+
+Seeds a usage log with synthetic records, then measures loading it,
+record_usage (the call made after every AI request), flushing the buffer
+and compaction, and the /cost-tracking/dashboard queries over 30 and 365
+days. The old store (append to the list, rewrite the whole
+usage_history.json with indent=2) and the old dashboard filter (parse
+every timestamp in the history) are timed on the same history for
+comparison.
+
+Usage (from backend/):
+    python -m benchmarks.cost_tracker --rows 1000000
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+from app.services.cost_tracker import CostTracker
+from benchmarks.document_processing import percentile
+from benchmarks.document_storage import time_calls
+
+MODELS = [("gemini-flash", "Gemini Flash"), ("claude-haiku", "Claude Haiku"), ("gpt-4o-mini", "GPT-4o mini")]
+QUERY_TYPES = ["research", "drafting", "review", "case_search"]
+
+
+def make_records(count: int, days: int = 365, seed: int = 0) -> List[Dict]:
+    """Synthetic usage records spread evenly over the last `days` days, oldest first"""
+    rng = random.Random(seed)
+    start = datetime.now() - timedelta(days=days)
+    step = timedelta(days=days) / max(count, 1)
+    records = []
+    for i in range(count):
+        model_id, model_name = rng.choice(MODELS)
+        tokens = rng.randint(200, 8000)
+        records.append({
+            "timestamp": (start + step * i).isoformat(),
+            "model_id": model_id,
+            "model_name": model_name,
+            "query_type": rng.choice(QUERY_TYPES),
+            "tokens_used": tokens,
+            "cost_usd": tokens * 0.0000003,
+            "query_length": rng.randint(20, 2000),
+        })
+    return records
+
+
+def legacy_record(path: Path, history: List[Dict], record: Dict):
+    """What record_usage used to do: append and rewrite the whole file"""
+    history.append(record)
+    with open(path, 'w') as f:
+        json.dump(history, f, indent=2)
+
+
+def dashboard(tracker: CostTracker, days: int):
+    """What /cost-tracking/dashboard computes"""
+    tracker.get_usage_stats(days)
+    tracker.get_cost_by_model(days)
+    tracker.get_cost_by_query_type(days)
+    tracker.get_daily_costs(days)
+    tracker.get_cost_comparison_with_vidur(days)
+
+
+def legacy_window(history: List[Dict], days: int) -> List[Dict]:
+    """The filter each dashboard query used to run over the whole history"""
+    cutoff_date = datetime.now() - timedelta(days=days)
+    return [r for r in history if datetime.fromisoformat(r["timestamp"]) >= cutoff_date]
+
+
+def run(rows: int, records: int, legacy: bool) -> Dict[str, Dict[str, float]]:
+    history = make_records(rows)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        with open(tmp_dir / "usage_history.jsonl", 'w') as f:
+            f.writelines(json.dumps(r, separators=(",", ":")) + "\n" for r in history)
+
+        started = time.perf_counter()
+        tracker = CostTracker(data_dir=tmp_dir, flush_interval=3600)
+        results['load'] = {'total_ms': round((time.perf_counter() - started) * 1000, 1)}
+
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(records):
+            call_started = time.perf_counter()
+            tracker.record_usage("gemini-flash", "Gemini Flash", "research", 1200, 0.00036, 150)
+            latencies.append((time.perf_counter() - call_started) * 1000)
+        elapsed = time.perf_counter() - started
+        results['record_usage'] = {
+            'records_per_s': round(records / elapsed),
+            'p50_ms': round(percentile(latencies, 50), 4),
+            'p95_ms': round(percentile(latencies, 95), 4),
+        }
+
+        started = time.perf_counter()
+        tracker.flush()
+        results['flush'] = {'records': records, 'total_ms': round((time.perf_counter() - started) * 1000, 1)}
+
+        for days in (30, 365):
+            results[f'dashboard {days}d'] = time_calls(lambda: dashboard(tracker, days), 20)
+
+        started = time.perf_counter()
+        tracker.compact()
+        results['compact'] = {'total_ms': round((time.perf_counter() - started) * 1000, 1)}
+        tracker.shutdown()
+
+        if legacy:
+            legacy_file = tmp_dir / "usage_history.json"
+            legacy_history = list(history)
+            latencies = []
+            for _ in range(3):
+                started = time.perf_counter()
+                legacy_record(legacy_file, legacy_history, history[-1])
+                latencies.append((time.perf_counter() - started) * 1000)
+            for days in (30, 365):
+                # Five dashboard queries, each filtering the history once
+                results[f'legacy_dashboard {days}d'] = time_calls(
+                    lambda: [legacy_window(history, days) for _ in range(5)], 3
+                )
+            results['legacy_record_usage'] = {
+                'p50_ms': round(percentile(latencies, 50), 1),
+                'file_mb': round(legacy_file.stat().st_size / 2**20, 1),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CostTracker usage logging")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000000], help="Existing history rows")
+    parser.add_argument("--records", type=int, default=10000, help="record_usage calls to time")
+    parser.add_argument("--no-legacy", action="store_true", help="Skip the old rewrite and dashboard comparison")
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        print(f"\n{rows} history rows, {args.records} new records")
+        for operation, timing in run(rows, args.records, not args.no_legacy).items():
+            print(f"  {operation:<22} " + "  ".join(f"{key}={value}" for key, value in timing.items()))
+
+
+if __name__ == "__main__":
+    main()
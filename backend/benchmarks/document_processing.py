@@ -0,0 +1,239 @@
+"""
+Document-processing benchmark suite
+
+Runs the DocumentProcessor paths used by /review-document against synthetic
+corpora (see benchmarks.corpus) and reports throughput, per-document latency
+and peak memory for each scenario:
+
+    text_pdf     typed judgments (pdfplumber / process pool)
+    image_pdf    scanned bundles (Poppler render + OCR pipeline)
+    docx_tables  agreements with large schedule tables (python-docx)
+    png_scan     single scanned pages (image pre-processing + OCR)
+
+Remote OCR is replaced by a stub with a fixed latency, and the extraction
+cache is disabled, so runs are offline and repeatable. Each scenario runs in
+a fresh process so its peak RSS is its own.
+
+Usage (from backend/):
+    python -m benchmarks.document_processing
+    python -m benchmarks.document_processing --quick --scenario text_pdf --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.corpus import (
+    corpus_sizes, make_docx_with_tables, make_image_pdf, make_scan_png, make_text_pdf
+)
+
+SCENARIOS = ["text_pdf", "image_pdf", "docx_tables", "png_scan"]
+
+STUB_PAGE_TEXT = "IN THE HIGH COURT OF JUDICATURE. " * 60
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, round(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the kernel's peak RSS counter (Linux only); True if it worked"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None if unknown)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+@contextmanager
+def stub_remote_ocr(latency: float):
+    """
+    Replace Gemini OCR with a local stub and disable the extraction cache
+
+    Image pre-processing, the concurrency cap and page batching still run;
+    only the network call is replaced by a sleep of `latency` seconds.
+    """
+    from app.services.extraction_cache import extraction_cache
+    from app.services.ocr_toolchain import ocr_toolchain
+    from app.utils import gemini_ocr
+
+    async def fake_generate(contents: list) -> str:
+        await asyncio.sleep(latency)
+        images = sum(1 for part in contents[0]["parts"] if "inline_data" in part)
+        if images == 1:
+            return STUB_PAGE_TEXT
+        return "\n".join(f"=== PAGE {n} ===\n{STUB_PAGE_TEXT}" for n in range(1, images + 1))
+
+    capabilities = dict(ocr_toolchain.capabilities())
+    capabilities['gemini'] = {**capabilities['gemini'], 'available': True}
+    saved = (gemini_ocr._get_client, gemini_ocr._generate_async, ocr_toolchain.capabilities, extraction_cache.enabled)
+    gemini_ocr._get_client = lambda: None
+    gemini_ocr._generate_async = fake_generate
+    ocr_toolchain.capabilities = lambda: capabilities
+    extraction_cache.enabled = False
+    try:
+        yield
+    finally:
+        gemini_ocr._get_client, gemini_ocr._generate_async, ocr_toolchain.capabilities, extraction_cache.enabled = saved
+
+
+def build_corpus(scenario: str, quick: bool) -> Tuple[List[Tuple[bytes, int]], str]:
+    """Documents as (content, units) plus the unit name"""
+    sizes = corpus_sizes(quick)
+    if scenario == "text_pdf":
+        return [(make_text_pdf(pages), pages) for pages in sizes['text_pdf_pages']], "pages"
+    if scenario == "image_pdf":
+        return [(make_image_pdf(pages, seed=i), pages) for i, pages in enumerate(sizes['image_pdf_pages'])], "pages"
+    if scenario == "docx_tables":
+        return [(make_docx_with_tables(rows=rows), 3 * rows) for rows in sizes['docx_rows']], "table rows"
+    if scenario == "png_scan":
+        return [(make_scan_png(seed=i), 1) for i in range(sizes['png_scans'])], "pages"
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def _processor_call(scenario: str) -> Callable:
+    from app.services.document_processor import document_processor
+    if scenario in ("text_pdf", "image_pdf"):
+        return lambda content: document_processor.process_pdf(content)
+    if scenario == "docx_tables":
+        return lambda content: document_processor.process_word(content, ".docx")
+    return lambda content: document_processor.process_image(content, "scan.png")
+
+
+def skip_reason(scenario: str) -> Optional[str]:
+    """Why a scenario cannot run here, or None"""
+    if scenario == "image_pdf":
+        from app.services.ocr_toolchain import ocr_toolchain
+        if not ocr_toolchain.capabilities()['pdf_ocr_available']:
+            return "Poppler/pdf2image not available"
+    return None
+
+
+def run_scenario(scenario: str, quick: bool = False, repeat: int = 3, ocr_latency: float = 0.2) -> Dict[str, Any]:
+    """
+    Benchmark one scenario in the current process
+
+    Args:
+        scenario: One of SCENARIOS
+        quick: Smaller corpus
+        repeat: Passes over the corpus
+        ocr_latency: Seconds per stubbed OCR request
+
+    Returns:
+        Result row (units/s, p50/p95 latency, peak RSS)
+    """
+    reason = skip_reason(scenario)
+    if reason:
+        return {'scenario': scenario, 'skipped': reason}
+
+    documents, unit = build_corpus(scenario, quick)
+    process = _processor_call(scenario)
+
+    async def run_all() -> List[float]:
+        await process(documents[0][0])  # Warm up imports and worker pools
+        latencies = []
+        for _ in range(repeat):
+            for content, _units in documents:
+                started = time.perf_counter()
+                await process(content)
+                latencies.append(time.perf_counter() - started)
+        return latencies
+
+    with stub_remote_ocr(ocr_latency):
+        rss_reset = _reset_peak_rss()
+        started = time.perf_counter()
+        latencies = asyncio.run(run_all())
+        elapsed = time.perf_counter() - started
+
+    from app.services.pdf_extraction import pdf_extractor
+    pdf_extractor.shutdown()
+
+    units = sum(units for _, units in documents) * repeat
+    return {
+        'scenario': scenario,
+        'documents': len(documents) * repeat,
+        'unit': unit,
+        'units': units,
+        'units_per_second': round(units / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'peak_rss_mb': peak_rss_mb(),
+        # Without a reset the peak includes corpus generation
+        'peak_rss_scope': 'scenario' if rss_reset else 'process',
+    }
+
+
+def run_isolated(scenario: str, **kwargs) -> Dict[str, Any]:
+    """run_scenario in a fresh process so peak RSS is not shared between scenarios"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(run_scenario, scenario, **kwargs).result()
+
+
+def format_table(results: List[Dict[str, Any]]) -> str:
+    lines = [f"{'scenario':<12} {'docs':>5} {'units/s':>10} {'unit':<11} {'p50 ms':>9} {'p95 ms':>9} {'peak RSS MB':>12}"]
+    for row in results:
+        if 'skipped' in row:
+            lines.append(f"{row['scenario']:<12} skipped: {row['skipped']}")
+            continue
+        lines.append(
+            f"{row['scenario']:<12} {row['documents']:>5} {row['units_per_second']:>10.1f} {row['unit']:<11} "
+            f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['peak_rss_mb'] if row['peak_rss_mb'] is not None else 'n/a':>12}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark document extraction on synthetic corpora")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="Repeatable; default all")
+    parser.add_argument("--quick", action="store_true", help="Smaller corpus (CI smoke run)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--ocr-latency", type=float, default=0.2, help="Seconds per stubbed OCR request")
+    parser.add_argument("--in-process", action="store_true", help="Do not isolate scenarios in subprocesses")
+    parser.add_argument("--json", metavar="PATH", help="Also write results as JSON")
+    args = parser.parse_args()
+
+    runner = run_scenario if args.in_process else run_isolated
+    results = []
+    for scenario in args.scenario or SCENARIOS:
+        results.append(runner(scenario, quick=args.quick, repeat=args.repeat, ocr_latency=args.ocr_latency))
+        print(format_table(results[-1:]).splitlines()[-1], flush=True)
+
+    print()
+    print(format_table(results))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Retrieval index benchmark
+
+Stores synthetic documents (benchmarks.document_storage corpus), indexes
+them with DocumentRetrieval and measures indexing throughput, index size
+and query latency (cosine top-k over the memory-mapped vectors).
+
+Usage (from backend/):
+    python -m benchmarks.document_retrieval --docs 1000 10000
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+from app.services.document_retrieval import DocumentRetrieval
+from app.services.document_storage import DocumentStorage
+from benchmarks.document_storage import make_documents, time_calls
+
+QUERIES = [
+    "impugned order contrary to Section 482 CrPC",
+    "GST rate amendment notification",
+    "writ petition filed by the petitioner against the respondent",
+]
+
+
+def run(count: int, text_kb: int, dimensions: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    documents = make_documents(count, text_kb)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        storage = DocumentStorage(db_path=tmp_dir / "documents.db", legacy_dir=None)
+
+        async def save_all():
+            for document in documents:
+                await storage.save_document(document["filename"], document["document_type"], document["extracted_text"])
+
+        asyncio.run(save_all())
+        retrieval = DocumentRetrieval(directory=tmp_dir / "retrieval", dimensions=dimensions)
+
+        started = time.perf_counter()
+        retrieval.sync_with_storage(storage)
+        elapsed = time.perf_counter() - started
+        stats = retrieval.get_stats()
+        results['index'] = {
+            'passages': stats['passages'],
+            'docs_per_s': round(count / elapsed, 1),
+            'vectors_mb': stats['vectors_mb'],
+        }
+        for i, query in enumerate(QUERIES):
+            results[f'search q{i + 1}'] = time_calls(lambda: retrieval.search(query, top_k=8), repeat)
+        results['relevant_passages'] = time_calls(lambda: retrieval.relevant_passages(QUERIES[0]), repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the local retrieval index")
+    parser.add_argument("--docs", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--text-kb", type=int, default=4, help="Extracted text per document")
+    parser.add_argument("--dimensions", type=int, default=1024)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    for count in args.docs:
+        print(f"\n{count} documents, {args.text_kb} KB text each, {args.dimensions} dimensions")
+        for operation, timing in run(count, args.text_kb, args.dimensions, args.repeat).items():
+            print(f"  {operation:<20} " + "  ".join(f"{key}={value}" for key, value in timing.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+DocumentStorage benchmark at 1k and 10k documents
+
+Fills a temporary store with synthetic uploads and measures save_document,
+the /major-cases and /legal-news listings (in memory and reloaded),
+get_document, search_documents (rare, common, phrase and prefix queries),
+saving a near-duplicate and the database size against the raw text size.
+The old JSON store (load everything, append, rewrite the file) is timed on
+the same corpus for comparison.
+
+Usage (from backend/):
+    python -m benchmarks.document_storage --docs 1000 10000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from app.services.document_storage import DocumentStorage, classify_document
+from benchmarks.document_processing import percentile
+
+CASE_TEXT = (
+    "IN THE HIGH COURT OF DELHI. Writ petition filed by the petitioner against the respondent. "
+    "The court held that the impugned order is contrary to Section 482 CrPC. "
+)
+NEWS_TEXT = (
+    "Ministry of Finance notification: amendment to GST rates announced in a press release. "
+    "The circular clarifies the reform for taxpayers. "
+)
+
+# search_documents queries: a rare term, a term in most documents, a phrase and a prefix
+SEARCH_QUERIES = {
+    'rare': "document 4242",
+    'common': "petitioner",
+    'phrase': '"impugned order"',
+    'prefix': "notif*",
+}
+
+
+# Filler vocabulary: documents differ in most word sequences (otherwise
+# duplicate detection folds them all into one)
+VOCABULARY = [f"term{n}" for n in range(5000)]
+
+
+def make_text(rng: random.Random, base: str, text_kb: int) -> str:
+    """About text_kb of random filler words with the base text every ~40 words"""
+    parts = []
+    size = 0
+    while size < text_kb * 1024:
+        part = " ".join(rng.choices(VOCABULARY, k=40)) + ". " + base
+        parts.append(part)
+        size += len(part)
+    return "".join(parts)
+
+
+def make_documents(count: int, text_kb: int, seed: int = 0) -> List[Dict]:
+    """Synthetic stored documents, about 70% cases and 30% news"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    documents = []
+    for i in range(count):
+        base = CASE_TEXT if rng.random() < 0.7 else NEWS_TEXT
+        text = f"Document {i}. " + make_text(rng, base, text_kb)
+        is_case, is_news = classify_document(text)
+        documents.append({
+            "id": f"doc_bench_{i:06d}",
+            "filename": f"upload_{i}.pdf",
+            "document_type": rng.choice(["pdf", "pdf", "word", "text"]),
+            "extracted_text": text,
+            "metadata": {"size": len(text)},
+            "created_at": (start + timedelta(minutes=i)).isoformat(),
+            "is_case": is_case,
+            "is_news": is_news,
+        })
+    return documents
+
+
+def time_calls(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """p50/p95 in milliseconds"""
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return {'p50_ms': round(percentile(latencies, 50), 2), 'p95_ms': round(percentile(latencies, 95), 2)}
+
+
+def legacy_json_save(path: Path, document: Dict):
+    """What save_document used to do: load every document, append, rewrite"""
+    with open(path, 'r', encoding='utf-8') as f:
+        documents = json.load(f)
+    documents.append(document)
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(documents, f, ensure_ascii=False, indent=2)
+    tmp_path.replace(path)
+
+
+def run(count: int, text_kb: int, repeat: int, legacy: bool) -> Dict[str, Dict[str, float]]:
+    documents = make_documents(count, text_kb)
+    rng = random.Random(1)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        legacy_file = tmp_dir / "documents.json"
+        with open(legacy_file, 'w', encoding='utf-8') as f:
+            json.dump(documents, f, ensure_ascii=False, indent=2)
+
+        started = time.perf_counter()
+        storage = DocumentStorage(db_path=tmp_dir / "documents.db", legacy_dir=tmp_dir)
+        storage.run_maintenance()
+        results['migrate'] = {'total_ms': round((time.perf_counter() - started) * 1000, 1)}
+
+        loop = asyncio.new_event_loop()
+        try:
+            results['save_document'] = time_calls(
+                lambda: loop.run_until_complete(storage.save_document("new.pdf", "pdf", make_text(rng, CASE_TEXT, text_kb))), repeat
+            )
+            results['get_recent_cases'] = time_calls(
+                lambda: loop.run_until_complete(storage.get_recent_cases(limit=5)), repeat
+            )
+            results['get_recent_news'] = time_calls(
+                lambda: loop.run_until_complete(storage.get_recent_news(limit=5)), repeat
+            )
+            # After another process wrote: the in-memory listing is reloaded
+            results['recent_cases_reload'] = time_calls(
+                lambda: (storage._recent_index.clear(), loop.run_until_complete(storage.get_recent_cases(limit=5))),
+                repeat
+            )
+            results['get_document'] = time_calls(
+                lambda: storage.get_document(documents[len(documents) // 2]["id"]), repeat
+            )
+            for label, query in SEARCH_QUERIES.items():
+                results[f'search {label}'] = time_calls(
+                    lambda: loop.run_until_complete(storage.search_documents(query, limit=10)), repeat
+                )
+            # A re-upload of a stored document (e.g. the DOCX of a stored PDF)
+            duplicate_text = documents[len(documents) // 3]["extracted_text"].replace(".", ";")
+            results['save_near_duplicate'] = time_calls(
+                lambda: loop.run_until_complete(storage.save_document("copy.docx", "word", duplicate_text)), repeat
+            )
+        finally:
+            loop.close()
+
+        db_bytes = sum(path.stat().st_size for path in tmp_dir.glob("documents.db*"))
+        text_bytes = sum(len(doc["extracted_text"].encode('utf-8')) for doc in documents)
+        results['storage'] = {'db_mb': round(db_bytes / 2**20, 1), 'text_mb': round(text_bytes / 2**20, 1)}
+
+        if legacy:
+            document = dict(documents[0], id="doc_legacy")
+            results['legacy_json_save'] = time_calls(
+                lambda: legacy_json_save(legacy_file, document), max(3, repeat // 10)
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SQLite DocumentStorage")
+    parser.add_argument("--docs", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--text-kb", type=int, default=4, help="Extracted text per document")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--no-legacy", action="store_true", help="Skip the old JSON store comparison")
+    args = parser.parse_args()
+
+    for count in args.docs:
+        print(f"\n{count} documents, {args.text_kb} KB text each")
+        for operation, timing in run(count, args.text_kb, args.repeat, not args.no_legacy).items():
+            print(f"  {operation:<20} " + "  ".join(f"{key}={value}" for key, value in timing.items()))
+
+
+if __name__ == "__main__":
+    main()
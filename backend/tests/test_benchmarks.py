@@ -0,0 +1,16 @@
+from benchmarks.document_processing import percentile, run_scenario
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile([], 95) == 0.0
+
+
+def test_scenarios_run_offline_with_stubbed_ocr():
+    for scenario in ("docx_tables", "png_scan"):
+        row = run_scenario(scenario, quick=True, repeat=1, ocr_latency=0)
+
+        assert row["units_per_second"] > 0
+        assert row["p50_ms"] <= row["p95_ms"]
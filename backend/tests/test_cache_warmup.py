@@ -0,0 +1,32 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core import database
+from app.models.audit_log import AIAuditLog, Base
+from app.services.cache_warmup import load_top_queries
+
+
+def test_top_queries_grouped_case_insensitively(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(database, "SessionLocal", session_factory)
+    frequent = "Section 138 cheque bounce limitation"
+    rare = "GST refund rejection appeal"
+
+    db = session_factory()
+    try:
+        for text in [frequent, frequent.upper(), f"  {frequent} ", rare]:
+            db.add(AIAuditLog(
+                query_text=text,
+                query_type="research",
+                response_text="-",
+                response_hash="-",
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+    queries = {q["query"].strip().lower(): q["count"] for q in load_top_queries(limit=10)}
+    assert queries == {frequent.lower(): 3, rare.lower(): 1}
+    engine.dispose()
@@ -0,0 +1,67 @@
+import asyncio
+
+from app.services.chunked_review import ChunkedReviewer, estimate_tokens, split_document
+from app.services.extraction_cache import ExtractionCache
+
+AGREEMENT = "\n".join(
+    f"CLAUSE {n}\n" + f"The Lessee shall pay rent under clause {n} on the first day of each month. " * 30
+    for n in range(1, 9)
+)
+
+
+def test_split_document_respects_budget_and_clause_boundaries():
+    chunks = split_document(AGREEMENT, max_tokens=1000)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 1000 for chunk in chunks)
+    assert all(chunk.startswith("CLAUSE") for chunk in chunks)
+    assert "".join(chunks).count("CLAUSE") == 8
+
+
+def test_review_maps_concurrently_reduces_once_and_reuses_chunk_analyses(tmp_path):
+    calls = {"summary": 0, "research": 0}
+    in_flight = 0
+    peak = 0
+
+    async def fake_generate(prompt, query_type):
+        nonlocal in_flight, peak
+        calls[query_type] += 1
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if query_type == "summary":
+            return "notes: " + prompt.splitlines()[0]
+        assert "Notes on part 1" in prompt
+        return "combined review"
+
+    reviewer = ChunkedReviewer(chunk_tokens=1000, concurrency=2, cache=ExtractionCache(cache_dir=tmp_path))
+    first = asyncio.run(reviewer.review(AGREEMENT, "Summarise the lease", fake_generate))
+    map_calls = calls["summary"]
+
+    assert first["analysis"] == "combined review"
+    assert first["chunks"] == map_calls > 1
+    assert first["cached_chunks"] == 0
+    assert peak == 2
+
+    second = asyncio.run(reviewer.review(AGREEMENT, "Summarise the lease", fake_generate))
+    assert second["cached_chunks"] == second["chunks"]
+    assert calls["summary"] == map_calls  # only the combine step ran again
+    assert calls["research"] == 2
+
+
+def test_final_answer_goes_through_the_answer_callable():
+    prompts = {"generate": [], "answer": []}
+
+    async def fake_generate(prompt, query_type):
+        prompts["generate"].append(query_type)
+        return "notes"
+
+    async def fake_answer(prompt, query_type):
+        prompts["answer"].append(query_type)
+        return "answer with context"
+
+    reviewer = ChunkedReviewer(chunk_tokens=1000, concurrency=2)
+    review = asyncio.run(reviewer.review(AGREEMENT, "Summarise the lease", fake_generate, answer=fake_answer))
+
+    assert review["analysis"] == "answer with context"
+    assert set(prompts["generate"]) == {"summary"} and prompts["answer"] == ["research"]
@@ -0,0 +1,116 @@
+import json
+from datetime import datetime, timedelta
+
+from app.services import cost_tracker as tracker_module
+from app.services.cost_tracker import CostTracker
+
+
+def _record(tracker, model_id="gemini-flash", cost=0.001):
+    tracker.record_usage(model_id, "Gemini Flash", "research", 1000, cost, 120)
+
+
+def test_records_are_appended_once_and_reloaded(tmp_path):
+    tracker = CostTracker(data_dir=tmp_path, flush_interval=60)
+    for _ in range(3):
+        _record(tracker)
+
+    # Nothing written on the request path
+    assert not (tmp_path / "usage_history.jsonl").exists()
+    assert tracker.flush() == 3
+    assert tracker.flush() == 0
+    _record(tracker, cost=0.002)
+    tracker.shutdown()
+
+    lines = (tmp_path / "usage_history.jsonl").read_text().splitlines()
+    assert len(lines) == 4
+    reopened = CostTracker(data_dir=tmp_path, flush_interval=60)
+    assert reopened.get_usage_stats(days=1)["total_queries"] == 4
+    assert reopened.get_cost_by_model(days=1)[0]["total_cost_usd"] == 0.005
+    reopened.shutdown()
+
+
+def test_legacy_json_is_imported_and_torn_lines_skipped(tmp_path):
+    now = datetime.now().isoformat()
+    (tmp_path / "usage_history.json").write_text(json.dumps([
+        {"timestamp": now, "model_id": "m", "model_name": "M", "query_type": "research",
+         "tokens_used": 10, "cost_usd": 0.5, "query_length": 5},
+    ], indent=2))
+    tracker = CostTracker(data_dir=tmp_path, flush_interval=60)
+    tracker.shutdown()
+    log = tmp_path / "usage_history.jsonl"
+    with open(log, "a") as f:
+        f.write('{"timestamp": "garbage"\n{"timestamp": "' + now + '", "cost')
+
+    reopened = CostTracker(data_dir=tmp_path, flush_interval=60)
+
+    assert len(reopened.history) == 1 and reopened.history[0]["cost_usd"] == 0.5
+    # The torn final line is cut off, so the next append starts on a fresh line
+    assert log.read_text().endswith("\n")
+    _record(reopened)
+    reopened.shutdown()
+    assert len(CostTracker(data_dir=tmp_path, flush_interval=60).history) == 2
+
+
+def _write_old_records(path, count, days_ago):
+    old = (datetime.now() - timedelta(days=days_ago)).isoformat()
+    with open(path, "w") as f:
+        for _ in range(count):
+            f.write(json.dumps({"timestamp": old, "model_id": "m", "model_name": "M", "query_type": "research",
+                                "tokens_used": 10, "cost_usd": 1.0, "query_length": 5}) + "\n")
+        f.write("not json\n")
+
+
+def test_compaction_keeps_all_history_by_default(tmp_path):
+    _write_old_records(tmp_path / "usage_history.jsonl", 3, days_ago=900)
+    tracker = CostTracker(data_dir=tmp_path, flush_interval=60)
+
+    assert tracker._compaction_due()
+    assert tracker.compact() == 1  # Only the unreadable line
+    assert not tracker._compaction_due()
+    assert len((tmp_path / "usage_history.jsonl").read_text().splitlines()) == 3
+    assert tracker.get_usage_stats(days=1000)["total_queries"] == 3
+    tracker.shutdown()
+
+
+def test_retention_drops_expired_records_and_clamps_windows(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracker_module, "COMPACT_MIN_RECORDS", 2)
+    _write_old_records(tmp_path / "usage_history.jsonl", 3, days_ago=40)
+    tracker = CostTracker(data_dir=tmp_path, flush_interval=60, retention_days=30)
+    _record(tracker)
+    tracker.flush()
+
+    assert tracker.get_usage_stats(days=500)["period_days"] == 30
+    assert tracker.compact() == 4
+    assert len(tracker.history) == 1
+    assert len((tmp_path / "usage_history.jsonl").read_text().splitlines()) == 1
+    tracker.shutdown()
+
+
+def test_dashboard_queries_sum_day_rollups(tmp_path):
+    now = datetime.now()
+    with open(tmp_path / "usage_history.jsonl", "w") as f:
+        for days_ago, model_id, qtype, cost in ((40, "old", "research", 5.0), (3, "m1", "drafting", 1.0),
+                                                (3, "m2", "research", 2.0), (0, "m1", "research", 0.5)):
+            f.write(json.dumps({
+                "timestamp": (now - timedelta(days=days_ago)).isoformat(), "model_id": model_id,
+                "model_name": model_id.upper(), "query_type": qtype, "tokens_used": 100,
+                "cost_usd": cost, "query_length": 10,
+            }) + "\n")
+    tracker = CostTracker(data_dir=tmp_path, flush_interval=60)
+    _record(tracker, model_id="m2", cost=0.25)
+
+    stats = tracker.get_usage_stats(days=7)
+    assert stats["total_queries"] == 4 and stats["total_cost_usd"] == 3.75
+    assert [(m["model_id"], m["queries"]) for m in tracker.get_cost_by_model(days=7)] == [("m2", 2), ("m1", 2)]
+    assert {t["query_type"]: t["queries"] for t in tracker.get_cost_by_query_type(days=7)} == {
+        "research": 3, "drafting": 1,
+    }
+    daily = tracker.get_daily_costs(days=7)
+    assert [d["queries"] for d in daily] == [2, 2] and daily[-1]["cost_usd"] == 0.75
+    # Today only, reported from midnight, then the full history
+    today = tracker.get_usage_stats(days=1)
+    assert today["total_queries"] == 2
+    assert today["period_start"] == f"{now.date().isoformat()}T00:00:00"
+    assert stats["period_start"] == f"{(now - timedelta(days=6)).date().isoformat()}T00:00:00"
+    assert tracker.get_usage_stats(days=365)["total_cost_usd"] == 8.75
+    tracker.shutdown()
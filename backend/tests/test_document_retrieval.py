@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.services.document_retrieval import DocumentRetrieval
+from app.services.document_storage import DocumentStorage
+
+BAIL = (
+    "The applicant seeks anticipatory bail under Section 438 CrPC. The court considered the gravity "
+    "of the accusation, the antecedents of the applicant and the possibility of the applicant fleeing "
+    "from justice, and granted anticipatory bail subject to conditions. "
+)
+LEASE = (
+    "The lessee shall pay monthly rent on or before the fifth day of every month. The lessor may "
+    "terminate the lease deed on breach of the rent covenant after fifteen days written notice. "
+)
+GST = (
+    "The GST council notified revised rates for input tax credit on works contracts. Registered persons "
+    "must reverse ineligible input tax credit in the monthly return. "
+)
+
+
+def _store(tmp_path, texts):
+    storage = DocumentStorage(db_path=tmp_path / "documents.db", legacy_dir=None)
+
+    async def save_all():
+        return [await storage.save_document(name, "pdf", text) for name, text in texts]
+
+    return storage, asyncio.run(save_all())
+
+
+def test_passages_are_ranked_and_fit_the_token_budget(tmp_path):
+    storage, (bail_id, lease_id, gst_id) = _store(tmp_path, [
+        ("bail_order.pdf", BAIL * 12), ("lease.pdf", LEASE * 12), ("gst_circular.pdf", GST * 12),
+    ])
+    retrieval = DocumentRetrieval(directory=tmp_path / "retrieval", dimensions=256)
+
+    assert retrieval.sync_with_storage(storage) > 3
+    results = retrieval.search("conditions for granting anticipatory bail", top_k=3)
+    assert results[0]["document_id"] == bail_id and results[0]["title"] == "bail_order"
+    assert results[0]["score"] > results[-1]["score"]
+    assert retrieval.search("input tax credit reversal")[0]["document_id"] == gst_id
+
+    cases = retrieval.relevant_passages("termination of lease for unpaid rent", token_budget=300, min_score=0.05)
+    assert cases and cases[0]["document_id"] == lease_id and cases[0]["source"] == "uploaded_document"
+    assert sum(len(case["passage"]) for case in cases) <= 300 * 4
+    assert retrieval.relevant_passages("xylophone quartet", min_score=0.05) == []
+
+
+def test_index_appends_incrementally_and_survives_a_torn_append(tmp_path):
+    storage, _ = _store(tmp_path, [("bail_order.pdf", BAIL * 4)])
+    retrieval = DocumentRetrieval(directory=tmp_path / "retrieval", dimensions=128)
+    retrieval.sync_with_storage(storage)
+    passages = retrieval.get_stats()["passages"]
+
+    # Vector rows written without their passage rows (crash mid-append)
+    with open(retrieval.vectors_path, "ab") as f:
+        f.write(b"\0" * retrieval._row_bytes * 2)
+    lease_id = asyncio.run(storage.save_document("lease.pdf", "pdf", LEASE * 4))
+    reopened = DocumentRetrieval(directory=tmp_path / "retrieval", dimensions=128)
+
+    assert reopened.sync_with_storage(storage) > 0
+    assert reopened.sync_with_storage(storage) == 0
+    assert reopened._vector_rows() == reopened.get_stats()["passages"] > passages
+    assert reopened.search("monthly rent lease")[0]["document_id"] == lease_id
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from app.api import document_review, legal_research
+from app.services.ai_service import AIService, ai_service
+
+
+class FakeUpload:
+    """Async chunked reader standing in for FastAPI's UploadFile"""
+
+    def __init__(self, data: bytes, filename: str):
+        self.data = data
+        self.filename = filename
+        self.size = len(data)
+
+    async def read(self, size: int = -1) -> bytes:
+        chunk, self.data = self.data[:size], self.data[size:]
+        return chunk
+
+
+@pytest.fixture
+def retrievals(monkeypatch):
+    """Queries sent to document retrieval; the provider and web search are stubbed"""
+    queries = []
+
+    async def fake_retrieve(self, query):
+        queries.append(query)
+        return []
+
+    async def fake_generate(self, user_text, query_type="research"):
+        return "analysis"
+
+    async def no_web_search(self, query, flags=None):
+        return []
+
+    monkeypatch.setattr(AIService, "retrieve_relevant_cases", fake_retrieve)
+    monkeypatch.setattr(AIService, "_generate_text", fake_generate)
+    monkeypatch.setattr(AIService, "fetch_web_search_results", no_web_search)
+    monkeypatch.setattr(document_review, "ai_service", ai_service)
+    return queries
+
+
+@pytest.mark.parametrize("review_mode", ["single", "chunked"])
+def test_document_review_never_searches_stored_documents(retrievals, review_mode):
+    upload = FakeUpload(b"The Lessee shall pay rent on the first day of each month. " * 50, "lease.txt")
+
+    response = asyncio.run(document_review.review_document(upload, "Summarise the lease", review_mode))
+
+    assert response.analysis.startswith("analysis")
+    assert retrievals == []
+
+
+def test_legal_research_attaches_retrieved_passages(retrievals):
+    request = legal_research.LegalQueryRequest(query="Limitation period for a GST appeal")
+
+    asyncio.run(legal_research.legal_research(request))
+
+    assert retrievals == ["Limitation period for a GST appeal"]
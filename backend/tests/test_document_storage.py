@@ -0,0 +1,198 @@
+import asyncio
+import json
+
+from app.services import document_storage as storage_module
+from app.services.document_storage import DocumentStorage
+
+
+def _legacy_doc(doc_id, created_at, text, **flags):
+    return {
+        "id": doc_id, "filename": f"{doc_id}.pdf", "document_type": "pdf",
+        "extracted_text": text, "metadata": {"pages": 2}, "created_at": created_at, **flags,
+    }
+
+
+def test_json_stores_are_migrated_once(tmp_path):
+    legacy = tmp_path / "legacy"
+    legacy.mkdir()
+    (legacy / "documents.json").write_text(json.dumps([
+        _legacy_doc("doc_1", "2025-01-01T10:00:00", "Judgment of the High Court", is_case=True, is_news=False),
+        _legacy_doc("doc_2", "2025-02-01T10:00:00", "GST notification", is_case=False, is_news=True),
+    ]))
+    (legacy / "cases.json").write_text("[]")
+
+    storage = DocumentStorage(db_path=tmp_path / "documents.db", legacy_dir=legacy)
+    # Nothing is imported on construction (the app runs maintenance in the background)
+    assert storage.count_documents() == 0
+    assert storage.run_maintenance() == {"migrated": 2, "duplicates": 0}
+    again = DocumentStorage(db_path=tmp_path / "documents.db", legacy_dir=legacy)
+
+    assert storage.count_documents() == 2
+    assert again.run_maintenance()["migrated"] == 0
+    doc = again.get_document("doc_1")
+    assert doc["is_case"] is True and doc["metadata"] == {"pages": 2}
+
+
+def test_recent_listings_are_newest_first_with_fallback(tmp_path):
+    storage = DocumentStorage(db_path=tmp_path / "documents.db", legacy_dir=None)
+
+    async def scenario():
+        first = await storage.save_document("old.pdf", "pdf", "Writ petition before the Supreme Court. " * 20)
+        await asyncio.sleep(0.01)
+        second = await storage.save_document("new.pdf", "pdf", "Judgment: petitioner v respondent")
+        plain = await storage.save_document("memo.docx", "word", "Meeting notes")
+        return first, second, plain, await storage.get_recent_cases(limit=5), await storage.get_recent_news(limit=5)
+
+    first, second, plain, cases, news = asyncio.run(scenario())
+
+    assert [case["document_id"] for case in cases] == [second, first]
+    assert cases[1]["title"] == "old" and cases[1]["summary"].endswith("...")
+    # No explicit news: Word/text documents not marked as cases are listed
+    assert [item["document_id"] for item in news] == [plain]
+
+
+def test_search_ranks_filename_matches_first(tmp_path):
+    storage = DocumentStorage(db_path=tmp_path / "documents.db", legacy_dir=None)
+
+    async def scenario():
+        await storage.save_document("lease.pdf", "pdf", "The ARBITRATION clause applies")
+        await storage.save_document("arbitration_award.pdf", "pdf", "Award")
+        await storage.save_document("notes.txt", "text", "nothing relevant")
+        return await storage.search_documents("Arbitration")
+
+    results = asyncio.run(scenario())
+
+    assert [doc["filename"] for doc in results] == ["arbitration_award.pdf", "lease.pdf"]
+
+
+def test_search_phrases_prefixes_snippets_and_pages(tmp_path):
+    storage = DocumentStorage(db_path=tmp_path / "documents.db", legacy_dir=None)
+
+    async def scenario():
+        await storage.save_document("a.pdf", "pdf", "The impugned order was set aside by the court.")
+        await storage.save_document("b.pdf", "pdf", "An order that was not impugned.")
+        for i in range(3):
+            await storage.save_document(f"n{i}.txt", "text", f"Notification number {i} on GST")
+        return (
+            await storage.search_documents('"impugned order"'),
+            await storage.search_documents("notif*", limit=2),
+            await storage.search_documents("notif*", limit=2, offset=2),
+            await storage.search_documents("  *  "),
+        )
+
+    phrase, first_page, second_page, empty = asyncio.run(scenario())
+
+    assert [doc["filename"] for doc in phrase] == ["a.pdf"]
+    assert "The **impugned order** was" in phrase[0]["snippet"]
+    assert len(first_page) == 2 and len(second_page) == 1
+    names = {doc["filename"] for doc in first_page + second_page}
+    assert names == {"n0.txt", "n1.txt", "n2.txt"}
+    assert empty == []
+
+
+def test_bodies_are_compressed_shared_and_loaded_lazily(tmp_path):
+    storage = DocumentStorage(db_path=tmp_path / "documents.db", legacy_dir=None)
+    text = "Judgment of the High Court on the writ petition. " * 200
+
+    async def save_twice():
+        return [await storage.save_document(name, "pdf", text) for name in ("scan.pdf", "copy.pdf")]
+
+    first, second = asyncio.run(save_twice())
+
+    with storage._connect() as conn:
+        bodies = conn.execute("SELECT body FROM document_bodies").fetchall()
+    assert len(bodies) == 1 and len(bodies[0]["body"]) < len(text) // 10
+    assert storage.get_document(second)["extracted_text"] == text
+
+    # Listings read only the metadata rows
+    with storage._connect() as conn:
+        conn.execute("DELETE FROM document_bodies")
+    cases = asyncio.run(storage.get_recent_cases(limit=5))
+    assert {case["document_id"] for case in cases} == {first, second}
+    assert cases[0]["summary"].startswith("Judgment of the High Court")
+
+
+def test_recent_listings_stay_in_memory_until_another_writer(tmp_path):
+    storage = DocumentStorage(db_path=tmp_path / "documents.db", legacy_dir=None)
+    loads = []
+    load_listing = storage._load_listing
+    storage._load_listing = lambda *args: loads.append(args[0]) or load_listing(*args)
+    case_text = "Judgment: petitioner v respondent"
+
+    async def scenario():
+        await storage.save_document("first.pdf", "pdf", case_text)
+        listed = [await storage.get_recent_cases(limit=5) for _ in range(3)]
+        await storage.save_document("second.pdf", "pdf", case_text)
+        after_own_save = await storage.get_recent_cases(limit=5)
+        other_process = DocumentStorage(db_path=tmp_path / "documents.db", legacy_dir=None)
+        await other_process.save_document("third.pdf", "pdf", case_text)
+        return listed, after_own_save, await storage.get_recent_cases(limit=5)
+
+    listed, after_own_save, after_other_writer = asyncio.run(scenario())
+
+    assert all(len(cases) == 1 for cases in listed)
+    assert [case["title"] for case in after_own_save] == ["second", "first"]
+    assert [case["title"] for case in after_other_writer] == ["third", "second", "first"]
+    # Loaded once, updated in place by the own save, reloaded after the other writer
+    assert loads == ["cases", "cases"]
+
+
+def test_near_duplicates_are_hidden_from_listings_and_search(tmp_path):
+    storage = DocumentStorage(db_path=tmp_path / "documents.db", legacy_dir=None)
+    judgment = " ".join(f"The petitioner relied on paragraph {n} of the impugned order." for n in range(60))
+    scanned = judgment.replace("impugned", "impugncd", 5).replace(".", ",")
+
+    async def scenario():
+        original = await storage.save_document("judgment.pdf", "pdf", judgment)
+        copy = await storage.save_document("judgment_scan.pdf", "pdf", scanned)
+        other = await storage.save_document("other.pdf", "pdf", "Judgment: the respondent appealed. " * 3)
+        return original, copy, other, await storage.get_recent_cases(limit=5), await storage.search_documents("impugned")
+
+    original, copy, other, cases, found = asyncio.run(scenario())
+
+    assert [case["document_id"] for case in cases] == [other, original]
+    assert [doc["id"] for doc in found] == [original]
+    duplicate = storage.get_document(copy)
+    assert duplicate["duplicate_of"] == original and duplicate["filename"] == "judgment_scan.pdf"
+    assert duplicate["extracted_text"] == scanned
+
+
+def test_near_duplicate_with_extra_content_keeps_it(tmp_path):
+    storage = DocumentStorage(db_path=tmp_path / "documents.db", legacy_dir=None)
+    judgment = " ".join(f"The petitioner relied on paragraph {n} of the impugned order." for n in range(60))
+    with_annexure = judgment + " ANNEXURE P-1: Order of the Appellate Tribunal dated 3 March 2021."
+
+    async def scenario():
+        original = await storage.save_document("judgment.pdf", "pdf", judgment)
+        return original, await storage.save_document("judgment_with_annexures.pdf", "pdf", with_annexure)
+
+    original, copy = asyncio.run(scenario())
+
+    assert storage.get_document(copy)["duplicate_of"] == original
+    assert storage.get_document(copy)["extracted_text"] == with_annexure
+    assert storage.get_document(original)["extracted_text"] == judgment
+
+
+def test_stores_saved_before_duplicate_detection_are_deduped_on_start(tmp_path, monkeypatch):
+    judgment = " ".join(f"The petitioner relied on paragraph {n} of the impugned order." for n in range(60))
+    monkeypatch.setattr(storage_module, "minhash_signature", lambda text: None)
+    storage = DocumentStorage(db_path=tmp_path / "documents.db", legacy_dir=None)
+
+    async def save_copies():
+        return [await storage.save_document(name, "pdf", judgment + suffix)
+                for name, suffix in (("judgment.pdf", ""), ("judgment.docx", " Page 1"))]
+
+    original, copy = asyncio.run(save_copies())
+    with storage._connect() as conn:
+        conn.execute("DELETE FROM document_signatures")
+    monkeypatch.undo()
+
+    reopened = DocumentStorage(db_path=tmp_path / "documents.db", legacy_dir=None)
+    assert reopened.run_maintenance() == {"migrated": 0, "duplicates": 1}
+
+    assert reopened.get_document(copy)["duplicate_of"] == original
+    assert reopened.get_document(copy)["extracted_text"] == judgment + " Page 1"
+    assert [doc["id"] for doc in asyncio.run(reopened.search_documents("impugned"))] == [original]
+    with reopened._connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM document_bodies").fetchone()[0] == 2
+        conn.execute("INSERT INTO documents_fts(documents_fts) VALUES ('integrity-check')")
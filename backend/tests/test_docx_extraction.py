@@ -0,0 +1,69 @@
+import io
+import tracemalloc
+
+from docx import Document
+
+from app.services.docx_extraction import iter_docx_blocks
+from app.services.document_processor import DocumentProcessor
+from benchmarks.corpus import make_docx_with_tables
+
+
+def _save(document):
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _interleaved_docx():
+    document = Document()
+    document.add_paragraph("AGREEMENT FOR SALE")
+    run = document.add_paragraph("Vendor:").add_run()
+    run.add_tab()
+    run.add_text("Shri A. Kumar")
+    run.add_break()
+    run.add_text("R/o New Delhi")
+    table = document.add_table(rows=2, cols=3)
+    for r, row in enumerate(table.rows):
+        for c, cell in enumerate(row.cells):
+            cell.text = f"R{r}C{c}"
+    table.rows[1].cells[2].add_paragraph("second line")
+    document.add_paragraph("")
+    document.add_paragraph("IN WITNESS WHEREOF")
+    return _save(document)
+
+
+def test_streaming_matches_python_docx_lines():
+    processor = DocumentProcessor()
+    for content in (_interleaved_docx(), make_docx_with_tables(tables=2, rows=30, paragraphs=10)):
+        streamed = processor.extract_word_text(content).split("\n")
+        loaded = processor.extract_word_text_python_docx(content).split("\n")
+
+        # Same paragraphs and rows; only the position of tables differs
+        assert sorted(streamed) == sorted(loaded)
+
+
+def test_blocks_keep_reading_order():
+    blocks = list(iter_docx_blocks(_interleaved_docx()))
+
+    assert blocks == [
+        "AGREEMENT FOR SALE",
+        "Vendor:\tShri A. Kumar\nR/o New Delhi",
+        "R0C0 | R0C1 | R0C2",
+        "R1C0 | R1C1 | R1C2\nsecond line",
+        "IN WITNESS WHEREOF",
+    ]
+
+
+def test_memory_does_not_grow_with_table_size():
+    def peak_bytes(rows):
+        content = make_docx_with_tables(tables=1, rows=rows, cols=4, paragraphs=1)
+        tracemalloc.start()
+        for _ in iter_docx_blocks(content):
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    small, large = peak_bytes(200), peak_bytes(2000)
+
+    assert large < small * 2
@@ -0,0 +1,32 @@
+from app.services.extraction_cache import ExtractionCache, content_hash, FILE_LEVEL, PAGE_LEVEL
+
+
+def test_hit_reports_bytes_saved_and_survives_restart(tmp_path):
+    upload = b"%PDF-1.4 judgment bytes"
+    key = content_hash(upload)
+
+    cache = ExtractionCache(cache_dir=tmp_path)
+    assert cache.get(key, source_bytes=len(upload)) is None
+    cache.put(key, "IN THE SUPREME COURT OF INDIA")
+    assert cache.get(key, source_bytes=len(upload)) == "IN THE SUPREME COURT OF INDIA"
+    assert cache.get(key, PAGE_LEVEL) is None  # levels are separate namespaces
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["bytes_saved"] == len(upload)
+
+    reloaded = ExtractionCache(cache_dir=tmp_path)
+    assert reloaded.get(key, FILE_LEVEL) == "IN THE SUPREME COURT OF INDIA"
+
+
+def test_evicts_least_recently_used_when_over_size(tmp_path):
+    cache = ExtractionCache(cache_dir=tmp_path, max_bytes=25)
+    cache.put("a" * 64, "x" * 10)
+    cache.put("b" * 64, "y" * 10)
+    cache.get("a" * 64)  # a is now most recent
+    cache.put("c" * 64, "z" * 10)
+
+    assert cache.get("b" * 64) is None
+    assert cache.get("a" * 64) == "x" * 10
+    assert cache.get_stats()["evictions"] == 1
+    assert not (tmp_path / "v1" / FILE_LEVEL / "bb" / ("b" * 64 + ".txt")).exists()
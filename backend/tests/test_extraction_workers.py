@@ -0,0 +1,56 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.document_processor import DocumentProcessor
+from app.services.extraction_workers import ExtractionWorkerPool
+
+
+def test_jobs_queue_beyond_pool_size_and_are_counted():
+    pool = ExtractionWorkerPool(max_workers=2)
+    release = threading.Event()
+    main_thread = threading.get_ident()
+
+    def blocking_job(n):
+        release.wait(5)
+        assert threading.get_ident() != main_thread
+        return n * 2
+
+    def failing_job():
+        raise ValueError("corrupt PDF")
+
+    async def scenario():
+        jobs = [asyncio.create_task(pool.run(blocking_job, n)) for n in range(5)]
+        await asyncio.sleep(0.05)
+        snapshot = pool.get_stats()
+        release.set()
+        results = await asyncio.gather(*jobs)
+        with pytest.raises(ValueError):
+            await pool.run(failing_job)
+        return snapshot, results
+
+    try:
+        snapshot, results = asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+
+    assert snapshot["active"] == 2
+    assert snapshot["queued"] == 3
+    assert results == [0, 2, 4, 6, 8]
+    stats = pool.get_stats()
+    assert stats["completed"] == 5
+    assert stats["failed"] == 1
+    assert stats["queued"] == 0 and stats["active"] == 0
+    assert stats["peak_queued"] >= 3
+
+
+def test_openai_vision_client_is_built_once(monkeypatch):
+    openai = pytest.importorskip("openai")
+    processor = DocumentProcessor()
+    monkeypatch.setattr(processor.settings, "OPENAI_API_KEY", "sk-test")
+
+    client = processor._get_openai_client()
+
+    assert isinstance(client, openai.AsyncOpenAI)
+    assert processor._get_openai_client() is client
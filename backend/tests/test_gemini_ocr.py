@@ -0,0 +1,127 @@
+import asyncio
+import io
+
+from PIL import Image, ImageDraw
+
+from app.utils import gemini_ocr
+from app.utils.gemini_ocr import GeminiOcrClient, prepare_image, split_batch_response
+
+
+def _page_png(width, height):
+    img = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(img)
+    for y in range(40, height - 40, 30):
+        draw.text((40, y), "The Respondent shall pay Rs. 5,00,000 within 30 days.", fill="black")
+    out = io.BytesIO()
+    img.save(out, format="PNG")
+    return out.getvalue()
+
+
+def test_prepare_image_downscales_and_grayscales():
+    original = _page_png(2480, 3508)  # A4 at 300 DPI
+    data, mime = prepare_image(original, "image/png", max_side=2000, target_bytes=400 * 1024)
+
+    assert mime == "image/jpeg"
+    assert len(data) < len(original)
+    with Image.open(io.BytesIO(data)) as img:
+        assert img.mode == "L"
+        assert max(img.size) == 2000
+
+
+def test_split_batch_response_requires_every_marker():
+    text = "=== PAGE 1 ===\nfirst\n=== PAGE 2 ===\nsecond\n"
+    assert split_batch_response(text, 2) == ["first", "second"]
+    assert split_batch_response("=== PAGE 1 ===\nfirst", 2) is None
+    # A blank page is an empty text, not a parse failure
+    assert split_batch_response("=== PAGE 1 ===\n=== PAGE 2 ===\nsecond", 2) == ["", "second"]
+
+
+def test_small_pages_share_one_request(monkeypatch):
+    requests = []
+
+    async def fake_generate(contents):
+        images = [part for part in contents[0]["parts"] if "inline_data" in part]
+        requests.append(len(images))
+        if len(images) == 1:
+            return "single"
+        return "\n".join(f"=== PAGE {i} ===\ntext {i}" for i in range(1, len(images) + 1))
+
+    monkeypatch.setattr(gemini_ocr, "_get_client", lambda: None)
+    monkeypatch.setattr(gemini_ocr, "_generate_async", fake_generate)
+    client = GeminiOcrClient(max_concurrency=2, batch_pages=3, batch_max_bytes=10**6)
+    small = _page_png(400, 300)
+
+    async def scenario():
+        return await asyncio.gather(*(client.extract(small, "image/png", batch_key="doc") for _ in range(3)))
+
+    assert sorted(asyncio.run(scenario())) == ["text 1", "text 2", "text 3"]
+    assert requests == [3]
+    assert client.get_stats()["batched_requests"] == 1
+
+
+def test_unparseable_batch_falls_back_to_single_pages(monkeypatch):
+    requests = []
+
+    async def fake_generate(contents):
+        images = [part for part in contents[0]["parts"] if "inline_data" in part]
+        requests.append(len(images))
+        return "page text" if len(images) == 1 else "pages run together without markers"
+
+    monkeypatch.setattr(gemini_ocr, "_get_client", lambda: None)
+    monkeypatch.setattr(gemini_ocr, "_generate_async", fake_generate)
+    client = GeminiOcrClient(batch_pages=4, batch_max_bytes=10**6, batch_window_seconds=0.01)
+    small = _page_png(400, 300)
+
+    async def scenario():
+        return await asyncio.gather(*(client.extract(small, "image/png", batch_key="doc") for _ in range(2)))
+
+    assert asyncio.run(scenario()) == ["page text", "page text"]
+    assert sorted(requests) == [1, 1, 2]
+    assert client.get_stats()["batch_fallbacks"] == 1
+
+
+def test_blank_page_in_batch_is_not_resent(monkeypatch):
+    requests = []
+
+    async def fake_generate(contents):
+        images = [part for part in contents[0]["parts"] if "inline_data" in part]
+        requests.append(len(images))
+        return "=== PAGE 1 ===\ntext 1\n=== PAGE 2 ===\n"
+
+    monkeypatch.setattr(gemini_ocr, "_get_client", lambda: None)
+    monkeypatch.setattr(gemini_ocr, "_generate_async", fake_generate)
+    client = GeminiOcrClient(batch_pages=2, batch_max_bytes=10**6)
+    small = _page_png(400, 300)
+
+    async def scenario():
+        return await asyncio.gather(*(client.extract(small, "image/png", batch_key="doc") for _ in range(2)))
+
+    assert sorted(asyncio.run(scenario())) == ["", "text 1"]
+    assert requests == [2]
+    assert client.get_stats()["batch_fallbacks"] == 0
+
+
+def test_pages_of_different_documents_are_never_batched_together(monkeypatch):
+    requests = []
+
+    async def fake_generate(contents):
+        images = [part for part in contents[0]["parts"] if "inline_data" in part]
+        requests.append(len(images))
+        if len(images) == 1:
+            return "single"
+        return "\n".join(f"=== PAGE {i} ===\ntext {i}" for i in range(1, len(images) + 1))
+
+    monkeypatch.setattr(gemini_ocr, "_get_client", lambda: None)
+    monkeypatch.setattr(gemini_ocr, "_generate_async", fake_generate)
+    client = GeminiOcrClient(batch_pages=2, batch_max_bytes=10**6, batch_window_seconds=0.01)
+    small = _page_png(400, 300)
+
+    async def scenario():
+        return await asyncio.gather(
+            client.extract(small, "image/png", batch_key="first upload"),
+            client.extract(small, "image/png", batch_key="second upload"),
+            client.extract(small, "image/png"),
+        )
+
+    assert asyncio.run(scenario()) == ["single", "single", "single"]
+    assert requests == [1, 1, 1]
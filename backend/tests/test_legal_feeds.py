@@ -0,0 +1,51 @@
+import asyncio
+
+from app.services.legal_feeds import FeedRefresher
+
+
+def test_snapshot_persists_and_empty_build_keeps_previous(tmp_path):
+    snapshot_file = tmp_path / "feeds.json"
+    results = [[{"title": "A v. B"}], []]
+
+    async def builder(year):
+        return results.pop(0)
+
+    async def run():
+        refresher = FeedRefresher({"cases": builder}, snapshot_file=snapshot_file)
+        assert refresher.get_snapshot("cases") is None
+
+        assert await refresher.refresh("cases")
+        # Second build returns nothing: previous snapshot is kept
+        assert not await refresher.refresh("cases")
+        return refresher
+
+    refresher = asyncio.run(run())
+    assert refresher.get_snapshot("cases")["items"] == [{"title": "A v. B"}]
+    assert refresher.last_error["cases"] == "no items"
+
+    reloaded = FeedRefresher({"cases": builder}, snapshot_file=snapshot_file)
+    snapshot = reloaded.get_snapshot("cases")
+    assert snapshot["items"] == [{"title": "A v. B"}]
+    assert snapshot["age_seconds"] >= 0
+    assert not reloaded.is_stale("cases")
+
+
+def test_concurrent_triggers_share_one_build(tmp_path):
+    calls = []
+
+    async def builder(year):
+        calls.append(year)
+        await asyncio.sleep(0.01)
+        return [{"title": "News"}]
+
+    async def run():
+        refresher = FeedRefresher({"news": builder}, enable_persistence=False)
+        first = refresher.refresh("news")
+        second = refresher.refresh("news")
+        assert first is second
+        await first
+        # Fresh snapshot: no request-triggered rebuild
+        assert refresher.refresh_if_stale("news") is None
+
+    asyncio.run(run())
+    assert len(calls) == 1
@@ -0,0 +1,65 @@
+import asyncio
+
+from PIL import Image, ImageDraw
+
+from app.services import document_processor as dp_module
+from app.services.local_ocr import REMOTE_LOW_CONFIDENCE, assemble_ocr_data, preprocess_page
+
+
+def _typed_page():
+    img = Image.new("L", (1240, 1754), 235)
+    draw = ImageDraw.Draw(img)
+    for y in range(100, 1650, 30):
+        draw.text((80, y), "The appellant contends that the impugned order is contrary to law " * 2, fill=40)
+    return img
+
+
+def test_preprocess_binarizes_and_corrects_skew():
+    skewed = _typed_page().rotate(3, fillcolor=235, expand=True)
+
+    page, angle = preprocess_page(skewed)
+
+    assert angle == -3.0
+    assert set(page.getdata()) <= {0, 255}
+
+
+def test_assemble_ocr_data_groups_lines_and_weights_confidence():
+    data = {
+        "text": ["", "IN", "THE", "COURT", "Order", "dated"],
+        "conf": [-1, 90, 90, 60, 80, 80],
+        "block_num": [1, 1, 1, 1, 2, 2],
+        "par_num": [1, 1, 1, 1, 1, 1],
+        "line_num": [1, 1, 1, 2, 1, 1],
+    }
+
+    text, confidence = assemble_ocr_data(data)
+
+    assert text == "IN THE\nCOURT\n\nOrder dated"
+    assert confidence == round((90 * 2 + 90 * 3 + 60 * 5 + 80 * 5 + 80 * 5) / 20, 1)
+
+
+def test_low_confidence_pages_escalate_to_vision_ocr(monkeypatch):
+    engine = dp_module.local_ocr
+    results = {1: {"text": "clear page", "confidence": 93.0}, 2: {"text": "b1urry pa9e", "confidence": 41.0}}
+    remote_pages = []
+
+    async def fake_local(img_bytes):
+        return dict(results[int(img_bytes.decode())], skew=0.0)
+
+    async def fake_remote(self, img_bytes, page_num, state):
+        remote_pages.append(page_num)
+        return "vision text"
+
+    monkeypatch.setattr(engine, "policy", REMOTE_LOW_CONFIDENCE)
+    monkeypatch.setattr(engine, "available", lambda: True)
+    monkeypatch.setattr(engine, "ocr_image", fake_local)
+    monkeypatch.setattr(dp_module.DocumentProcessor, "_ocr_page_image_remote", fake_remote)
+    processor = dp_module.DocumentProcessor()
+    state = {"gemini_available": True, "use_openai_fallback": False, "error": None}
+
+    async def scenario():
+        return [await processor._ocr_page_image_uncached(str(n).encode(), n, state) for n in (1, 2)]
+
+    assert asyncio.run(scenario()) == ["clear page", "vision text"]
+    assert remote_pages == [2]
+    assert state["confidence"] == {1: 93.0, 2: 41.0}
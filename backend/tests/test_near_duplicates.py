@@ -0,0 +1,32 @@
+import random
+
+from app.services.near_duplicates import (
+    DUPLICATE_THRESHOLD, lsh_buckets, minhash_signature, pack_signature,
+    signature_similarity, unpack_signature
+)
+
+
+def _words(rng, count):
+    return " ".join(rng.choice(["court", "order", "petition", "appeal", "section"]) + str(rng.randint(0, 999))
+                    for _ in range(count))
+
+
+def test_similar_texts_share_buckets_and_distinct_texts_do_not():
+    rng = random.Random(7)
+    original = _words(rng, 2000)
+    # OCR-like noise: about one word in twenty misread, plus different line breaks
+    noisy = "\n".join(word if rng.random() > 0.05 else word + "l" for word in original.split())
+    unrelated = _words(rng, 2000)
+
+    signature, noisy_signature, unrelated_signature = map(minhash_signature, (original, noisy, unrelated))
+
+    assert signature_similarity(signature, minhash_signature(original.upper())) == 1.0
+    assert signature_similarity(signature, noisy_signature) >= DUPLICATE_THRESHOLD
+    assert signature_similarity(signature, unrelated_signature) < 0.1
+    assert set(lsh_buckets(signature)) & set(lsh_buckets(noisy_signature))
+    assert not set(lsh_buckets(signature)) & set(lsh_buckets(unrelated_signature))
+    assert unpack_signature(pack_signature(signature)) == signature
+
+
+def test_short_texts_have_no_signature():
+    assert minhash_signature("Judgment: petitioner v respondent") is None
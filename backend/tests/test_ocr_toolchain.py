@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+from app.services import ocr_toolchain as toolchain_module
+from app.services.ocr_toolchain import OcrToolchain, probe_poppler, probe_vision_apis
+
+
+def test_capabilities_are_probed_once(monkeypatch):
+    probes = []
+
+    def fake_poppler():
+        probes.append(1)
+        return {"available": True, "path": "/usr/bin/pdftoppm", "version": "24.02.0", "error": None}
+
+    monkeypatch.setattr(toolchain_module, "probe_poppler", fake_poppler)
+    monkeypatch.setattr(toolchain_module, "probe_tesseract", lambda: {"available": False, "languages": []})
+    toolchain = OcrToolchain()
+
+    for _ in range(5):
+        assert toolchain.capabilities()["poppler"]["available"]
+    assert len(probes) == 1
+
+    toolchain.probe()
+    assert len(probes) == 2
+
+
+def test_missing_poppler_is_reported_without_running_anything(monkeypatch):
+    monkeypatch.setattr(toolchain_module.shutil, "which", lambda name: None)
+    monkeypatch.setattr(toolchain_module, "WINDOWS_POPPLER_DIRS", [])
+    monkeypatch.setattr(toolchain_module.subprocess, "run", lambda *a, **k: (_ for _ in ()).throw(AssertionError))
+
+    poppler = probe_poppler()
+
+    assert poppler["available"] is False
+    assert "not found" in poppler["error"]
+
+
+def test_vision_engine_needs_an_api_key():
+    settings = SimpleNamespace(GOOGLE_GEMINI_API_KEY=None, OPENAI_API_KEY="sk-test")
+    vision = probe_vision_apis(settings)
+
+    assert vision["gemini"]["available"] is False
+    assert vision["gemini"]["api_key_configured"] is False
+    assert vision["openai"]["api_key_configured"] is True
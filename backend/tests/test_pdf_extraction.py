@@ -0,0 +1,101 @@
+from benchmarks.pdf_extraction import make_text_pdf
+from app.services.pdf_extraction import ParallelPdfExtractor, split_page_ranges
+
+
+def test_split_page_ranges_covers_every_page_in_order():
+    assert split_page_ranges(10, 3) == [(0, 4), (4, 7), (7, 10)]
+    assert split_page_ranges(2, 8) == [(0, 1), (1, 2)]
+
+
+def test_parallel_extraction_matches_serial_page_order():
+    pdf = make_text_pdf(pages=4, lines_per_page=3)
+    extractor = ParallelPdfExtractor(max_workers=2, min_pages=2)
+    try:
+        serial = extractor.extract_pages(pdf, parallel=False)
+        parallel = extractor.extract_pages(pdf, parallel=True)
+    finally:
+        extractor.shutdown()
+
+    assert parallel == serial
+    assert [page["text"].split(".")[0] for page in parallel] == ["1", "2", "3", "4"]
+    assert extractor.stats["parallel_documents"] == 1
+
+
+def _mixed_pdf() -> bytes:
+    """Typed page, scanned (image-only) page, blank page, typed page"""
+    import io
+    from PIL import Image
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    for page in (1, 2, 3, 4):
+        if page in (1, 4):
+            for line in range(5):
+                pdf.drawString(40, 780 - line * 16, f"Page {page} typed order paragraph {line} " * 2)
+        elif page == 2:
+            pdf.drawImage(ImageReader(Image.new("L", (200, 280), 255)), 40, 200, 400, 560)
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def test_hybrid_pdf_ocrs_only_image_pages(monkeypatch):
+    import asyncio
+    from app.services import document_processor as dp_module
+
+    calls = {}
+
+    async def fake_ocr(file_content, ocr_page, page_numbers=None, page_dpi=None, **kwargs):
+        calls["pages"] = page_numbers
+        calls["dpi"] = page_dpi
+        return {number: f"scanned annexure {number}" for number in page_numbers}
+
+    monkeypatch.setattr(dp_module, "ocr_pdf_streaming", fake_ocr)
+    monkeypatch.setattr(dp_module, "PDF2IMAGE_AVAILABLE", True)
+    # Toolchain matrix with Poppler present, so OCR runs without Poppler installed
+    monkeypatch.setattr(dp_module.ocr_toolchain, "capabilities", lambda: {
+        "poppler": {"available": True},
+        "gemini": {"available": True},
+        "openai": {"available": False},
+    })
+
+    report = {}
+    text = asyncio.run(dp_module.DocumentProcessor().process_pdf(_mixed_pdf(), report=report))
+
+    assert report["complete"] is True
+    assert calls["pages"] == [2]
+    assert calls["dpi"][2] == 300
+    assert text.index("Page 1 typed") < text.index("--- Page 2 ---\nscanned annexure 2") < text.index("Page 4 typed")
+
+
+def test_failed_ocr_pages_mark_the_extraction_incomplete(monkeypatch):
+    import asyncio
+    from app.services import document_processor as dp_module
+
+    async def failing_ocr(file_content, ocr_page, page_numbers=None, **kwargs):
+        return {number: None for number in page_numbers}
+
+    monkeypatch.setattr(dp_module, "ocr_pdf_streaming", failing_ocr)
+    monkeypatch.setattr(dp_module, "PDF2IMAGE_AVAILABLE", True)
+    monkeypatch.setattr(dp_module.ocr_toolchain, "capabilities", lambda: {
+        "poppler": {"available": True},
+        "gemini": {"available": True},
+        "openai": {"available": False},
+    })
+
+    report = {}
+    text = asyncio.run(dp_module.DocumentProcessor().process_pdf(_mixed_pdf(), report=report))
+
+    # The native text layer is returned, but must not be cached as the file's text
+    assert "Page 1 typed" in text and "scanned annexure" not in text
+    assert report["complete"] is False
+
+
+def test_ocr_dpi_scales_down_for_oversized_pages():
+    from app.services.pdf_ocr import ocr_dpi_for_page
+
+    assert ocr_dpi_for_page(595, 842, 300) == 300  # A4
+    assert 200 <= ocr_dpi_for_page(842, 1191, 300) < 300  # A3
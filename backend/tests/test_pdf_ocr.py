@@ -0,0 +1,44 @@
+import asyncio
+
+from app.services import pdf_ocr
+from app.services.pdf_ocr import ocr_pdf_streaming, page_windows
+
+
+def test_page_windows_groups_contiguous_runs():
+    assert page_windows([8, 1, 2, 3, 7], window=2) == [(1, 2), (3, 3), (7, 8)]
+
+
+def test_streaming_ocr_bounds_rendered_pages_and_runs_concurrently(monkeypatch):
+    render_calls = []
+
+    def fake_render(file_content, first_page, last_page, dpi=300):
+        render_calls.append((first_page, last_page))
+        return [(page, b"png-%d" % page) for page in range(first_page, last_page + 1)]
+
+    monkeypatch.setattr(pdf_ocr, "render_pages", fake_render)
+
+    in_flight = 0
+    peak = 0
+    progress = []
+
+    async def ocr_page(png, page_number):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if page_number == 5:
+            raise RuntimeError("vision API error")
+        return png.decode()
+
+    results = asyncio.run(ocr_pdf_streaming(
+        b"%PDF", ocr_page, page_numbers=list(range(1, 11)),
+        concurrency=3, window=4, progress=lambda done, total: progress.append((done, total)),
+    ))
+
+    assert render_calls == [(1, 4), (5, 8), (9, 10)]
+    assert results[5] is None
+    assert results[10] == "png-10"
+    assert len(results) == 10
+    assert peak == 3
+    assert progress[-1] == (10, 10)
@@ -0,0 +1,50 @@
+import asyncio
+
+import httpx
+
+from app.services.search_http_client import SearchHttpClient, SearchBudgetExceeded, search_budget
+
+
+def test_retries_transient_status_then_succeeds():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) < 3:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"items": [{"link": "https://example.org"}]})
+
+    client = SearchHttpClient(max_retries=2, backoff_base=0.001, transport=httpx.MockTransport(handler))
+
+    async def run():
+        data = await client.get_json("https://www.googleapis.com/customsearch/v1", params={"q": "x"})
+        await client.aclose()
+        return data
+
+    data = asyncio.run(run())
+    assert data["items"][0]["link"] == "https://example.org"
+    assert len(calls) == 3
+    assert client.stats['retries'] == 2
+
+
+def test_exhausted_budget_stops_before_request():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={})
+
+    client = SearchHttpClient(transport=httpx.MockTransport(handler))
+
+    async def run():
+        with search_budget(0):
+            try:
+                await client.get_json("https://www.googleapis.com/customsearch/v1")
+            except SearchBudgetExceeded:
+                return True
+            finally:
+                await client.aclose()
+        return False
+
+    assert asyncio.run(run())
+    assert calls == []
@@ -0,0 +1,50 @@
+from app.services import search_index as index_module
+from app.services.search_index import LocalSearchIndex
+
+
+def test_bm25_search_and_citation_phrase(tmp_path):
+    index = LocalSearchIndex(db_path=tmp_path / "index.db")
+    assert index.available
+
+    index.add_results([
+        {
+            "title": "State of Karnataka v. Ramesh - CRL. A 567 / 2019",
+            "url": "https://indiankanoon.org/doc/1/",
+            "snippet": "Criminal appeal on bail conditions decided by Karnataka High Court",
+        },
+        {
+            "title": "Arbitration clause interpretation",
+            "url": "https://indiankanoon.org/doc/2/",
+            "snippet": "Supreme Court on arbitration clause and seat of arbitration",
+        },
+    ], source_query="test")
+
+    citation_hits = index.search("CRL. A 567/2019", phrase=True)
+    assert [r["url"] for r in citation_hits] == ["https://indiankanoon.org/doc/1/"]
+
+    keyword_hits = index.search("arbitration clause")
+    assert keyword_hits[0]["url"] == "https://indiankanoon.org/doc/2/"
+    assert index.search("nonexistent judgment") == []
+
+
+def test_upsert_keeps_one_row_per_url(tmp_path):
+    index = LocalSearchIndex(db_path=tmp_path / "index.db")
+    result = {"title": "Old title", "url": "https://example.org/a", "snippet": "gst refund"}
+    index.add_results([result])
+    index.add_results([dict(result, title="New title", text="full judgment text about limitation")])
+
+    hits = index.search("limitation")
+    assert len(hits) == 1
+    assert hits[0]["title"] == "New title"
+    assert index.get_stats()["indexed_results"] == 1
+
+
+def test_rows_beyond_limit_are_pruned_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(index_module, "PRUNE_INTERVAL_ROWS", 3)
+    index = LocalSearchIndex(db_path=tmp_path / "index.db", max_rows=2)
+    for n in range(4):
+        index.add_results([{"title": f"Result {n}", "url": f"https://example.org/{n}", "snippet": "gst"}])
+
+    # Checked on the first write, then on the fourth (three rows later)
+    assert index.get_stats()["indexed_results"] == 2
+    assert {r["url"] for r in index.search("gst")} == {"https://example.org/2", "https://example.org/3"}
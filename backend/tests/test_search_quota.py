@@ -0,0 +1,66 @@
+import asyncio
+
+from app.services.search_quota import (
+    SearchQuotaManager,
+    PRIORITY_RESEARCH,
+    PRIORITY_CITATION,
+    PRIORITY_PRELOAD,
+    search_query_allowance,
+)
+
+
+def test_low_priority_stops_before_research(tmp_path):
+    quota = SearchQuotaManager(daily_limit=10, quota_file=tmp_path / "quota.json")
+
+    admitted_preloads = sum(quota.try_acquire("key", PRIORITY_PRELOAD) for _ in range(10))
+    assert admitted_preloads == 5
+
+    admitted_citations = sum(quota.try_acquire("key", PRIORITY_CITATION) for _ in range(10))
+    assert admitted_citations == 4
+
+    assert quota.try_acquire("key", PRIORITY_RESEARCH)
+    assert not quota.try_acquire("key", PRIORITY_RESEARCH)
+    assert quota.remaining("key") == 0
+
+
+def test_counters_persist_per_key(tmp_path):
+    quota_file = tmp_path / "quota.json"
+    quota = SearchQuotaManager(daily_limit=10, quota_file=quota_file)
+    quota.try_acquire("key-a")
+    quota.try_acquire("key-a")
+    quota.mark_exhausted("key-b")
+
+    reloaded = SearchQuotaManager(daily_limit=10, quota_file=quota_file)
+    assert reloaded.remaining("key-a") == 8
+    assert reloaded.remaining("key-b") == 0
+    assert not reloaded.try_acquire("key-b")
+
+
+def test_priority_cap_downgrades_background_searches(tmp_path):
+    from app.services.search_quota import search_priority
+
+    quota = SearchQuotaManager(daily_limit=10, quota_file=tmp_path / "quota.json")
+    with search_priority(PRIORITY_PRELOAD):
+        admitted = sum(quota.try_acquire("key", PRIORITY_RESEARCH) for _ in range(10))
+    assert admitted == 5
+    assert quota.get_key_stats("key")["by_priority"] == {PRIORITY_PRELOAD: 5}
+
+
+def test_query_allowance_is_shared_by_concurrent_searches(tmp_path):
+    quota = SearchQuotaManager(daily_limit=100, quota_file=tmp_path / "quota.json")
+
+    async def search():
+        await asyncio.sleep(0)
+        return quota.try_acquire("key", PRIORITY_PRELOAD)
+
+    async def scenario():
+        with search_query_allowance(3) as allowance:
+            admitted = await asyncio.gather(*(search() for _ in range(10)))
+        return sum(admitted), allowance
+
+    admitted, allowance = asyncio.run(scenario())
+
+    assert admitted == 3 and allowance["used"] == 3
+    assert quota.get_key_stats("key")["used"] == 3
+    # Outside the block only the daily quota applies
+    assert quota.try_acquire("key", PRIORITY_PRELOAD)
@@ -0,0 +1,49 @@
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+from app.services.upload_spool import UploadTooLarge, open_binary, spool_upload
+
+
+class FakeUpload:
+    """Async chunked reader standing in for FastAPI's UploadFile"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.reads = 0
+
+    async def read(self, size: int = -1) -> bytes:
+        self.reads += 1
+        chunk, self.data = self.data[:size], self.data[size:]
+        return chunk
+
+
+def test_small_upload_stays_in_memory_with_zero_copy_view():
+    data = b"IN THE HIGH COURT OF DELHI " * 100
+    spool = asyncio.run(spool_upload(FakeUpload(data), max_bytes=10_000, spool_bytes=5_000, chunk_size=512))
+    with spool:
+        assert not spool.on_disk and spool.path is None
+        assert spool.sha256 == hashlib.sha256(data).hexdigest()
+        assert bytes(spool.content()) == data
+        stream = open_binary(spool.content())
+        stream.seek(3)
+        assert stream.read(4) == b"THE "
+
+
+def test_large_upload_rolls_to_disk_and_is_removed_on_close():
+    data = os.urandom(20_000)
+    spool = asyncio.run(spool_upload(FakeUpload(data), max_bytes=50_000, spool_bytes=4_096, chunk_size=1_000))
+    path = spool.path
+    assert spool.on_disk and os.path.exists(path)
+    assert spool.content()[:] == data
+    spool.close()
+    assert not os.path.exists(path)
+
+
+def test_limit_is_enforced_while_streaming():
+    upload = FakeUpload(b"x" * 100_000)
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(spool_upload(upload, max_bytes=10_000, chunk_size=1_000))
+    assert upload.reads == 11  # stopped at the first chunk over the limit
@@ -0,0 +1,85 @@
+"""
+Warm LegalMitra caches after a deploy
+
+Replays the top-N historical queries (by frequency in the AI audit log) through
+the web-search path, and pre-loads the Gemini model catalog and template
+indexes, then prints a warm-up report.
+
+Usage:
+    # Warm a running server's in-memory caches (recommended after deploy)
+    python scripts/warm_cache.py --server http://localhost:8888
+
+    # Warm the on-disk caches (search cache JSON, local search index) in-process
+    python scripts/warm_cache.py --top 50 --concurrency 4 --max-searches 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.append(BACKEND_DIR)
+
+
+async def warm_server(server: str, args) -> dict:
+    """Ask a running server to warm its own caches"""
+    import httpx
+
+    async with httpx.AsyncClient(timeout=600.0) as client:
+        response = await client.post(
+            f"{server.rstrip('/')}/api/v1/cache-warmup",
+            params={
+                "top_n": args.top,
+                "days": args.days,
+                "concurrency": args.concurrency,
+                "max_search_queries": args.max_searches,
+            },
+        )
+        response.raise_for_status()
+        return response.json()["report"]
+
+
+async def warm_local(args) -> dict:
+    """Warm caches in this process (persisted caches survive for the server)"""
+    # Relative data paths (data/search_cache.json, ...) match the server's
+    os.chdir(BACKEND_DIR)
+    from app.services.cache_warmup import warm_up
+
+    return await warm_up(
+        top_n=args.top,
+        days=args.days,
+        concurrency=args.concurrency,
+        max_search_queries=args.max_searches,
+        warm_models=not args.skip_models,
+        warm_templates=not args.skip_templates,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm LegalMitra caches from historical queries")
+    parser.add_argument("--server", help="Base URL of a running server to warm (e.g. http://localhost:8888)")
+    parser.add_argument("--top", type=int, default=50, help="Number of top historical queries to replay")
+    parser.add_argument("--days", type=int, default=30, help="Audit log look-back window in days")
+    parser.add_argument("--concurrency", type=int, default=4, help="Queries replayed at the same time")
+    parser.add_argument("--max-searches", type=int, default=20, help="Live Custom Search queries to spend")
+    parser.add_argument("--skip-models", action="store_true", help="Do not pre-load the Gemini model catalog")
+    parser.add_argument("--skip-templates", action="store_true", help="Do not pre-load template indexes")
+    parser.add_argument("--json", action="store_true", help="Print the raw JSON report")
+    args = parser.parse_args()
+
+    if args.server:
+        report = asyncio.run(warm_server(args.server, args))
+    else:
+        report = asyncio.run(warm_local(args))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        from app.services.cache_warmup import format_report
+        print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()